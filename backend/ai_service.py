@@ -2,9 +2,51 @@
 AI Service for EFEX Promotor Copilot
 Integrates with AWS Bedrock and Claude Opus 4.5
 """
-import boto3
-import json
+import time
+
 from config import Config
+from bedrock import BedrockGateway, BedrockUnavailable, create_bedrock_client
+from knowledge import knowledge_base
+from metrics import registry
+from routing import model_router
+from semantic_cache import semantic_cache, context_scope, CACHEABLE_OPERATIONS
+
+# Per-call LLM metrics, for capacity planning against Bedrock quotas
+LLM_REQUESTS = registry.counter(
+    'efex_llm_requests_total', 'Copilot LLM calls by operation, model and outcome',
+    ('operation', 'model', 'outcome')
+)
+LLM_LATENCY = registry.histogram(
+    'efex_llm_request_duration_seconds', 'Copilot LLM call latency, including retries',
+    ('operation', 'model')
+)
+LLM_FIRST_TOKEN = registry.histogram(
+    'efex_llm_time_to_first_token_seconds', 'Time until the first streamed text fragment',
+    ('operation', 'model')
+)
+LLM_TOKENS = registry.counter(
+    'efex_llm_tokens_total', 'Tokens reported by Bedrock by operation, model and type',
+    ('operation', 'model', 'type')
+)
+PROMOTOR_LLM_REQUESTS = registry.counter(
+    'efex_promotor_llm_requests_total', 'Copilot LLM calls per promotor and outcome',
+    ('promotor', 'outcome')
+)
+PROMOTOR_LLM_TOKENS = registry.counter(
+    'efex_promotor_llm_tokens_total', 'Tokens used per promotor and type',
+    ('promotor', 'type')
+)
+
+
+def call_outcome(result: dict) -> str:
+    """Classify a call result as success, mock, cache_hit, unavailable or error"""
+    if result.get('mock'):
+        return 'mock'
+    if result.get('cached'):
+        return 'cache_hit'
+    if result.get('success', True):
+        return 'success'
+    return 'unavailable' if result.get('unavailable') else 'error'
 
 # System prompt for the EFEX Promotor Copilot
 EFEX_COPILOT_SYSTEM_PROMPT = """Eres el Copiloto de EFEX, un asistente inteligente especializado en ayudar a promotores de EFEX (plataforma fintech de pagos en Mexico).
@@ -67,40 +109,24 @@ class EFEXCopilotService:
     """Service for interacting with Claude via AWS Bedrock"""
 
     def __init__(self):
-        self.client = None
         self.model_id = Config.CLAUDE_MODEL_ID
+        self.gateway = BedrockGateway(fallback_model_id=Config.BEDROCK_FALLBACK_MODEL_ID)
         self._initialize_client()
 
+    @property
+    def client(self):
+        """The bedrock-runtime client; None means mock mode"""
+        return self.gateway.client
+
+    @client.setter
+    def client(self, client):
+        self.gateway.client = client
+
     def _initialize_client(self):
         """Initialize the Bedrock Runtime client"""
-        try:
-            if Config.AWS_ACCESS_KEY_ID and Config.AWS_SECRET_ACCESS_KEY:
-                # Build credentials dict
-                credentials = {
-                    'aws_access_key_id': Config.AWS_ACCESS_KEY_ID,
-                    'aws_secret_access_key': Config.AWS_SECRET_ACCESS_KEY
-                }
-                # Add session token if present (for temporary credentials)
-                if Config.AWS_SESSION_TOKEN:
-                    credentials['aws_session_token'] = Config.AWS_SESSION_TOKEN
-
-                self.client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=Config.AWS_REGION,
-                    **credentials
-                )
-                print(f"Bedrock client initialized with explicit credentials for region: {Config.AWS_REGION}")
-                print(f"Using model: {self.model_id}")
-            else:
-                # Use default credentials (IAM role, environment, etc.)
-                self.client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=Config.AWS_REGION
-                )
-                print(f"Bedrock client initialized with default credentials")
-        except Exception as e:
-            print(f"Warning: Could not initialize Bedrock client: {e}")
-            self.client = None
+        self.client = create_bedrock_client()
+        if self.client:
+            print(f"Using model: {self.model_id}")
 
     def _build_messages(self, conversation_history: list, user_message: str) -> list:
         """Build the messages array for the API call"""
@@ -121,26 +147,21 @@ class EFEXCopilotService:
 
         return messages
 
-    def chat(self, user_message: str, conversation_history: list = None,
-             context: dict = None) -> dict:
+    def _build_system_prompt(self, context: dict, route: dict) -> list:
         """
-        Send a message to the copilot and get a response
+        Build the system prompt as content blocks
 
-        Args:
-            user_message: The user's message
-            conversation_history: List of previous messages [{role, content}]
-            context: Additional context (client info, promotor info, etc.)
-
-        Returns:
-            dict with 'response' and 'success' keys
+        The static copilot prompt goes first, marked cacheable when the route
+        allows it (see ModelRouter.cache_system_prompt); the per-request
+        context follows it.
         """
-        if conversation_history is None:
-            conversation_history = []
+        static_block = {"type": "text", "text": EFEX_COPILOT_SYSTEM_PROMPT}
+        if model_router.cache_system_prompt(route, EFEX_COPILOT_SYSTEM_PROMPT):
+            static_block["cache_control"] = {"type": "ephemeral"}
 
-        # Build enhanced system prompt with context
-        system_prompt = EFEX_COPILOT_SYSTEM_PROMPT
+        system_prompt = [static_block]
         if context:
-            context_info = "\n\n## Contexto Actual\n"
+            context_info = "## Contexto Actual\n"
             if context.get('promotor_name'):
                 context_info += f"- Promotor: {context['promotor_name']}\n"
             if context.get('promotor_zona'):
@@ -149,49 +170,338 @@ class EFEXCopilotService:
                 context_info += f"- Clientes activos: {context['clientes_activos']}\n"
             if context.get('client_info'):
                 context_info += f"- Cliente actual: {context['client_info']}\n"
-            system_prompt += context_info
+            if context.get('conversation_summary'):
+                context_info += f"\n## Resumen de la Conversacion Previa\n{context['conversation_summary']}\n"
+            if context.get('knowledge'):
+                context_info += f"\n## Informacion de Producto Relevante\n{context['knowledge']}\n"
+            system_prompt.append({"type": "text", "text": context_info})
+        return system_prompt
+
+    def _with_knowledge(self, context: dict, user_message: str, route: dict) -> dict:
+        """
+        Add the knowledge base chunks relevant to the message to the request context
+
+        Templated operations (messages, opportunity analysis) are skipped:
+        their prompts only share boilerplate words with the documents.
+        """
+        if not route.get('knowledge'):
+            return context
+        chunks = knowledge_base.retrieve(user_message)
+        if not chunks:
+            return context
+        return {**(context or {}), 'knowledge': knowledge_base.format_chunks(chunks)}
+
+    def _parse_usage(self, usage: dict) -> dict:
+        """Normalize the token usage reported by Bedrock, including prompt cache counts"""
+        usage = usage or {}
+        return {
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+            'cache_read_input_tokens': usage.get('cache_read_input_tokens', 0),
+            'cache_creation_input_tokens': usage.get('cache_creation_input_tokens', 0)
+        }
+
+    def _build_request_body(self, system_prompt, messages: list, route: dict) -> dict:
+        """Build the Bedrock request body for Claude with a route's token budget and stop sequences"""
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": route['max_tokens'],
+            "system": system_prompt,
+            "messages": messages
+        }
+        if route.get('stop_sequences'):
+            body["stop_sequences"] = route['stop_sequences']
+        return body
 
+    def chat(self, user_message: str, conversation_history: list = None,
+             context: dict = None, operation: str = None, user_id: int = None) -> dict:
+        """
+        Send a message to the copilot and get a response
+
+        Args:
+            user_message: The user's message
+            conversation_history: List of previous messages [{role, content}]
+            context: Additional context (client info, promotor info, etc.)
+            operation: Routing table entry; chat turns are classified when omitted
+            user_id: Promotor the call is made for, for usage metrics
+
+        Returns:
+            dict with 'response' and 'success' keys, plus the call's
+            'usage', 'model_id', 'operation', 'latency_ms' and 'outcome'
+        """
+        if conversation_history is None:
+            conversation_history = []
+        operation = operation or model_router.classify_chat(user_message, conversation_history)
+        route = model_router.route(operation)
+
+        context = self._with_knowledge(context, user_message, route)
+        semantic_scope = self._semantic_scope(context, conversation_history, operation)
+        if semantic_scope is not None:
+            # Shared answers are generated from the product knowledge alone, without the promotor's details
+            context = {'knowledge': context['knowledge']}
+        system_prompt = self._build_system_prompt(context, route)
         messages = self._build_messages(conversation_history, user_message)
+        started_at = time.monotonic()
+
+        cached = self._semantic_lookup(user_message, operation, route, semantic_scope)
+        if cached:
+            return self._record_call(cached, operation, route, user_id, started_at)
 
         # If Bedrock client is not available, use mock response for development
         if not self.client:
-            return self._mock_response(user_message)
+            return self._record_call(self._mock_response(user_message), operation, route, user_id, started_at)
 
         try:
             # Prepare the request for Claude via Bedrock
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "system": system_prompt,
-                "messages": messages
-            }
+            request_body = self._build_request_body(system_prompt, messages, route)
 
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(request_body)
-            )
-
-            response_body = json.loads(response['body'].read())
+            response_body, model_id = self.gateway.invoke(route['model_id'], request_body)
 
-            return {
+            result = {
                 'success': True,
                 'response': response_body['content'][0]['text'],
-                'usage': {
-                    'input_tokens': response_body.get('usage', {}).get('input_tokens', 0),
-                    'output_tokens': response_body.get('usage', {}).get('output_tokens', 0)
-                }
+                'usage': self._parse_usage(response_body.get('usage')),
+                'model_id': model_id
             }
+            self._semantic_store(user_message, operation, route, semantic_scope, result)
+
+        except BedrockUnavailable as e:
+            print(f"Bedrock unavailable: {e}")
+            result = self._unavailable_response(e)
 
         except Exception as e:
             print(f"Error calling Bedrock: {e}")
-            return {
+            result = {
                 'success': False,
                 'error': str(e),
                 'response': f"Lo siento, hubo un error al procesar tu solicitud. Por favor intenta de nuevo. Error: {str(e)}"
             }
 
+        return self._record_call(result, operation, route, user_id, started_at)
+
+    def chat_stream(self, user_message: str, conversation_history: list = None,
+                    context: dict = None, operation: str = None, user_id: int = None):
+        """
+        Send a message to the copilot and stream the response as it is generated
+
+        Args:
+            user_message: The user's message
+            conversation_history: List of previous messages [{role, content}]
+            context: Additional context (client info, promotor info, etc.)
+            operation: Routing table entry; chat turns are classified when omitted
+            user_id: Promotor the call is made for, for usage metrics
+
+        Yields:
+            dicts with a 'type' key: 'delta' events carry a 'text' fragment,
+            and a final 'done' event carries the same keys returned by chat().
+            If the stream fails after some text was sent, 'response' is that
+            partial text and 'partial' is True.
+        """
+        if conversation_history is None:
+            conversation_history = []
+        operation = operation or model_router.classify_chat(user_message, conversation_history)
+        route = model_router.route(operation)
+
+        context = self._with_knowledge(context, user_message, route)
+        semantic_scope = self._semantic_scope(context, conversation_history, operation)
+        if semantic_scope is not None:
+            # Shared answers are generated from the product knowledge alone, without the promotor's details
+            context = {'knowledge': context['knowledge']}
+        system_prompt = self._build_system_prompt(context, route)
+        messages = self._build_messages(conversation_history, user_message)
+        started_at = time.monotonic()
+
+        cached = self._semantic_lookup(user_message, operation, route, semantic_scope)
+        if cached:
+            yield {'type': 'delta', 'text': cached['response']}
+            yield {'type': 'done', **self._record_call(cached, operation, route, user_id, started_at)}
+            return
+
+        # If Bedrock client is not available, stream the mock response for development
+        if not self.client:
+            result = self._mock_response(user_message)
+            for fragment in result['response'].split(' '):
+                yield {'type': 'delta', 'text': fragment + ' '}
+            yield {'type': 'done', **self._record_call(result, operation, route, user_id, started_at)}
+            return
+
+        parts = []
+        usage = self._parse_usage(None)
+        first_token_at = None
+
+        try:
+            request_body = self._build_request_body(system_prompt, messages, route)
+            payloads, model_id = self.gateway.invoke_stream(route['model_id'], request_body)
+
+            for payload in payloads:
+                if payload['type'] == 'message_start':
+                    usage.update(self._parse_usage(payload['message'].get('usage')))
+                elif payload['type'] == 'content_block_delta':
+                    text = payload['delta'].get('text')
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                            LLM_FIRST_TOKEN.observe(first_token_at - started_at,
+                                                    operation=operation, model=model_id)
+                        parts.append(text)
+                        yield {'type': 'delta', 'text': text}
+                elif payload['type'] == 'message_delta':
+                    usage['output_tokens'] = payload.get('usage', {}).get('output_tokens', 0)
+
+            result = {
+                'success': True,
+                'response': ''.join(parts),
+                'usage': usage,
+                'model_id': model_id
+            }
+            self._semantic_store(user_message, operation, route, semantic_scope, result)
+
+        except BedrockUnavailable as e:
+            print(f"Bedrock unavailable: {e}")
+            result = self._unavailable_response(e)
+
+        except Exception as e:
+            print(f"Error streaming from Bedrock: {e}")
+            result = {
+                'success': False,
+                'error': str(e),
+                'response': f"Lo siento, hubo un error al procesar tu solicitud. Por favor intenta de nuevo. Error: {str(e)}"
+            }
+            if parts:
+                # Keep the text the promotor already saw instead of replacing it with the error
+                result.update({
+                    'response': ''.join(parts),
+                    'partial': True,
+                    'usage': usage,
+                    'model_id': model_id
+                })
+
+        yield {'type': 'done', **self._record_call(result, operation, route, user_id, started_at)}
+
+    def summarize_history(self, previous_summary: str, messages: list, user_id: int = None) -> str:
+        """
+        Fold older conversation turns into the running conversation summary
+
+        Args:
+            previous_summary: The current summary (None for the first fold)
+            messages: Turns to fold in, oldest first [{role, content}]
+            user_id: Promotor that owns the conversation, for usage metrics
+
+        Returns:
+            The updated summary, or None if it could not be generated
+        """
+        transcript = "\n".join(
+            f"{'Promotor' if msg['role'] == 'user' else 'Copiloto'}: {msg['content']}"
+            for msg in messages
+        )
+
+        # Without Bedrock keep a truncated transcript as the summary
+        if not self.client:
+            summary = f"{previous_summary}\n{transcript}" if previous_summary else transcript
+            return summary[-Config.HISTORY_SUMMARY_MAX_TOKENS * 4:]
+
+        prompt = f"""Actualiza el resumen de una conversacion entre un promotor de EFEX y su copiloto.
+
+Resumen actual:
+{previous_summary or 'Sin resumen previo'}
+
+Nuevos mensajes:
+{transcript}
+
+Devuelve solo el resumen actualizado, breve y en espanol, conservando datos de clientes, acuerdos y pendientes."""
+
+        route = model_router.route('summarize')
+        started_at = time.monotonic()
+        try:
+            request_body = self._build_request_body(
+                "Eres un asistente que resume conversaciones de forma concisa.",
+                [{"role": "user", "content": prompt}],
+                route
+            )
+
+            response_body, model_id = self.gateway.invoke(route['model_id'], request_body)
+            self._record_call({
+                'success': True,
+                'usage': self._parse_usage(response_body.get('usage')),
+                'model_id': model_id
+            }, 'summarize', route, user_id, started_at)
+            return response_body['content'][0]['text']
+
+        except Exception as e:
+            print(f"Error summarizing conversation history: {e}")
+            self._record_call({
+                'success': False,
+                'unavailable': isinstance(e, BedrockUnavailable)
+            }, 'summarize', route, user_id, started_at)
+            return None
+
+    @staticmethod
+    def _semantic_scope(context: dict, conversation_history: list, operation: str) -> str:
+        """
+        Semantic cache scope of a request, or None when its answer must not be shared
+
+        Only first-turn product questions are cached: general chat turns that
+        retrieved knowledge chunks and carry no client or conversation context.
+        Their answer depends on the question and those chunks, so the scope is
+        the chunks' text; the promotor's details are left out of the prompt.
+        """
+        if not semantic_cache.enabled or conversation_history or operation not in CACHEABLE_OPERATIONS:
+            return None
+        context = context or {}
+        if not context.get('knowledge') or context.get('client_info') or context.get('conversation_summary'):
+            return None
+        return context_scope(context['knowledge'])
+
+    def _semantic_lookup(self, user_message: str, operation: str, route: dict, scope: str) -> dict:
+        """Answer a product question from the semantic cache, or return None"""
+        if scope is None:
+            return None
+        hit = semantic_cache.lookup(user_message, operation, route['model_id'], scope)
+        if hit is None:
+            return None
+        return {
+            'success': True,
+            'response': hit['response'],
+            'model_id': 'semantic_cache',
+            'cached': True,
+            'similarity': hit['similarity']
+        }
+
+    def _semantic_store(self, user_message: str, operation: str, route: dict, scope: str, result: dict):
+        """Remember a product answer for near-duplicate questions retrieving the same knowledge"""
+        if scope is None:
+            return
+        semantic_cache.store(user_message, operation, route['model_id'], result['response'], scope)
+
+    def _record_call(self, result: dict, operation: str, route: dict, user_id: int,
+                     started_at: float) -> dict:
+        """Add the call's operation, model, latency and outcome to a result and record its metrics"""
+        latency = time.monotonic() - started_at
+        result['operation'] = operation
+        result['latency_ms'] = int(latency * 1000)
+        result.setdefault('model_id', 'mock' if result.get('mock') else route['model_id'])
+        result['outcome'] = call_outcome(result)
+
+        labels = {'operation': operation, 'model': result['model_id']}
+        promotor = user_id if user_id is not None else 'none'
+        LLM_REQUESTS.inc(outcome=result['outcome'], **labels)
+        LLM_LATENCY.observe(latency, **labels)
+        PROMOTOR_LLM_REQUESTS.inc(promotor=promotor, outcome=result['outcome'])
+        for token_type, count in (result.get('usage') or {}).items():
+            if count:
+                LLM_TOKENS.inc(count, type=token_type, **labels)
+                PROMOTOR_LLM_TOKENS.inc(count, promotor=promotor, type=token_type)
+        return result
+
+    def _unavailable_response(self, error: BedrockUnavailable) -> dict:
+        """Response when the gateway could not reach any model"""
+        return {
+            'success': False,
+            'error': str(error),
+            'unavailable': True,
+            'response': "El copiloto no esta disponible en este momento. Por favor intenta de nuevo en unos minutos."
+        }
+
     def _mock_response(self, user_message: str) -> dict:
         """Mock response for development without AWS credentials"""
         mock_responses = {
@@ -240,7 +550,7 @@ Para detalles especificos, consulta la tabla de comisiones actualizada en tu por
             'mock': True
         }
 
-    def generate_client_message(self, message_type: str, client_info: dict) -> dict:
+    def generate_client_message(self, message_type: str, client_info: dict, user_id: int = None) -> dict:
         """Generate a message template for a specific client"""
         prompt = f"""Genera un mensaje de {message_type} para un cliente con la siguiente informacion:
 
@@ -250,9 +560,9 @@ Tipo: {client_info.get('business_type', 'No especificado')}
 
 El mensaje debe ser profesional, personalizado y enfocado en los beneficios de EFEX."""
 
-        return self.chat(prompt)
+        return self.chat(prompt, operation='generate_message', user_id=user_id)
 
-    def analyze_opportunity(self, client_info: dict) -> dict:
+    def analyze_opportunity(self, client_info: dict, user_id: int = None) -> dict:
         """Analyze a client and suggest sales strategies"""
         prompt = f"""Analiza este prospecto y sugiere estrategias de venta:
 
@@ -267,7 +577,7 @@ Proporciona:
 3. Propuesta de valor personalizada
 4. Objeciones probables y como manejarlas"""
 
-        return self.chat(prompt)
+        return self.chat(prompt, operation='analyze_opportunity', user_id=user_id)
 
 
 # Singleton instance
@@ -0,0 +1,49 @@
+"""
+AI tools for EFEX Promotor Copilot clients
+Client message generation and opportunity analysis through the result
+cache, shared by the single-client routes and bulk jobs
+"""
+from ai_service import copilot_service
+from cache import result_cache
+from routing import model_router
+
+# Client fields each AI tool prompt depends on, used to key cached results
+GENERATE_MESSAGE_FIELDS = ('name', 'business_name', 'business_type')
+ANALYZE_OPPORTUNITY_FIELDS = ('name', 'business_name', 'business_type', 'notes')
+
+# Operations available to bulk jobs
+CLIENT_OPERATIONS = ('analyze', 'generate_message')
+
+
+def cached_generate_message(message_type: str, client_info: dict, user_id: int = None) -> dict:
+    """Generate a client message, reusing a cached result when the client is unchanged"""
+    cache_key = result_cache.make_key(
+        'generate_message', message_type, client_info,
+        GENERATE_MESSAGE_FIELDS, model_router.route('generate_message')['model_id']
+    )
+    return result_cache.get_or_compute(
+        cache_key,
+        lambda: copilot_service.generate_client_message(message_type, client_info, user_id),
+        tag=f"client:{client_info['id']}"
+    )
+
+
+def cached_analyze_opportunity(client_info: dict, user_id: int = None) -> dict:
+    """Analyze a client opportunity, reusing a cached result when the client is unchanged"""
+    cache_key = result_cache.make_key(
+        'analyze_opportunity', None, client_info,
+        ANALYZE_OPPORTUNITY_FIELDS, model_router.route('analyze_opportunity')['model_id']
+    )
+    return result_cache.get_or_compute(
+        cache_key,
+        lambda: copilot_service.analyze_opportunity(client_info, user_id),
+        tag=f"client:{client_info['id']}"
+    )
+
+
+def run_client_operation(operation: str, client_info: dict, message_type: str = None,
+                         user_id: int = None) -> dict:
+    """Run one of CLIENT_OPERATIONS for a client"""
+    if operation == 'generate_message':
+        return cached_generate_message(message_type, client_info, user_id)
+    return cached_analyze_opportunity(client_info, user_id)
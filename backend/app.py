@@ -2,18 +2,55 @@
 EFEX Promotor Copilot - Main Application
 Flask backend with JWT authentication and AWS Bedrock integration
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager, create_access_token, jwt_required,
-    get_jwt_identity, get_jwt
+    get_jwt_identity, get_jwt, current_user
 )
+import click
 from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only
+import json
 import os
+import time
 
 from config import config
-from models import db, User, Client, Conversation, Message
+from database import sqlite_pragmas
+from models import (
+    db, User, Client, Conversation, Message, PromotorStats, AIJob, AIJobResult, AITask,
+    CLIENT_FIELDS
+)
 from ai_service import copilot_service
+from ai_tools import cached_generate_message, cached_analyze_opportunity, CLIENT_OPERATIONS
+from cache import result_cache
+from exporter import (
+    stream_rows, client_rows, transcript_rows,
+    EXPORT_FORMATS, EXPORT_MIMETYPES, TRANSCRIPT_FIELDS
+)
+from history import history_manager, history_cache
+from importer import import_clients, IMPORT_FORMATS
+from stats import get_promotor_stats, reconcile_promotor_stats
+from jobs import job_runner
+from tasks import task_queue
+from migrations import upgrade_schema
+from pagination import encode_cursor, decode_cursor, keyset_filters
+from search import search_index, SEARCH_TYPES
+from knowledge import knowledge_base
+from semantic_cache import semantic_cache
+from passwords import password_hasher, PasswordHasherBusy
+from identity import identity_claims, load_identity
+from metrics import registry
+from profiling import request_profiler
+
+# Client list sorts: column, whether it can be NULL, and default order
+CLIENT_SORTS = {
+    'created_at': (Client.created_at, False, 'desc'),
+    'last_contact': (Client.last_contact, True, 'desc'),
+    'name': (Client.name, False, 'asc'),
+    'status': (Client.status, True, 'asc'),
+}
 
 def create_app(config_name=None):
     """Application factory"""
@@ -25,12 +62,38 @@ def create_app(config_name=None):
 
     # Initialize extensions - allowing all origins for development
     CORS(app, origins=['*'], supports_credentials=True)
+    sqlite_pragmas.init_app(app)
     db.init_app(app)
     jwt = JWTManager(app)
+    job_runner.init_app(app)
+    task_queue.init_app(app)
+    request_profiler.init_app(app)
 
-    # Create tables
+    # Create tables and add any columns missing from existing databases
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        search_index.setup()
+        knowledge_base.setup()
+        # Jobs and tasks of the previous process never finish; report them as failed
+        job_runner.fail_orphaned_jobs()
+        task_queue.fail_orphaned_tasks()
+        task_queue.purge_old_tasks()
+
+    @jwt.user_lookup_loader
+    def user_lookup(jwt_header, jwt_data):
+        return load_identity(jwt_data)
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error(jwt_header, jwt_data):
+        return jsonify({'error': 'User not found or deactivated'}), 401
+
+    @app.errorhandler(PasswordHasherBusy)
+    def handle_password_hasher_busy(e):
+        """Shed auth load instead of letting logins pile up on the request workers"""
+        response = jsonify({'error': 'Authentication is busy, please retry'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
 
     # ==================== Auth Routes ====================
 
@@ -61,7 +124,10 @@ def create_app(config_name=None):
         db.session.add(user)
         db.session.commit()
 
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(
+            identity=str(user.id),
+            additional_claims=identity_claims(user)
+        )
 
         return jsonify({
             'message': 'User registered successfully',
@@ -85,7 +151,15 @@ def create_app(config_name=None):
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 403
 
-        access_token = create_access_token(identity=str(user.id))
+        # Upgrade hashes made with an older cost while we have the plain password
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+
+        access_token = create_access_token(
+            identity=str(user.id),
+            additional_claims=identity_claims(user)
+        )
 
         return jsonify({
             'access_token': access_token,
@@ -95,107 +169,193 @@ def create_app(config_name=None):
     @app.route('/api/auth/me', methods=['GET'])
     @jwt_required()
     def get_current_user():
-        """Get current user info"""
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-
-        return jsonify({'user': user.to_dict()}), 200
+        """Get current user info, from the token claims and the identity cache"""
+        return jsonify({'user': current_user.to_dict()}), 200
 
     # ==================== Copilot Chat Routes ====================
 
-    @app.route('/api/copilot/chat', methods=['POST'])
-    @jwt_required()
-    def chat():
-        """Send a message to the copilot"""
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        data = request.get_json()
-
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-
-        message = data['message']
-        conversation_id = data.get('conversation_id')
-
+    def _start_chat_turn(user, message, conversation_id):
+        """Resolve the conversation, history and context for a chat turn"""
         # Get or create conversation
         if conversation_id:
             conversation = Conversation.query.filter_by(
                 id=conversation_id,
-                user_id=user_id
+                user_id=user.id
             ).first()
             if not conversation:
-                return jsonify({'error': 'Conversation not found'}), 404
+                return None, None, None
         else:
             # Create new conversation
             conversation = Conversation(
-                user_id=user_id,
+                user_id=user.id,
                 title=message[:50] + '...' if len(message) > 50 else message
             )
             db.session.add(conversation)
             db.session.commit()
 
-        # Get conversation history
-        history = [
-            {'role': msg.role, 'content': msg.content}
-            for msg in conversation.messages
-        ]
+        # Get conversation history, bounded by the history token budget
+        history, summary = history_manager.build_history(
+            conversation, history_cache.messages(conversation)
+        )
 
         # Build context
         context = {
             'promotor_name': user.name,
             'promotor_zona': user.zona,
-            'clientes_activos': user.clientes_activos
+            'clientes_activos': user.clientes_activos,
+            'conversation_summary': summary
         }
 
-        # Get AI response
-        result = copilot_service.chat(message, history, context)
+        return conversation, history, context
 
+    def _save_chat_turn(conversation_id, message, result):
+        """Persist the user message and the assistant response of a chat turn"""
         # Save user message
         user_msg = Message(
-            conversation_id=conversation.id,
+            conversation_id=conversation_id,
             role='user',
             content=message
         )
         db.session.add(user_msg)
 
-        # Save assistant response
-        assistant_msg = Message(
-            conversation_id=conversation.id,
-            role='assistant',
-            content=result['response']
-        )
+        # Save assistant response, with the usage and outcome of the call
+        assistant_msg = Message.from_copilot_result(conversation_id, result)
         db.session.add(assistant_msg)
         db.session.commit()
 
-        return jsonify({
-            'response': result['response'],
-            'conversation_id': conversation.id,
-            'success': result.get('success', True)
-        }), 200
+        history_cache.append(conversation_id, [
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': result['response']}
+        ])
+
+    def _run_or_enqueue(user_id, operation, data, run):
+        """Run copilot work inline, or on the task queue when the client asks for async mode"""
+        if data.get('async', app.config['COPILOT_ASYNC_DEFAULT']):
+            task = task_queue.submit(user_id, operation, run)
+            return jsonify({
+                'task_id': task.id,
+                'status': task.status
+            }), 202
+
+        body = run()
+        # A copilot failure is not a successful response, even with a fallback message
+        return jsonify(body), 200 if body.get('success', True) else 503
+
+    def _export_response(rows, fields, fmt, filename):
+        """Stream an export as a downloadable CSV or NDJSON file"""
+        return Response(
+            stream_with_context(stream_rows(rows, fields, fmt)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+        )
+
+    @app.route('/api/copilot/chat', methods=['POST'])
+    @jwt_required()
+    def chat():
+        """Send a message to the copilot"""
+        user_id = current_user.id
+        data = request.get_json()
+
+        if not data or 'message' not in data:
+            return jsonify({'error': 'Message is required'}), 400
+
+        message = data['message']
+        conversation, history, context = _start_chat_turn(
+            current_user, message, data.get('conversation_id')
+        )
+        if not conversation:
+            return jsonify({'error': 'Conversation not found'}), 404
+
+        conversation_id = conversation.id
+        # Persist any history summary update before the turn may leave this request
+        db.session.commit()
+
+        def run():
+            # Get AI response
+            result = copilot_service.chat(message, history, context, user_id=user_id)
+
+            _save_chat_turn(conversation_id, message, result)
+
+            return {
+                'response': result['response'],
+                'conversation_id': conversation_id,
+                'success': result.get('success', True)
+            }
+
+        return _run_or_enqueue(user_id, 'chat', data, run)
+
+    @app.route('/api/copilot/chat/stream', methods=['POST'])
+    @jwt_required()
+    def chat_stream():
+        """Send a message to the copilot and stream the response as server-sent events"""
+        user_id = current_user.id
+        data = request.get_json()
+
+        if not data or 'message' not in data:
+            return jsonify({'error': 'Message is required'}), 400
+
+        message = data['message']
+        conversation, history, context = _start_chat_turn(
+            current_user, message, data.get('conversation_id')
+        )
+        if not conversation:
+            return jsonify({'error': 'Conversation not found'}), 404
+
+        def generate():
+            for event in copilot_service.chat_stream(message, history, context, user_id=user_id):
+                if event['type'] == 'done':
+                    # Save the turn once the full response is known
+                    _save_chat_turn(conversation.id, message, event)
+                    event = {
+                        'type': 'done',
+                        'response': event['response'],
+                        'conversation_id': conversation.id,
+                        'success': event.get('success', True),
+                        'partial': event.get('partial', False)
+                    }
+                yield f"data: {json.dumps(event)}\n\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/api/copilot/conversations', methods=['GET'])
     @jwt_required()
     def get_conversations():
-        """Get all conversations for the current user"""
+        """Get the current user's conversations, most recently active first"""
         user_id = int(get_jwt_identity())
+        page = request.args.get('page', 1, type=int)
+        per_page = min(
+            request.args.get('per_page', app.config['CONVERSATIONS_PAGE_SIZE'], type=int),
+            app.config['MAX_PAGE_SIZE']
+        )
+
         conversations = Conversation.query.filter_by(user_id=user_id)\
-            .order_by(Conversation.updated_at.desc()).all()
+            .order_by(Conversation.updated_at.desc(), Conversation.id.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False)
 
         return jsonify({
-            'conversations': [
-                {
-                    'id': c.id,
-                    'title': c.title,
-                    'updated_at': c.updated_at.isoformat(),
-                    'message_count': len(c.messages)
-                }
-                for c in conversations
-            ]
+            'conversations': [c.to_summary_dict() for c in conversations.items],
+            'page': conversations.page,
+            'per_page': conversations.per_page,
+            'total': conversations.total,
+            'has_next': conversations.has_next
         }), 200
 
+    @app.route('/api/copilot/conversations/export', methods=['GET'])
+    @jwt_required()
+    def export_conversations():
+        """Export the full transcripts of the current user's conversations as CSV or NDJSON"""
+        user_id = int(get_jwt_identity())
+        fmt = request.args.get('format', 'csv')
+
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        return _export_response(transcript_rows(user_id), TRANSCRIPT_FIELDS, fmt, 'conversaciones')
+
     @app.route('/api/copilot/conversations/<int:id>', methods=['GET'])
     @jwt_required()
     def get_conversation(id):
@@ -233,21 +393,104 @@ def create_app(config_name=None):
 
     # ==================== Client Management Routes ====================
 
+    def _search_clients(query, user_id, search_term, limit):
+        """
+        The best matches of a search term among a promotor's clients, as one page
+
+        Names, businesses and notes are matched through the full-text index
+        and emails by substring; full-text matches come first, by rank.
+        """
+        matchers = [Client.email.icontains(search_term, autoescape=True)]
+        ranked_ids = []
+        if search_index.available:
+            ranked_ids = [c['id'] for c in search_index.search(user_id, search_term, 'clients', limit)['clients']]
+            matchers.append(Client.id.in_(ranked_ids))
+        else:
+            matchers += [Client.name.icontains(search_term, autoescape=True),
+                         Client.business_name.icontains(search_term, autoescape=True)]
+
+        clients = query.filter(or_(*matchers)).limit(limit).all()
+        rank = {client_id: i for i, client_id in enumerate(ranked_ids)}
+        return sorted(clients, key=lambda c: rank.get(c.id, len(rank)))
+
     @app.route('/api/clients', methods=['GET'])
     @jwt_required()
     def get_clients():
-        """Get all clients for the current promotor"""
+        """Get a page of clients for the current promotor"""
         user_id = int(get_jwt_identity())
         status = request.args.get('status')
+        sort = request.args.get('sort', 'created_at')
+        limit = min(
+            max(request.args.get('limit', app.config['CLIENTS_PAGE_SIZE'], type=int), 1),
+            app.config['MAX_PAGE_SIZE']
+        )
+
+        if sort not in CLIENT_SORTS:
+            return jsonify({'error': f"sort must be one of: {', '.join(CLIENT_SORTS)}"}), 400
+
+        column, nullable, default_order = CLIENT_SORTS[sort]
+        descending = request.args.get('order', default_order) == 'desc'
+
+        fields = None
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = set(fields) - set(CLIENT_FIELDS)
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
 
         query = Client.query.filter_by(promotor_id=user_id)
         if status:
             query = query.filter_by(status=status)
 
-        clients = query.order_by(Client.created_at.desc()).all()
+        # The first page is one index range; later pages may span the NULL range too
+        filters = [None]
+        if request.args.get('cursor'):
+            try:
+                value, last_id = decode_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            filters = keyset_filters(column, Client.id, value, last_id, descending, nullable)
+
+        if fields:
+            # Load only the projected columns plus what the cursor needs
+            loaded = set(fields) | {'id', sort}
+            query = query.options(load_only(*[getattr(Client, f) for f in loaded]))
+
+        search_term = request.args.get('q', '').strip()
+        if search_term:
+            clients = _search_clients(query, user_id, search_term, limit)
+            return jsonify({
+                'clients': [c.to_dict(fields) for c in clients],
+                'next_cursor': None,
+                'has_more': False
+            }), 200
+
+        # Sort on the raw column so the (promotor_id, column, id) index gives the order
+        if descending:
+            order = (column.desc().nulls_last(), Client.id.desc())
+        else:
+            order = (column.asc().nulls_first(), Client.id.asc())
+
+        clients = []
+        for condition in filters:
+            segment = query if condition is None else query.filter(condition)
+            clients += segment.order_by(*order).limit(limit + 1 - len(clients)).all()
+            if len(clients) > limit:
+                break
+
+        # The extra row only tells whether there is a next page
+        has_more = len(clients) > limit
+        clients = clients[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = clients[-1]
+            next_cursor = encode_cursor(getattr(last, sort), last.id)
 
         return jsonify({
-            'clients': [c.to_dict() for c in clients]
+            'clients': [c.to_dict(fields) for c in clients],
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }), 200
 
     @app.route('/api/clients', methods=['POST'])
@@ -271,15 +514,8 @@ def create_app(config_name=None):
             notes=data.get('notes')
         )
 
+        # The promotor's active client count is adjusted at flush (see stats.py)
         db.session.add(client)
-
-        # Update promotor's active client count
-        user = User.query.get(user_id)
-        user.clientes_activos = Client.query.filter_by(
-            promotor_id=user_id,
-            status='activo'
-        ).count() + (1 if data.get('status') == 'activo' else 0)
-
         db.session.commit()
 
         return jsonify({
@@ -287,6 +523,47 @@ def create_app(config_name=None):
             'client': client.to_dict()
         }), 201
 
+    @app.route('/api/clients/export', methods=['GET'])
+    @jwt_required()
+    def export_clients():
+        """Export all clients of the current promotor as CSV or NDJSON"""
+        user_id = int(get_jwt_identity())
+        fmt = request.args.get('format', 'csv')
+
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        return _export_response(client_rows(user_id), CLIENT_FIELDS, fmt, 'clientes')
+
+    @app.route('/api/clients/import', methods=['POST'])
+    @jwt_required()
+    def upload_clients():
+        """Import clients from a CSV or NDJSON upload"""
+        user_id = int(get_jwt_identity())
+
+        # Multipart uploads are spooled to disk by Werkzeug; raw bodies are read as they arrive
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        filename = (upload.filename if upload else '') or ''
+
+        fmt = request.args.get('format')
+        if not fmt:
+            if filename.endswith(('.ndjson', '.jsonl')) or request.mimetype == 'application/x-ndjson':
+                fmt = 'ndjson'
+            else:
+                fmt = 'csv'
+
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+
+        batch_size = request.args.get('batch_size', app.config['IMPORT_BATCH_SIZE'], type=int)
+        report = import_clients(user_id, stream, fmt, max(batch_size, 1))
+
+        return jsonify({
+            'message': 'Import finished',
+            **report
+        }), 200
+
     @app.route('/api/clients/<int:id>', methods=['GET'])
     @jwt_required()
     def get_client(id):
@@ -327,13 +604,7 @@ def create_app(config_name=None):
             client.notes = data['notes']
 
         client.last_contact = datetime.utcnow()
-
-        # Update promotor's active client count
-        user = User.query.get(user_id)
-        user.clientes_activos = Client.query.filter_by(
-            promotor_id=user_id,
-            status='activo'
-        ).count()
+        result_cache.invalidate(f'client:{client.id}')
 
         db.session.commit()
 
@@ -353,13 +624,7 @@ def create_app(config_name=None):
             return jsonify({'error': 'Client not found'}), 404
 
         db.session.delete(client)
-
-        # Update promotor's active client count
-        user = User.query.get(user_id)
-        user.clientes_activos = Client.query.filter_by(
-            promotor_id=user_id,
-            status='activo'
-        ).count()
+        result_cache.invalidate(f'client:{client.id}')
 
         db.session.commit()
 
@@ -385,15 +650,16 @@ def create_app(config_name=None):
         if not client:
             return jsonify({'error': 'Client not found'}), 404
 
-        result = copilot_service.generate_client_message(
-            data['message_type'],
-            client.to_dict()
-        )
+        client_info = client.to_dict()
 
-        return jsonify({
-            'message': result['response'],
-            'success': result.get('success', True)
-        }), 200
+        def run():
+            result = cached_generate_message(data['message_type'], client_info, user_id)
+            return {
+                'message': result['response'],
+                'success': result.get('success', True)
+            }
+
+        return _run_or_enqueue(user_id, 'generate_message', data, run)
 
     @app.route('/api/copilot/analyze-opportunity', methods=['POST'])
     @jwt_required()
@@ -413,13 +679,177 @@ def create_app(config_name=None):
         if not client:
             return jsonify({'error': 'Client not found'}), 404
 
-        result = copilot_service.analyze_opportunity(client.to_dict())
+        client_info = client.to_dict()
+
+        def run():
+            result = cached_analyze_opportunity(client_info, user_id)
+            return {
+                'analysis': result['response'],
+                'success': result.get('success', True)
+            }
+
+        return _run_or_enqueue(user_id, 'analyze_opportunity', data, run)
+
+    @app.route('/api/copilot/tasks/<task_id>', methods=['GET'])
+    @jwt_required()
+    def get_task(task_id):
+        """Get the status and result of a background copilot task"""
+        user_id = int(get_jwt_identity())
+        task = AITask.query.filter_by(id=task_id, user_id=user_id).first()
+
+        if not task:
+            return jsonify({'error': 'Task not found'}), 404
+
+        task_queue.fail_if_orphaned(task)
+        return jsonify({'task': task.to_dict()}), 200
+
+    # ==================== Bulk AI Jobs ====================
+
+    @app.route('/api/copilot/jobs', methods=['POST'])
+    @jwt_required()
+    def create_job():
+        """Start a bulk AI job over many clients"""
+        user_id = int(get_jwt_identity())
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('client_ids'), list) \
+                or not data['client_ids'] or 'operation' not in data:
+            return jsonify({'error': 'client_ids and operation are required'}), 400
+
+        if data['operation'] not in CLIENT_OPERATIONS:
+            return jsonify({'error': f"operation must be one of: {', '.join(CLIENT_OPERATIONS)}"}), 400
+
+        if data['operation'] == 'generate_message' and not data.get('message_type'):
+            return jsonify({'error': 'message_type is required for generate_message'}), 400
+
+        client_ids = set(data['client_ids'])
+        if len(client_ids) > app.config['AI_JOB_MAX_CLIENTS']:
+            return jsonify({'error': f"At most {app.config['AI_JOB_MAX_CLIENTS']} clients per job"}), 400
+
+        clients = {
+            c.id: c.to_dict()
+            for c in Client.query.filter(
+                Client.promotor_id == user_id,
+                Client.id.in_(client_ids)
+            )
+        }
+
+        if not clients:
+            return jsonify({'error': 'Client not found'}), 404
+
+        job = AIJob(
+            user_id=user_id,
+            operation=data['operation'],
+            message_type=data.get('message_type'),
+            status='running',
+            total=len(clients),
+            runner=job_runner.runner_id
+        )
+        db.session.add(job)
+        db.session.flush()
+
+        for client_id in clients:
+            db.session.add(AIJobResult(job_id=job.id, client_id=client_id))
+        db.session.commit()
+
+        job_runner.submit(job, clients)
 
         return jsonify({
-            'analysis': result['response'],
-            'success': result.get('success', True)
+            'message': 'Job started',
+            'job': job.to_dict(),
+            'not_found': sorted(client_ids - set(clients))
+        }), 202
+
+    @app.route('/api/copilot/jobs/<int:id>', methods=['GET'])
+    @jwt_required()
+    def get_job(id):
+        """Get the progress and results of a bulk AI job"""
+        user_id = int(get_jwt_identity())
+        job = AIJob.query.filter_by(id=id, user_id=user_id).first()
+
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        job_runner.fail_if_orphaned(job)
+
+        return jsonify({
+            'job': job.to_dict(),
+            'results': [r.to_dict() for r in job.results]
         }), 200
 
+    @app.route('/api/copilot/jobs/<int:id>/stream', methods=['GET'])
+    @jwt_required()
+    def stream_job(id):
+        """Stream the results of a bulk AI job as server-sent events as they finish"""
+        user_id = int(get_jwt_identity())
+        job = AIJob.query.filter_by(id=id, user_id=user_id).first()
+
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        def generate():
+            seen = set()
+            deadline = time.monotonic() + app.config['AI_JOB_STREAM_MAX_SECONDS']
+            while True:
+                job = AIJob.query.get(id)
+                job_runner.fail_if_orphaned(job)
+                finished = AIJobResult.query.filter(
+                    AIJobResult.job_id == id,
+                    AIJobResult.status != 'pending'
+                ).all()
+
+                for result in finished:
+                    if result.id not in seen:
+                        seen.add(result.id)
+                        yield f"data: {json.dumps({'type': 'result', **result.to_dict()})}\n\n"
+
+                if job.status in ('completed', 'failed'):
+                    yield f"data: {json.dumps({'type': 'done', 'job': job.to_dict()})}\n\n"
+                    return
+
+                # Do not hold a worker forever; the client reconnects to keep following the job
+                if time.monotonic() >= deadline:
+                    yield f"data: {json.dumps({'type': 'timeout', 'job': job.to_dict()})}\n\n"
+                    return
+
+                yield f"data: {json.dumps({'type': 'progress', 'job': job.to_dict()})}\n\n"
+
+                # Release the connection between polls so job workers can write
+                db.session.close()
+                time.sleep(app.config['AI_JOB_POLL_INTERVAL'])
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    # ==================== Search ====================
+
+    @app.route('/api/search', methods=['GET'])
+    @jwt_required()
+    def search():
+        """Full-text search over the promotor's clients and conversation messages"""
+        user_id = int(get_jwt_identity())
+
+        query = request.args.get('q', '').strip()
+        types = request.args.get('type', 'all')
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        if types not in SEARCH_TYPES:
+            return jsonify({'error': f"type must be one of: {', '.join(SEARCH_TYPES)}"}), 400
+        if not search_index.available:
+            return jsonify({'error': 'Search is not available for this database'}), 503
+
+        limit = min(
+            max(request.args.get('limit', app.config['SEARCH_RESULTS_LIMIT'], type=int), 1),
+            app.config['MAX_PAGE_SIZE']
+        )
+
+        results = search_index.search(user_id, query, types, limit)
+
+        return jsonify({'query': query, **results}), 200
+
     # ==================== Dashboard Stats ====================
 
     @app.route('/api/dashboard/stats', methods=['GET'])
@@ -428,36 +858,82 @@ def create_app(config_name=None):
         """Get dashboard statistics for the current promotor"""
         user_id = int(get_jwt_identity())
 
-        total_clients = Client.query.filter_by(promotor_id=user_id).count()
-        active_clients = Client.query.filter_by(
-            promotor_id=user_id,
-            status='activo'
-        ).count()
-        prospects = Client.query.filter_by(
-            promotor_id=user_id,
-            status='prospecto'
-        ).count()
-        conversations = Conversation.query.filter_by(user_id=user_id).count()
+        stats = get_promotor_stats(user_id)
 
-        return jsonify({
-            'stats': {
-                'total_clients': total_clients,
-                'active_clients': active_clients,
-                'prospects': prospects,
-                'conversations': conversations
-            }
-        }), 200
+        return jsonify({'stats': stats.to_dict()}), 200
 
     # ==================== Health Check ====================
 
+    def _metrics_token_valid():
+        """
+        Whether the request carries METRICS_TOKEN as its Bearer token
+
+        The metrics carry per-promotor labels, so without a token they are
+        only served in development.
+        """
+        token = app.config['METRICS_TOKEN']
+        if not token:
+            return app.debug
+        return request.headers.get('Authorization') == f'Bearer {token}'
+
+    @app.route('/api/auth/metrics', methods=['GET'])
+    def auth_metrics():
+        """Password hashing pool metrics, for sizing BCRYPT_MAX_WORKERS and timeouts"""
+        if not _metrics_token_valid():
+            return jsonify({'error': 'Invalid metrics token'}), 401
+
+        return jsonify({'password_hasher': password_hasher.metrics()}), 200
+
+    @app.route('/api/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Copilot, LLM and password hashing metrics in the Prometheus text format"""
+        if not _metrics_token_valid():
+            return jsonify({'error': 'Invalid metrics token'}), 401
+
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
     @app.route('/api/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
         return jsonify({
             'status': 'healthy',
-            'service': 'EFEX Promotor Copilot API'
+            'service': 'EFEX Promotor Copilot API',
+            'bedrock': copilot_service.gateway.status(),
+            'semantic_cache': semantic_cache.stats()
         }), 200
 
+    # ==================== CLI Commands ====================
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--dry-run', is_flag=True, help='Report drift without fixing it')
+    def reconcile_stats_command(dry_run):
+        """Check every promotor's counters against a true count and fix drift"""
+        drifted = 0
+        for user in User.query.all():
+            stats = PromotorStats.query.get(user.id)
+            before = (user.clientes_activos, stats.to_dict() if stats else None)
+
+            stats = reconcile_promotor_stats(user.id)
+            after = (user.clientes_activos, stats.to_dict())
+
+            if before != after:
+                drifted += 1
+                click.echo(f"Promotor {user.id}: clientes_activos {before[0]} -> {after[0]}, "
+                           f"stats {before[1]} -> {after[1]}")
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        click.echo(f"{drifted} promotor(s) with drifted counters"
+                   f"{' (not fixed, dry run)' if dry_run else ' reconciled'}")
+
+    @app.cli.command('ingest-knowledge')
+    def ingest_knowledge_command():
+        """Rebuild the knowledge base index from KNOWLEDGE_DIR"""
+        result = knowledge_base.setup(force=True)
+        click.echo(f"{result['chunks']} chunks from {result['documents']} documents in {knowledge_base.source_dir}")
+
     return app
 
 
@@ -0,0 +1,290 @@
+"""
+Bedrock gateway for EFEX Promotor Copilot
+Wraps the bedrock-runtime client with a sized connection pool, per-call
+deadlines, jittered retries limited by a retry budget, a circuit breaker
+per model and optional failover to a secondary model
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import boto3
+from botocore.config import Config as BotocoreConfig
+from botocore.exceptions import (
+    ClientError, ConnectionClosedError, ConnectTimeoutError,
+    EndpointConnectionError, ReadTimeoutError
+)
+
+from config import Config
+
+# Bedrock error codes worth retrying; anything else is the caller's fault
+RETRYABLE_ERROR_CODES = {
+    'ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException',
+    'InternalServerException', 'ModelNotReadyException', 'ModelTimeoutException'
+}
+RETRYABLE_EXCEPTIONS = (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)
+
+# Retry budget: each retry spends RETRY_COST tokens and each success refunds
+# one, so sustained failures stop retrying instead of multiplying the load
+RETRY_COST = 5
+
+
+class BedrockUnavailable(Exception):
+    """Raised when no model could serve a call: breakers open, deadline passed or retries spent"""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in RETRYABLE_ERROR_CODES
+    return isinstance(error, RETRYABLE_EXCEPTIONS)
+
+
+def create_bedrock_client():
+    """Create the bedrock-runtime client, or None if it cannot be initialized"""
+    client_config = BotocoreConfig(
+        max_pool_connections=Config.BEDROCK_MAX_POOL_CONNECTIONS,
+        connect_timeout=Config.BEDROCK_CONNECT_TIMEOUT,
+        read_timeout=Config.BEDROCK_READ_TIMEOUT,
+        # Retries are done by the gateway, within the call deadline
+        retries={'total_max_attempts': 1, 'mode': 'standard'},
+        tcp_keepalive=True
+    )
+    try:
+        if Config.AWS_ACCESS_KEY_ID and Config.AWS_SECRET_ACCESS_KEY:
+            # Build credentials dict
+            credentials = {
+                'aws_access_key_id': Config.AWS_ACCESS_KEY_ID,
+                'aws_secret_access_key': Config.AWS_SECRET_ACCESS_KEY
+            }
+
+            # Add session token if present (for temporary credentials)
+            if Config.AWS_SESSION_TOKEN:
+                credentials['aws_session_token'] = Config.AWS_SESSION_TOKEN
+
+            client = boto3.client(
+                'bedrock-runtime',
+                region_name=Config.AWS_REGION,
+                config=client_config,
+                **credentials
+            )
+            print(f"Bedrock client initialized with explicit credentials for region: {Config.AWS_REGION}")
+        else:
+            # Use default credentials (IAM role, environment, etc.)
+            client = boto3.client(
+                'bedrock-runtime',
+                region_name=Config.AWS_REGION,
+                config=client_config
+            )
+            print(f"Bedrock client initialized with default credentials")
+        return client
+    except Exception as e:
+        print(f"Warning: Could not initialize Bedrock client: {e}")
+        return None
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker for one model
+
+    Opens when at least failure_ratio of the last window calls failed or were
+    slower than slow_call seconds; after cooldown seconds one trial call is
+    let through, and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, window: int, min_calls: int, failure_ratio: float,
+                 slow_call: float, cooldown: float):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.state = 'closed'  # closed, open, half_open
+        self._outcomes = deque(maxlen=window)  # True for a failed or slow call
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                # Let a single trial call through
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record(self, success: bool, duration: float):
+        with self._lock:
+            failed = not success or duration > self.slow_call
+            if self.state == 'half_open':
+                if failed:
+                    self._open()
+                else:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if (self.state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio):
+                self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        print(f"Bedrock circuit breaker opened for {self.cooldown:g}s")
+
+
+class BedrockGateway:
+    """Resilient access to Bedrock models for the copilot service"""
+
+    def __init__(self, client=None, fallback_model_id: str = None):
+        self.client = client
+        self.fallback_model_id = fallback_model_id or None
+        self._breakers = {}
+        self._retry_tokens = float(Config.BEDROCK_RETRY_BUDGET)
+        self._lock = threading.Lock()
+
+    def breaker(self, model_id: str) -> CircuitBreaker:
+        with self._lock:
+            if model_id not in self._breakers:
+                self._breakers[model_id] = CircuitBreaker(
+                    Config.BEDROCK_BREAKER_WINDOW,
+                    Config.BEDROCK_BREAKER_MIN_CALLS,
+                    Config.BEDROCK_BREAKER_FAILURE_RATIO,
+                    Config.BEDROCK_BREAKER_SLOW_CALL,
+                    Config.BEDROCK_BREAKER_COOLDOWN
+                )
+            return self._breakers[model_id]
+
+    def invoke(self, model_id: str, body: dict) -> tuple:
+        """
+        Invoke a model, retrying and failing over as needed
+
+        Returns:
+            (parsed response body, id of the model that answered)
+        """
+        def call(model):
+            response = self.client.invoke_model(
+                modelId=model,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+            return json.loads(response['body'].read())
+
+        return self._call_with_failover(model_id, call)
+
+    def invoke_stream(self, model_id: str, body: dict) -> tuple:
+        """
+        Open a response stream, retrying and failing over until the first byte
+
+        Errors after the stream started are recorded on the breaker and raised.
+
+        Returns:
+            (iterator of decoded stream payloads, id of the model that answered)
+        """
+        def call(model):
+            return self.client.invoke_model_with_response_stream(
+                modelId=model,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+
+        response, model = self._call_with_failover(model_id, call)
+        return self._stream_payloads(response['body'], model), model
+
+    def _stream_payloads(self, events, model: str):
+        started_at = time.monotonic()
+        try:
+            for event in events:
+                chunk = event.get('chunk')
+                if chunk:
+                    yield json.loads(chunk['bytes'])
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker(model).record(False, time.monotonic() - started_at)
+            raise
+
+    def _call_with_failover(self, model_id: str, call) -> tuple:
+        """Try the requested model, then the fallback model if it is configured"""
+        deadline = time.monotonic() + Config.BEDROCK_CALL_DEADLINE
+        models = [model_id]
+        if self.fallback_model_id and self.fallback_model_id != model_id:
+            models.append(self.fallback_model_id)
+
+        last_error = None
+        for model in models:
+            if not self.breaker(model).allow():
+                last_error = BedrockUnavailable(f'Circuit open for {model}')
+                continue
+            try:
+                return self._call_with_retries(model, call, deadline), model
+            except BedrockUnavailable as e:
+                last_error = e
+                print(f"Bedrock model {model} unavailable: {e}")
+
+        raise last_error
+
+    def _call_with_retries(self, model: str, call, deadline: float):
+        """Call one model with jittered exponential backoff until the deadline"""
+        breaker = self.breaker(model)
+        for attempt in range(Config.BEDROCK_MAX_ATTEMPTS):
+            started_at = time.monotonic()
+            try:
+                result = call(model)
+            except Exception as e:
+                duration = time.monotonic() - started_at
+                if not is_retryable(e):
+                    # The model answered; a bad request says nothing against its health
+                    breaker.record(True, duration)
+                    raise
+                breaker.record(False, duration)
+                last_error = e
+            else:
+                breaker.record(True, time.monotonic() - started_at)
+                self._refund_retry_token()
+                return result
+
+            if attempt + 1 == Config.BEDROCK_MAX_ATTEMPTS:
+                break
+            # Full jitter spreads retries from many workers over the backoff window
+            delay = random.uniform(0, min(
+                Config.BEDROCK_RETRY_MAX_DELAY,
+                Config.BEDROCK_RETRY_BASE_DELAY * 2 ** attempt
+            ))
+            if time.monotonic() + delay >= deadline:
+                raise BedrockUnavailable(f'Deadline exceeded: {last_error}')
+            if not breaker.allow():
+                raise BedrockUnavailable(f'Circuit opened: {last_error}')
+            if not self._spend_retry_tokens():
+                raise BedrockUnavailable(f'Retry budget exhausted: {last_error}')
+            time.sleep(delay)
+
+        raise BedrockUnavailable(f'Retries exhausted: {last_error}')
+
+    def _spend_retry_tokens(self) -> bool:
+        with self._lock:
+            if self._retry_tokens < RETRY_COST:
+                return False
+            self._retry_tokens -= RETRY_COST
+            return True
+
+    def _refund_retry_token(self):
+        with self._lock:
+            self._retry_tokens = min(self._retry_tokens + 1, Config.BEDROCK_RETRY_BUDGET)
+
+    def status(self) -> dict:
+        """Breaker state per model and the remaining retry budget"""
+        with self._lock:
+            breakers = dict(self._breakers)
+            retry_tokens = self._retry_tokens
+        return {
+            'breakers': {model: breaker.state for model, breaker in breakers.items()},
+            'fallback_model_id': self.fallback_model_id,
+            'retry_tokens': retry_tokens
+        }
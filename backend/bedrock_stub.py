@@ -0,0 +1,117 @@
+"""
+Local Bedrock stand-in for EFEX Promotor Copilot
+Implements the two bedrock-runtime calls the gateway uses, with simulated
+latency, token streaming, throttles and server errors, so the gateway and
+the app can be exercised offline:
+
+    from bedrock_stub import StubBedrockClient
+    copilot_service.client = StubBedrockClient(median_latency=0.8, throttle_rate=0.2)
+"""
+import io
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+DEFAULT_RESPONSE = (
+    "Claro, para abrir una cuenta EFEX el cliente necesita acta constitutiva, RFC, "
+    "comprobante de domicilio e identificacion oficial del representante legal."
+)
+
+
+class StubBedrockClient:
+    """Fake bedrock-runtime client with configurable latency and failure injection"""
+
+    def __init__(self, median_latency: float = 0.0, latency_sigma: float = 0.5,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 token_delay: float = 0.0, response_text: str = DEFAULT_RESPONSE,
+                 failing_models: tuple = (), throttle_first: int = 0, seed: int = None):
+        """
+        Args:
+            median_latency: Median seconds before the response (lognormal distribution)
+            latency_sigma: Spread of the latency distribution
+            throttle_rate: Fraction of calls that raise ThrottlingException
+            error_rate: Fraction of calls that raise ServiceUnavailableException
+            token_delay: Seconds between streamed text fragments
+            response_text: Text of every response
+            failing_models: Model ids whose calls always fail with ServiceUnavailableException
+            throttle_first: Number of initial calls that raise ThrottlingException
+            seed: Random seed for reproducible runs
+        """
+        self.median_latency = median_latency
+        self.latency_sigma = latency_sigma
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.token_delay = token_delay
+        self.response_text = response_text
+        self.failing_models = set(failing_models)
+        self.throttle_first = throttle_first
+        self.calls = Counter()  # (model_id, outcome) -> count
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate(self, operation: str, model_id: str):
+        """Sleep for a sampled latency, then maybe raise an injected error"""
+        with self._lock:
+            roll = self._random.random()
+            throttled = self.throttle_first > 0
+            self.throttle_first -= throttled
+            latency = (
+                self._random.lognormvariate(math.log(self.median_latency), self.latency_sigma)
+                if self.median_latency > 0 else 0.0
+            )
+        time.sleep(latency)
+
+        if model_id in self.failing_models or roll < self.error_rate:
+            outcome, code = 'error', 'ServiceUnavailableException'
+        elif throttled or roll < self.error_rate + self.throttle_rate:
+            outcome, code = 'throttled', 'ThrottlingException'
+        else:
+            outcome, code = 'ok', None
+
+        with self._lock:
+            self.calls[(model_id, outcome)] += 1
+        if code:
+            raise ClientError({'Error': {'Code': code, 'Message': f'Injected {code}'}}, operation)
+
+    def _usage(self, body: dict) -> dict:
+        prompt = json.dumps(body.get('system', '')) + json.dumps(body.get('messages', []))
+        return {
+            'input_tokens': len(prompt) // 4 + 1,
+            'output_tokens': len(self.response_text) // 4 + 1
+        }
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> dict:
+        self._simulate('InvokeModel', modelId)
+        payload = {
+            'content': [{'type': 'text', 'text': self.response_text}],
+            'usage': self._usage(json.loads(body)),
+            'stop_reason': 'end_turn'
+        }
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> dict:
+        self._simulate('InvokeModelWithResponseStream', modelId)
+        usage = self._usage(json.loads(body))
+
+        def events():
+            yield self._event({'type': 'message_start',
+                               'message': {'usage': {'input_tokens': usage['input_tokens']}}})
+            for word in self.response_text.split(' '):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                yield self._event({'type': 'content_block_delta',
+                                   'delta': {'type': 'text_delta', 'text': word + ' '}})
+            yield self._event({'type': 'message_delta',
+                               'usage': {'output_tokens': usage['output_tokens']}})
+            yield self._event({'type': 'message_stop'})
+
+        return {'body': events()}
+
+    @staticmethod
+    def _event(payload: dict) -> dict:
+        return {'chunk': {'bytes': json.dumps(payload).encode('utf-8')}}
@@ -0,0 +1,354 @@
+"""
+Offline load benchmark for EFEX Promotor Copilot
+Seeds a scratch SQLite database, replaces Bedrock with the local stub, and
+drives mixed promotor traffic through the Flask test client from many
+threads. Reports latency percentiles, throughput and SQL queries per route
+and saves them as JSON so runs can be compared between releases.
+
+Usage:
+    python benchmark.py [--concurrency 16] [--duration 30] [--output results.json]
+    python benchmark.py --compare baseline.json [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Weighted actions a virtual promotor picks from, roughly the frontend's mix
+TRAFFIC_MIX = {
+    'login': 2,
+    'me': 5,
+    'dashboard': 15,
+    'list_clients': 20,
+    'get_client': 10,
+    'client_crud': 6,
+    'search': 5,
+    'list_conversations': 10,
+    'get_conversation': 7,
+    'chat': 12,
+    'chat_stream': 8,
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RouteStats:
+    """Latencies, statuses and SQL counts recorded for each route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.first_byte = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.queries = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route: str, latency: float, status: int, queries: int, first_byte: float = None):
+        with self._lock:
+            self.latencies[route].append(latency)
+            self.statuses[route][status] += 1
+            self.queries[route] += queries
+            if first_byte is not None:
+                self.first_byte[route].append(first_byte)
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.latencies):
+            latencies = sorted(self.latencies[route])
+            count = len(latencies)
+            statuses = self.statuses[route]
+            routes[route] = {
+                'requests': count,
+                'throughput_rps': round(count / elapsed, 2),
+                'errors': sum(n for status, n in statuses.items() if status >= 500 or status == 0),
+                'statuses': {str(status): n for status, n in sorted(statuses.items())},
+                'mean_ms': round(sum(latencies) / count * 1000, 2),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+                'sql_queries_per_request': round(self.queries[route] / count, 2),
+            }
+            if self.first_byte[route]:
+                first_byte = sorted(self.first_byte[route])
+                routes[route]['first_byte_p50_ms'] = round(percentile(first_byte, 0.50) * 1000, 2)
+                routes[route]['first_byte_p95_ms'] = round(percentile(first_byte, 0.95) * 1000, 2)
+
+        all_latencies = sorted(l for latencies in self.latencies.values() for l in latencies)
+        total = {
+            'requests': len(all_latencies),
+            'throughput_rps': round(len(all_latencies) / elapsed, 2),
+            'errors': sum(route['errors'] for route in routes.values()),
+            'p50_ms': round(percentile(all_latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(all_latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(all_latencies, 0.99) * 1000, 2),
+        }
+        return {'total': total, 'routes': routes}
+
+
+class VirtualPromotor:
+    """One simulated promotor issuing requests until the deadline"""
+
+    def __init__(self, client, email: str, password: str, stats: RouteStats,
+                 query_counter: threading.local, rng: random.Random, record_after: float):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.stats = stats
+        self.query_counter = query_counter
+        self.rng = rng
+        self.record_after = record_after
+        self.headers = {}
+        self.client_ids = []
+        self.conversation_ids = []
+        self.actions = list(TRAFFIC_MIX)
+        self.weights = [TRAFFIC_MIX[action] for action in self.actions]
+
+    def request(self, route: str, method: str, path: str, stream: bool = False, **kwargs):
+        """Issue one request and record its latency and SQL count under route"""
+        self.query_counter.count = 0
+        first_byte = None
+        started_at = time.perf_counter()
+        try:
+            response = self.client.open(path, method=method, headers=self.headers,
+                                        buffered=not stream, **kwargs)
+            if stream:
+                for chunk in response.response:
+                    if first_byte is None and chunk:
+                        first_byte = time.perf_counter() - started_at
+                response.close()
+            status = response.status_code
+        except Exception as e:
+            print(f'{route} raised {e!r}')
+            response, status = None, 0
+        latency = time.perf_counter() - started_at
+
+        if started_at >= self.record_after:
+            self.stats.record(route, latency, status, self.query_counter.count, first_byte)
+        return response
+
+    def login(self):
+        response = self.request('login', 'POST', '/api/auth/login',
+                                json={'email': self.email, 'password': self.password})
+        token = response.get_json()['access_token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def run(self, deadline: float):
+        self.login()
+        page = self.request('list_clients', 'GET', '/api/clients', query_string={'limit': 50}).get_json()
+        self.client_ids = [client['id'] for client in page['clients']]
+        conversations = self.request('list_conversations', 'GET', '/api/copilot/conversations').get_json()
+        self.conversation_ids = [conversation['id'] for conversation in conversations['conversations']]
+
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            getattr(self, f'do_{action}')()
+
+    def do_login(self):
+        self.login()
+
+    def do_me(self):
+        self.request('me', 'GET', '/api/auth/me')
+
+    def do_dashboard(self):
+        self.request('dashboard', 'GET', '/api/dashboard/stats')
+
+    def do_list_clients(self):
+        sort = self.rng.choice(('created_at', 'last_contact', 'name', 'status'))
+        self.request('list_clients', 'GET', '/api/clients', query_string={'sort': sort, 'limit': 20})
+
+    def do_get_client(self):
+        if self.client_ids:
+            self.request('get_client', 'GET', f'/api/clients/{self.rng.choice(self.client_ids)}')
+
+    def do_client_crud(self):
+        response = self.request('create_client', 'POST', '/api/clients', json={
+            'name': 'Cliente Benchmark', 'business_type': 'Logistica', 'status': 'prospecto'
+        })
+        if response is None or response.status_code != 201:
+            return
+        client_id = response.get_json()['client']['id']
+        self.request('update_client', 'PUT', f'/api/clients/{client_id}', json={'status': 'activo'})
+        self.request('delete_client', 'DELETE', f'/api/clients/{client_id}')
+
+    def do_search(self):
+        query = self.rng.choice(('autopartes', 'logistica', 'proveedores', 'acta'))
+        self.request('search', 'GET', '/api/search', query_string={'q': query})
+
+    def do_list_conversations(self):
+        self.request('list_conversations', 'GET', '/api/copilot/conversations')
+
+    def do_get_conversation(self):
+        if self.conversation_ids:
+            self.request('get_conversation', 'GET',
+                         f'/api/copilot/conversations/{self.rng.choice(self.conversation_ids)}')
+
+    def _chat_body(self) -> dict:
+        body = {'message': self.rng.choice((
+            'Que requisitos necesita un cliente para abrir cuenta?',
+            'Dame un plan de seguimiento para mis prospectos',
+            'Cuales son las comisiones por transferencia?',
+        ))}
+        if self.conversation_ids and self.rng.random() < 0.7:
+            body['conversation_id'] = self.rng.choice(self.conversation_ids)
+        return body
+
+    def do_chat(self):
+        self.request('chat', 'POST', '/api/copilot/chat', json=self._chat_body())
+
+    def do_chat_stream(self):
+        self.request('chat_stream', 'POST', '/api/copilot/chat/stream', stream=True, json=self._chat_body())
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Print per-route deltas and return the routes whose p95 or throughput regressed"""
+    regressions = []
+    print(f"\n{'route':<20} {'p95 base':>10} {'p95 now':>10} {'rps base':>10} {'rps now':>10}")
+    for route, now in current['routes'].items():
+        base = baseline['routes'].get(route)
+        if not base:
+            print(f"{route:<20} {'-':>10} {now['p95_ms']:>10} {'-':>10} {now['throughput_rps']:>10}")
+            continue
+        print(f"{route:<20} {base['p95_ms']:>10} {now['p95_ms']:>10} "
+              f"{base['throughput_rps']:>10} {now['throughput_rps']:>10}")
+        if now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now['sql_queries_per_request'] > base['sql_queries_per_request'] + 0.5:
+            regressions.append(f"{route}: queries/request {base['sql_queries_per_request']} -> "
+                               f"{now['sql_queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive mixed traffic against a seeded app with a stubbed Bedrock')
+    parser.add_argument('--promotors', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=500, help='clients per promotor')
+    parser.add_argument('--conversations', type=int, default=50, help='conversations per promotor')
+    parser.add_argument('--messages', type=int, default=10, help='messages per conversation')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous virtual promotors')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured traffic')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured traffic first')
+    parser.add_argument('--bedrock-latency', type=float, default=0.8, help='median stub latency in seconds')
+    parser.add_argument('--bedrock-sigma', type=float, default=0.5)
+    parser.add_argument('--throttle-rate', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--token-delay', type=float, default=0.01, help='seconds between streamed fragments')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON file for the results (default: benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth before failing')
+    args = parser.parse_args()
+
+    # The app reads DATABASE_URL at import time, so point it at a scratch database first
+    workdir = tempfile.mkdtemp(prefix='efex-benchmark-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import create_app
+    from ai_service import copilot_service
+    from bedrock_stub import StubBedrockClient
+    from models import db
+    from seed import seed_database
+
+    stub = StubBedrockClient(
+        median_latency=args.bedrock_latency, latency_sigma=args.bedrock_sigma,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+        token_delay=args.token_delay, seed=args.seed
+    )
+    copilot_service.client = stub
+    app = create_app()
+
+    with app.app_context():
+        print(f'Seeding {args.promotors} promotors x {args.clients} clients, '
+              f'{args.conversations} conversations x {args.messages} messages...')
+        emails = seed_database(args.promotors, args.clients, args.conversations, args.messages,
+                               seed=args.seed)
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    # Requests run on the calling thread, so a thread-local counts each request's SQL
+    query_counter = threading.local()
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        query_counter.count = getattr(query_counter, 'count', 0) + 1
+
+    stats = RouteStats()
+    started_at = time.perf_counter()
+    record_after = started_at + args.warmup
+    deadline = record_after + args.duration
+    promotors = [
+        VirtualPromotor(app.test_client(), emails[n % len(emails)], 'password123', stats,
+                        query_counter, random.Random(args.seed + n), record_after)
+        for n in range(args.concurrency)
+    ]
+    threads = [threading.Thread(target=promotor.run, args=(deadline,)) for promotor in promotors]
+
+    print(f'Running {args.concurrency} virtual promotors for {args.warmup:g}s warmup + {args.duration:g}s...')
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - record_after
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'elapsed_seconds': round(elapsed, 2),
+            'args': vars(args),
+        },
+        **stats.summary(elapsed),
+        'bedrock_stub_calls': {f'{model}:{outcome}': n for (model, outcome), n in stub.calls.items()},
+    }
+
+    print(f"\n{'route':<20} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql/req':>8} {'errors':>6}")
+    for route, row in results['routes'].items():
+        print(f"{route:<20} {row['requests']:>6} {row['throughput_rps']:>8} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['sql_queries_per_request']:>8} {row['errors']:>6}")
+    total = results['total']
+    print(f"{'total':<20} {total['requests']:>6} {total['throughput_rps']:>8} {total['p50_ms']:>8} "
+          f"{total['p95_ms']:>8} {total['p99_ms']:>8} {'':>8} {total['errors']:>6}")
+
+    output = args.output or f"benchmark-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults saved to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s):')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print('\nNo regressions')
+
+
+if __name__ == '__main__':
+    main()
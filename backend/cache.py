@@ -0,0 +1,240 @@
+"""
+Result cache for EFEX Promotor Copilot AI tools
+Caches Bedrock results keyed on the request inputs, with TTL and LRU
+eviction, and collapses concurrent identical requests into one call
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import Config
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache, private to each worker"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at, tag)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: dict, ttl: int, tag: str = None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl, tag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tag(self, tag: str):
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2] == tag]:
+                del self._entries[key]
+
+    def acquire_lease(self, key: str, timeout: float) -> bool:
+        # Concurrent requests in this process are already collapsed by ResultCache
+        return True
+
+    def release_lease(self, key: str):
+        pass
+
+
+class SQLiteCacheBackend:
+    """LRU cache in a local SQLite file, shared by all workers on the host"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, tag TEXT, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_result_cache_tag ON result_cache (tag)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_result_cache_last_access ON result_cache (last_access)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache_leases ('
+                'key TEXT PRIMARY KEY, expires_at REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM result_cache WHERE key = ? AND expires_at >= ?',
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE result_cache SET last_access = ? WHERE key = ?', (now, key))
+            return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: int, tag: str = None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO result_cache (key, value, tag, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, json.dumps(value), tag, now + ttl, now)
+            )
+            conn.execute('DELETE FROM result_cache WHERE expires_at < ?', (now,))
+            conn.execute(
+                'DELETE FROM result_cache WHERE key IN ('
+                'SELECT key FROM result_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def invalidate_tag(self, tag: str):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM result_cache WHERE tag = ?', (tag,))
+
+    def acquire_lease(self, key: str, timeout: float) -> bool:
+        """Claim the right to compute a key; only one worker holds it at a time"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM result_cache_leases WHERE key = ? AND expires_at < ?',
+                (key, now)
+            )
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO result_cache_leases (key, expires_at) VALUES (?, ?)',
+                (key, now + timeout)
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, key: str):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM result_cache_leases WHERE key = ?', (key,))
+
+
+class _Flight:
+    """A computation in progress that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ResultCache:
+    """Caches successful AI results and deduplicates concurrent identical requests"""
+
+    def __init__(self, backend, ttl: int, wait_timeout: float = 120.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint: str, variant: str, client_info: dict, fields: tuple,
+                 model_id: str) -> str:
+        """Build a cache key from the request inputs that affect the result"""
+        relevant = {field: client_info.get(field) for field in fields}
+        fingerprint = hashlib.sha256(
+            json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        return f"{endpoint}:{variant or ''}:{fingerprint}:{model_id}"
+
+    def get_or_compute(self, key: str, compute, tag: str = None) -> dict:
+        """
+        Return the cached result for key, computing it at most once
+
+        Args:
+            key: Cache key built with make_key()
+            compute: Callable returning the service result dict
+            tag: Invalidation tag, e.g. 'client:42'
+
+        Returns:
+            The result dict; only successful Bedrock results are cached
+        """
+        cached = self.backend.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            # An identical request is already calling Bedrock in this process
+            if flight.done.wait(self.wait_timeout) and flight.result is not None:
+                return flight.result
+            return compute()
+
+        try:
+            flight.result = self._compute_once(key, compute, tag)
+            return flight.result
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _compute_once(self, key: str, compute, tag: str) -> dict:
+        """Compute a result, waiting on another worker that already holds the lease"""
+        deadline = time.time() + self.wait_timeout
+        while not self.backend.acquire_lease(key, self.wait_timeout):
+            time.sleep(0.1)
+            cached = self.backend.get(key)
+            if cached is not None:
+                return cached
+            if time.time() > deadline:
+                return compute()
+
+        try:
+            # Another worker may have finished between our miss and the lease
+            cached = self.backend.get(key)
+            if cached is not None:
+                return cached
+
+            result = compute()
+            if result.get('success', True) and not result.get('mock'):
+                self.backend.set(key, result, self.ttl, tag)
+            return result
+        finally:
+            self.backend.release_lease(key)
+
+    def invalidate(self, tag: str):
+        """Drop every cached result with the given tag"""
+        self.backend.invalidate_tag(tag)
+
+
+def create_result_cache() -> ResultCache:
+    """Create the result cache with the backend selected in Config"""
+    if Config.RESULT_CACHE_BACKEND == 'sqlite':
+        backend = SQLiteCacheBackend(Config.RESULT_CACHE_PATH, Config.RESULT_CACHE_MAX_ENTRIES)
+    else:
+        backend = MemoryCacheBackend(Config.RESULT_CACHE_MAX_ENTRIES)
+    return ResultCache(backend, Config.RESULT_CACHE_TTL)
+
+
+# Singleton instance
+result_cache = create_result_cache()
@@ -2,6 +2,8 @@ import os
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from database import engine_options, REPLICA_BIND_KEY
+
 load_dotenv()
 
 class Config:
@@ -14,6 +16,39 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///efex_promotors.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite: WAL deja leer mientras otro worker escribe; los escritores esperan busy_timeout ms
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    # Bases de datos de servidor (PostgreSQL, MySQL): conexiones por worker
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    # Segundos antes de reciclar una conexion (menor que el idle timeout del servidor)
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    # Replica de solo lectura opcional; las peticiones GET leen de ella hasta que escriben
+    DATABASE_READ_URL = os.getenv('DATABASE_READ_URL', '')
+
+    # Identity
+    # Segundos que cada worker guarda is_active / clientes_activos de un usuario
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000'))
+
+    # Password Hashing
+    # Costo de bcrypt; al cambiarlo, los hashes existentes se regeneran en el siguiente login
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    # Hilos dedicados a bcrypt y operaciones en espera antes de responder 503
+    BCRYPT_MAX_WORKERS = int(os.getenv('BCRYPT_MAX_WORKERS', '4'))
+    BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', '32'))
+    BCRYPT_QUEUE_TIMEOUT = float(os.getenv('BCRYPT_QUEUE_TIMEOUT', '2.0'))
+    # Segundos de calculo de un hash; el cliente recibe 503 tras BCRYPT_QUEUE_TIMEOUT + este tiempo
+    BCRYPT_COMPUTE_TIMEOUT = float(os.getenv('BCRYPT_COMPUTE_TIMEOUT', '1.0'))
+
+    # Metrics
+    # Token Bearer para /api/metrics y /api/auth/metrics; vacio los deja abiertos solo en desarrollo
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
     # AWS Bedrock Configuration
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
@@ -25,6 +60,197 @@ class Config:
     #           'us.anthropic.claude-3-5-sonnet-20241022-v2:0' (cross-region inference profile)
     CLAUDE_MODEL_ID = os.getenv('CLAUDE_MODEL_ID', 'us.anthropic.claude-3-5-sonnet-20241022-v2:0')
 
+    # Modelo rapido para tareas cortas (mensajes, resumenes, preguntas simples)
+    CLAUDE_FAST_MODEL_ID = os.getenv('CLAUDE_FAST_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+
+    # Bedrock Gateway
+    # Modelo secundario (mas rapido) al que se recurre si el principal falla o su circuito esta abierto
+    BEDROCK_FALLBACK_MODEL_ID = os.getenv('BEDROCK_FALLBACK_MODEL_ID', '')
+    # Conexiones HTTP por proceso; debe cubrir los hilos de peticiones, AI_TASK_MAX_WORKERS y AI_JOB_MAX_WORKERS
+    BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', '50'))
+    BEDROCK_CONNECT_TIMEOUT = float(os.getenv('BEDROCK_CONNECT_TIMEOUT', '5'))
+    BEDROCK_READ_TIMEOUT = float(os.getenv('BEDROCK_READ_TIMEOUT', '60'))
+    # Tiempo maximo de una llamada incluyendo reintentos (no se inicia un reintento que lo exceda)
+    BEDROCK_CALL_DEADLINE = float(os.getenv('BEDROCK_CALL_DEADLINE', '90'))
+    BEDROCK_MAX_ATTEMPTS = int(os.getenv('BEDROCK_MAX_ATTEMPTS', '4'))
+    BEDROCK_RETRY_BASE_DELAY = float(os.getenv('BEDROCK_RETRY_BASE_DELAY', '0.5'))
+    BEDROCK_RETRY_MAX_DELAY = float(os.getenv('BEDROCK_RETRY_MAX_DELAY', '8'))
+    # Fichas de reintento por proceso: cada reintento gasta 5 y cada exito devuelve 1
+    BEDROCK_RETRY_BUDGET = int(os.getenv('BEDROCK_RETRY_BUDGET', '100'))
+    # Circuit breaker: se abre si BEDROCK_BREAKER_FAILURE_RATIO de las ultimas llamadas fallaron o
+    # tardaron mas de BEDROCK_BREAKER_SLOW_CALL segundos, y prueba de nuevo tras BEDROCK_BREAKER_COOLDOWN
+    BEDROCK_BREAKER_WINDOW = int(os.getenv('BEDROCK_BREAKER_WINDOW', '20'))
+    BEDROCK_BREAKER_MIN_CALLS = int(os.getenv('BEDROCK_BREAKER_MIN_CALLS', '10'))
+    BEDROCK_BREAKER_FAILURE_RATIO = float(os.getenv('BEDROCK_BREAKER_FAILURE_RATIO', '0.5'))
+    BEDROCK_BREAKER_SLOW_CALL = float(os.getenv('BEDROCK_BREAKER_SLOW_CALL', '30'))
+    BEDROCK_BREAKER_COOLDOWN = float(os.getenv('BEDROCK_BREAKER_COOLDOWN', '30'))
+
+    # Prompt caching del system prompt estatico en Bedrock (solo rutas con prompt_cache); Bedrock
+    # ignora prefijos de menos de 1024 tokens (2048 en Haiku), ver routing.PROMPT_CACHE_MIN_TOKENS
+    PROMPT_CACHING_ENABLED = os.getenv('PROMPT_CACHING_ENABLED', 'true').lower() == 'true'
+
+    # Conversation History
+    # Presupuesto de tokens de entrada para el historial (resumen + turnos recientes)
+    HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '6000'))
+    # Numero de turnos (pregunta + respuesta) que se envian sin resumir
+    HISTORY_RECENT_TURNS = int(os.getenv('HISTORY_RECENT_TURNS', '6'))
+    HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv('HISTORY_SUMMARY_MAX_TOKENS', '512'))
+    # Turnos que salen de la ventana antes de resumirlos juntos (una llamada a Bedrock por lote)
+    HISTORY_SUMMARY_BATCH_TURNS = int(os.getenv('HISTORY_SUMMARY_BATCH_TURNS', '4'))
+    # Conversaciones cuyo historial se guarda en memoria por worker
+    HISTORY_CACHE_MAX_ENTRIES = int(os.getenv('HISTORY_CACHE_MAX_ENTRIES', '500'))
+
+    # Model Routing
+    # Modelo, tokens maximos de salida, stop sequences, prompt caching y si se agrega
+    # la base de conocimiento (solo al chat libre) por operacion del copiloto
+    MODEL_ROUTES = {
+        'chat': {
+            'model_id': CLAUDE_MODEL_ID,
+            'max_tokens': int(os.getenv('CHAT_MAX_TOKENS', '2048')),
+            'stop_sequences': [],
+            'prompt_cache': PROMPT_CACHING_ENABLED,
+            'knowledge': True
+        },
+        'chat_fast': {
+            'model_id': CLAUDE_FAST_MODEL_ID,
+            'max_tokens': int(os.getenv('CHAT_FAST_MAX_TOKENS', '1024')),
+            'stop_sequences': [],
+            'prompt_cache': False,
+            'knowledge': True
+        },
+        'generate_message': {
+            'model_id': os.getenv('GENERATE_MESSAGE_MODEL_ID', CLAUDE_FAST_MODEL_ID),
+            'max_tokens': int(os.getenv('GENERATE_MESSAGE_MAX_TOKENS', '700')),
+            # Corta las notas que el modelo suele agregar despues del mensaje
+            'stop_sequences': ['\n---'],
+            'prompt_cache': False,
+            'knowledge': False
+        },
+        'analyze_opportunity': {
+            'model_id': os.getenv('ANALYZE_OPPORTUNITY_MODEL_ID', CLAUDE_MODEL_ID),
+            'max_tokens': int(os.getenv('ANALYZE_OPPORTUNITY_MAX_TOKENS', '1500')),
+            'stop_sequences': [],
+            'prompt_cache': PROMPT_CACHING_ENABLED,
+            'knowledge': False
+        },
+        'summarize': {
+            'model_id': CLAUDE_FAST_MODEL_ID,
+            'max_tokens': HISTORY_SUMMARY_MAX_TOKENS,
+            'stop_sequences': [],
+            'prompt_cache': False,
+            'knowledge': False
+        },
+    }
+    # Clasificador local: preguntas cortas y simples del chat van al modelo rapido
+    FAST_CHAT_ROUTING_ENABLED = os.getenv('FAST_CHAT_ROUTING_ENABLED', 'false').lower() == 'true'
+    FAST_CHAT_MAX_CHARS = int(os.getenv('FAST_CHAT_MAX_CHARS', '200'))
+    # Mensajes previos maximos para considerar un turno como simple
+    FAST_CHAT_MAX_HISTORY = int(os.getenv('FAST_CHAT_MAX_HISTORY', '4'))
+
+    # AI Result Cache (generate-message / analyze-opportunity)
+    # Backend: 'memory' (por worker) o 'sqlite' (compartido entre workers de gunicorn)
+    RESULT_CACHE_BACKEND = os.getenv('RESULT_CACHE_BACKEND', 'memory')
+    RESULT_CACHE_PATH = os.getenv(
+        'RESULT_CACHE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'result_cache.db')
+    )
+    RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '3600'))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '1000'))
+
+    # Semantic Answer Cache (primer turno del chat)
+    # Responde preguntas casi identicas a otras ya contestadas sin llamar a Bedrock
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+    # Similitud coseno minima (0-1) para reutilizar una respuesta
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.8'))
+    SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '86400'))
+    # Preguntas guardadas en total, entre todos los promotores y contextos
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '2000'))
+    SEMANTIC_CACHE_DIMENSIONS = int(os.getenv('SEMANTIC_CACHE_DIMENSIONS', '4096'))
+
+    # Knowledge Base (documentos de producto, tarifas y compliance)
+    KNOWLEDGE_ENABLED = os.getenv('KNOWLEDGE_ENABLED', 'true').lower() == 'true'
+    # Carpeta con documentos .md y .json; el indice se reconstruye al iniciar si cambian
+    KNOWLEDGE_DIR = os.getenv(
+        'KNOWLEDGE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge')
+    )
+    KNOWLEDGE_INDEX_PATH = os.getenv(
+        'KNOWLEDGE_INDEX_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'knowledge.db')
+    )
+    # Caracteres maximos por fragmento indexado
+    KNOWLEDGE_CHUNK_CHARS = int(os.getenv('KNOWLEDGE_CHUNK_CHARS', '800'))
+    # Fragmentos agregados a cada peticion y su tamano total maximo en caracteres
+    KNOWLEDGE_TOP_K = int(os.getenv('KNOWLEDGE_TOP_K', '3'))
+    KNOWLEDGE_MAX_CHARS = int(os.getenv('KNOWLEDGE_MAX_CHARS', '2400'))
+    # Puntaje BM25 minimo de un fragmento; por debajo solo comparte palabras sueltas con la pregunta
+    KNOWLEDGE_MIN_SCORE = float(os.getenv('KNOWLEDGE_MIN_SCORE', '0.5'))
+    # Palabras presentes en mas de esta fraccion de los fragmentos no se buscan
+    KNOWLEDGE_MAX_TERM_FRACTION = float(os.getenv('KNOWLEDGE_MAX_TERM_FRACTION', '0.5'))
+    # Bytes del indice mapeados en memoria por conexion (compartidos entre workers via page cache)
+    KNOWLEDGE_MMAP_SIZE = int(os.getenv('KNOWLEDGE_MMAP_SIZE', str(64 * 1024 * 1024)))
+
+    # Bulk AI Jobs
+    # Llamadas concurrentes a Bedrock por worker para trabajos masivos
+    AI_JOB_MAX_WORKERS = int(os.getenv('AI_JOB_MAX_WORKERS', '8'))
+    AI_JOB_MAX_CLIENTS = int(os.getenv('AI_JOB_MAX_CLIENTS', '500'))
+    AI_JOB_POLL_INTERVAL = float(os.getenv('AI_JOB_POLL_INTERVAL', '1.0'))
+    # Segundos maximos de un stream de progreso; al vencer envia un evento 'timeout' (el cliente reconecta)
+    AI_JOB_STREAM_MAX_SECONDS = int(os.getenv('AI_JOB_STREAM_MAX_SECONDS', '600'))
+    # Un trabajo de otro host sin avances en este tiempo se considera huerfano (su proceso se detuvo)
+    AI_JOB_STALE_AFTER = int(os.getenv('AI_JOB_STALE_AFTER', '900'))
+
+    # Async Copilot Tasks
+    # Pool dedicado para llamadas a Bedrock en modo asincrono (peticion + polling)
+    AI_TASK_MAX_WORKERS = int(os.getenv('AI_TASK_MAX_WORKERS', '16'))
+    # Una tarea de otro host sin terminar en este tiempo se considera huerfana (su proceso se detuvo)
+    AI_TASK_STALE_AFTER = int(os.getenv('AI_TASK_STALE_AFTER', '900'))
+    # Dias que se conservan las tareas en ai_tasks antes de borrarlas
+    AI_TASK_RETENTION_DAYS = int(os.getenv('AI_TASK_RETENTION_DAYS', '7'))
+    # Si es true, las rutas del copiloto encolan por defecto salvo que se envie "async": false
+    COPILOT_ASYNC_DEFAULT = os.getenv('COPILOT_ASYNC_DEFAULT', 'false').lower() == 'true'
+
+    # Dashboard Stats
+    # Segundos entre reconciliaciones de los agregados por promotor
+    STATS_RECONCILE_INTERVAL = int(os.getenv('STATS_RECONCILE_INTERVAL', '3600'))
+
+    # Pagination
+    CLIENTS_PAGE_SIZE = int(os.getenv('CLIENTS_PAGE_SIZE', '50'))
+    CONVERSATIONS_PAGE_SIZE = int(os.getenv('CONVERSATIONS_PAGE_SIZE', '50'))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '200'))
+
+    # Client Import
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+    IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '1000'))
+
+    # Export
+    # Filas leidas de la base y enviadas al cliente por bloque
+    EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '1000'))
+
+    # Search
+    # Resultados maximos por tipo (clientes / mensajes) en /api/search
+    SEARCH_RESULTS_LIMIT = int(os.getenv('SEARCH_RESULTS_LIMIT', '20'))
+
+    # Request Profiling
+    # Si es true, cada peticion mide tiempo y consultas SQL y responde con Server-Timing
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    # Peticiones mas lentas que esto (ms) se registran con su lista de consultas
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+    # Fraccion de peticiones que corren bajo cProfile; el perfil se guarda si resultan lentas
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    # Consultas guardadas por peticion para el registro de peticiones lentas
+    PROFILING_MAX_QUERIES = int(os.getenv('PROFILING_MAX_QUERIES', '100'))
+
+Config.SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI, Config)
+if Config.DATABASE_READ_URL:
+    Config.SQLALCHEMY_BINDS = {
+        REPLICA_BIND_KEY: {
+            'url': Config.DATABASE_READ_URL,
+            **engine_options(Config.DATABASE_READ_URL, Config)
+        }
+    }
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
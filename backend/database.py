@@ -0,0 +1,119 @@
+"""
+Database engine profile for EFEX Promotor Copilot
+SQLite pragmas that let several gunicorn workers read while one writes,
+pool settings for server databases, and optional routing of read-only
+requests to a replica engine
+"""
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+# Bind key of the read-only engine in SQLALCHEMY_BINDS
+REPLICA_BIND_KEY = 'replica'
+# Requests with these methods read from the replica until they write
+READ_METHODS = ('GET', 'HEAD')
+
+
+def is_sqlite(uri: str) -> bool:
+    return uri.startswith('sqlite')
+
+
+def engine_options(uri: str, settings) -> dict:
+    """
+    SQLAlchemy create_engine options for a database URI
+
+    Args:
+        uri: The database URL
+        settings: Object with the DB_POOL_* and SQLITE_* attributes of Config
+    """
+    if is_sqlite(uri):
+        # busy_timeout is also set as a pragma; the driver timeout covers connect itself
+        return {'connect_args': {'timeout': settings.SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        # Replace connections the server closed while they sat in the pool
+        'pool_pre_ping': True,
+    }
+
+
+class SQLitePragmas:
+    """Applies the SQLite pragmas from the app config to every new connection"""
+
+    def __init__(self):
+        self.pragmas = None
+        self._installed = False
+
+    def init_app(self, app):
+        self.pragmas = [
+            ('journal_mode', app.config['SQLITE_JOURNAL_MODE']),
+            ('synchronous', app.config['SQLITE_SYNCHRONOUS']),
+            ('busy_timeout', int(app.config['SQLITE_BUSY_TIMEOUT_MS'])),
+            ('mmap_size', int(app.config['SQLITE_MMAP_SIZE'])),
+        ]
+        if not self._installed:
+            event.listen(Engine, 'connect', self._on_connect)
+            self._installed = True
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        if self.pragmas is None or not type(dbapi_connection).__module__.startswith('sqlite3'):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas:
+                if name == 'journal_mode':
+                    self._set_journal_mode(cursor, value)
+                else:
+                    cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _set_journal_mode(cursor, mode: str):
+        # In-memory databases cannot use WAL, and read-only replicas keep the mode they have
+        if not any(row[2] for row in cursor.execute('PRAGMA database_list')):
+            return
+        try:
+            cursor.execute(f'PRAGMA journal_mode = {mode}')
+        except Exception as e:
+            print(f"Could not set SQLite journal_mode={mode}: {e}")
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of GET requests to the replica engine
+
+    A request switches to the primary for good once it writes (flush or
+    a Core insert/update/delete), so it always reads its own writes. Code
+    that reads rows in order to write values derived from them calls
+    use_primary() first, so it never writes back replica-lagged data.
+    Background threads and non-GET requests always use the primary.
+    """
+
+    def use_primary(self):
+        """Send the rest of this request's queries to the primary, before a read-modify-write"""
+        if has_request_context():
+            g.db_primary = True
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause) -> bool:
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        if g.get('db_primary'):
+            return False
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            g.db_primary = True
+            return False
+        return REPLICA_BIND_KEY in self._db.engines
+
+
+# Singleton instance
+sqlite_pragmas = SQLitePragmas()
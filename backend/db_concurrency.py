@@ -0,0 +1,174 @@
+"""
+Database concurrency check for EFEX Promotor Copilot
+Runs mixed read/write client traffic from several processes (like gunicorn
+workers) against one SQLite file, once with the legacy rollback-journal
+settings and once with the engine profile from Config, and compares
+throughput and errors such as "database is locked". Exits with status 1
+if the profile sees errors or its throughput drops as workers are added
+(up to the number of CPUs).
+
+Usage:
+    python db_concurrency.py [--workers 1,2,4,8] [--duration 10] [--write-ratio 0.3]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Settings of each mode; 'legacy' is SQLite's defaults, as before the engine profile
+MODES = {
+    'legacy': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_MMAP_SIZE': '0'},
+    'profile': {},
+}
+
+# Allowed throughput drop between the smallest and largest worker count, for timing noise
+SCALING_TOLERANCE = 0.1
+
+
+def run_worker(database_path: str, settings: dict, email: str, duration: float,
+               write_ratio: float, seed: int, start_at: float, results):
+    """Drive mixed client traffic from one process until the duration has passed"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    # Spawned processes inherit the parent's legacy settings; each mode starts from Config
+    for key in MODES['legacy']:
+        os.environ.pop(key, None)
+    os.environ.update(settings)
+
+    from app import create_app
+    from ai_service import copilot_service
+
+    copilot_service.client = None
+    app = create_app()
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'email': email, 'password': 'password123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client_ids = [c['id'] for c in client.get('/api/clients', query_string={'limit': 100},
+                                               headers=headers).get_json()['clients']]
+
+    rng = random.Random(seed)
+    reads = writes = errors = 0
+    while time.time() < start_at:
+        time.sleep(0.01)
+    deadline = start_at + duration
+
+    while time.time() < deadline:
+        if rng.random() < write_ratio:
+            if rng.random() < 0.5:
+                response = client.post('/api/clients', json={'name': 'Cliente Concurrencia', 'status': 'prospecto'},
+                                       headers=headers)
+            else:
+                response = client.put(f'/api/clients/{rng.choice(client_ids)}',
+                                      json={'status': rng.choice(('prospecto', 'activo', 'inactivo'))},
+                                      headers=headers)
+            writes += 1
+        else:
+            path = rng.choice(('/api/clients', f'/api/clients/{rng.choice(client_ids)}', '/api/dashboard/stats'))
+            response = client.get(path, headers=headers)
+            reads += 1
+        if response.status_code >= 500:
+            errors += 1
+
+    results.put({'reads': reads, 'writes': writes, 'errors': errors})
+
+
+def run_round(template_path: str, workdir: str, mode: str, workers: int, emails: list, args) -> dict:
+    """Run one mode with a number of worker processes on a fresh copy of the seeded database"""
+    database_path = os.path.join(workdir, f'{mode}-{workers}.db')
+    shutil.copy(template_path, database_path)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    # Leave time for every process to import the app and log in before the clock starts
+    start_at = time.time() + 5 + workers
+    processes = [
+        context.Process(target=run_worker, args=(
+            database_path, MODES[mode], emails[n % len(emails)], args.duration,
+            args.write_ratio, n, start_at, results
+        ))
+        for n in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+
+    totals['ops_per_second'] = round((totals['reads'] + totals['writes']) / args.duration, 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare SQLite throughput and lock errors across worker counts')
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated process counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of traffic per round')
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--promotors', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=500, help='clients per promotor')
+    parser.add_argument('--modes', default='legacy,profile')
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(',')]
+    modes = args.modes.split(',')
+
+    # Seed a template database in the legacy journal mode; each round copies it
+    workdir = tempfile.mkdtemp(prefix='efex-db-concurrency-')
+    template_path = os.path.join(workdir, 'template.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{template_path}'
+    os.environ.update(MODES['legacy'])
+
+    from app import create_app
+    from ai_service import copilot_service
+    from models import db
+    from seed import seed_database
+
+    copilot_service.client = None
+    app = create_app()
+    with app.app_context():
+        print(f'Seeding {args.promotors} promotors x {args.clients} clients...')
+        emails = seed_database(args.promotors, args.clients, 5, 4)
+        db.session.commit()
+        db.engine.dispose()
+
+    rows = {}
+    for mode in modes:
+        for workers in worker_counts:
+            print(f'Running {mode} with {workers} worker(s) for {args.duration:g}s...')
+            rows[(mode, workers)] = run_round(template_path, workdir, mode, workers, emails, args)
+
+    print(f"\n{'mode':<10} {'workers':>7} {'ops/s':>8} {'reads':>7} {'writes':>7} {'errors':>7}")
+    for (mode, workers), row in rows.items():
+        print(f"{mode:<10} {workers:>7} {row['ops_per_second']:>8} {row['reads']:>7} "
+              f"{row['writes']:>7} {row['errors']:>7}")
+
+    if 'profile' not in modes:
+        return
+    failures = []
+    if any(rows[('profile', workers)]['errors'] for workers in worker_counts):
+        failures.append('the engine profile had errors under concurrency')
+
+    # More processes than CPUs cannot add throughput, only contention
+    cpus = os.cpu_count() or 1
+    scaled = [workers for workers in worker_counts if workers <= cpus] or worker_counts[:1]
+    first, last = rows[('profile', scaled[0])], rows[('profile', scaled[-1])]
+    if last['ops_per_second'] < first['ops_per_second'] * (1 - SCALING_TOLERANCE):
+        failures.append(f'throughput fell from {first["ops_per_second"]} ops/s with {scaled[0]} worker(s) '
+                        f'to {last["ops_per_second"]} ops/s with {scaled[-1]}')
+    if cpus < worker_counts[-1]:
+        print(f'\nNote: {cpus} CPU(s); scaling checked up to {scaled[-1]} worker(s)')
+
+    for failure in failures:
+        print(f'\nFAIL: {failure}')
+    if failures:
+        sys.exit(1)
+    print('\nEngine profile scales without errors')
+
+
+if __name__ == '__main__':
+    main()
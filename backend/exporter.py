@@ -0,0 +1,89 @@
+"""
+Streaming export for EFEX Promotor Copilot
+Serializes query results to CSV or NDJSON while they are fetched in
+batches, so exports start immediately and use bounded memory
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from config import Config
+from models import db, Client, Conversation, Message, CLIENT_FIELDS
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Columns of the conversation transcript export, one row per message
+TRANSCRIPT_FIELDS = (
+    'conversation_id', 'conversation_title', 'message_id', 'role', 'content', 'created_at'
+)
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_rows(rows, fields: tuple, fmt: str, chunk_rows: int = None):
+    """
+    Yield CSV or NDJSON text for an iterable of row tuples
+
+    Output is buffered and yielded every chunk_rows rows; the CSV header
+    is yielded on its own so the response starts before the first fetch.
+    """
+    chunk_rows = chunk_rows or Config.EXPORT_CHUNK_ROWS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+
+    if writer:
+        writer.writerow(fields)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        values = [_serialize(value) for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values)), ensure_ascii=False) + '\n')
+
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
+
+
+def client_rows(user_id: int):
+    """Stream a promotor's clients as tuples of CLIENT_FIELDS"""
+    statement = (
+        select(*[getattr(Client, field) for field in CLIENT_FIELDS])
+        .where(Client.promotor_id == user_id)
+        .order_by(Client.created_at.desc(), Client.id.desc())
+        .execution_options(yield_per=Config.EXPORT_CHUNK_ROWS)
+    )
+    return db.session.execute(statement)
+
+
+def transcript_rows(user_id: int):
+    """Stream every message of a promotor's conversations as tuples of TRANSCRIPT_FIELDS"""
+    statement = (
+        select(
+            Conversation.id, Conversation.title,
+            Message.id, Message.role, Message.content, Message.created_at
+        )
+        .join(Message, Message.conversation_id == Conversation.id)
+        .where(Conversation.user_id == user_id)
+        # Follows ix_conversations_user_updated and ix_messages_conversation_created, so no sort step
+        .order_by(Conversation.updated_at.desc(), Conversation.id.desc(), Message.created_at)
+        .execution_options(yield_per=Config.EXPORT_CHUNK_ROWS)
+    )
+    return db.session.execute(statement)
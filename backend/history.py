@@ -0,0 +1,153 @@
+"""
+Conversation history management for EFEX Promotor Copilot
+Keeps the history sent to Bedrock within a token budget by sending the
+most recent turns verbatim and a rolling summary of everything older, and
+caches each active conversation's messages so a turn does not re-read them
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from config import Config
+from models import db, Conversation, Message
+from ai_service import copilot_service
+from routing import estimate_tokens
+
+
+class HistoryCache:
+    """
+    Per-process LRU cache of each conversation's messages as Bedrock-ready dicts
+
+    Entries are appended to as turns are saved and checked against the
+    conversation's denormalized message_count, so turns written by another
+    worker cause a reload instead of a stale history.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # conversation_id -> [{role, content}]
+        self._lock = threading.Lock()
+
+    def messages(self, conversation) -> list:
+        """All messages of a conversation, oldest first [{role, content}]"""
+        expected = conversation.message_count or 0
+        with self._lock:
+            cached = self._entries.get(conversation.id)
+            if cached is not None and len(cached) == expected:
+                self._entries.move_to_end(conversation.id)
+                return list(cached)
+
+        if expected:
+            rows = db.session.query(Message.role, Message.content).filter(
+                Message.conversation_id == conversation.id
+            ).order_by(Message.created_at, Message.id).all()
+            messages = [{'role': role, 'content': content} for role, content in rows]
+        else:
+            messages = []
+
+        with self._lock:
+            self._entries[conversation.id] = messages
+            self._entries.move_to_end(conversation.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return list(messages)
+
+    def append(self, conversation_id: int, messages: list):
+        """Add newly saved messages to a cached conversation"""
+        with self._lock:
+            cached = self._entries.get(conversation_id)
+            if cached is not None:
+                cached.extend(messages)
+
+    def invalidate(self, conversation_id: int):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+
+class ConversationHistoryManager:
+    """Builds a bounded conversation history for each chat turn"""
+
+    def __init__(self, service, token_budget: int = None, recent_turns: int = None,
+                 summary_batch_turns: int = None):
+        self.service = service
+        self.token_budget = token_budget or Config.HISTORY_TOKEN_BUDGET
+        self.recent_turns = recent_turns if recent_turns is not None else Config.HISTORY_RECENT_TURNS
+        self.summary_batch_turns = (summary_batch_turns if summary_batch_turns is not None
+                                    else Config.HISTORY_SUMMARY_BATCH_TURNS)
+
+    def _recent_window_start(self, messages: list, summary: str) -> int:
+        """Index of the first message sent verbatim, shrinking the window to fit the budget"""
+        start = max(len(messages) - self.recent_turns * 2, 0)
+        used = estimate_tokens(summary) + sum(
+            estimate_tokens(msg['content']) for msg in messages[start:]
+        )
+
+        # Drop the oldest verbatim turns until the history fits the budget
+        while start < len(messages) and used > self.token_budget:
+            used -= estimate_tokens(messages[start]['content'])
+            start += 1
+
+        # Bedrock requires the history to start with a user message
+        while start < len(messages) and messages[start]['role'] != 'user':
+            start += 1
+
+        return start
+
+    def _summary_due(self, messages: list, summarized: int, start: int, summary: str) -> bool:
+        """Whether the messages between summarized and start should be folded in now"""
+        if start - summarized >= self.summary_batch_turns * 2:
+            return True
+        used = estimate_tokens(summary) + sum(
+            estimate_tokens(msg['content']) for msg in messages[summarized:]
+        )
+        return used > self.token_budget
+
+    def build_history(self, conversation, messages: list) -> tuple:
+        """
+        Build the history for the next turn of a conversation
+
+        Messages that fall out of the verbatim window are folded into
+        conversation.summary in batches of summary_batch_turns turns, or
+        sooner if keeping them verbatim would exceed the token budget, so
+        most turns make no summary call; the caller commits the change.
+
+        Args:
+            conversation: The Conversation being continued
+            messages: All previous messages, oldest first [{role, content}]
+
+        Returns:
+            (history, summary) where history is the verbatim window
+        """
+        summarized = conversation.summarized_message_count or 0
+        start = max(self._recent_window_start(messages, conversation.summary), summarized)
+
+        # Keep messages that left the window verbatim until a full batch has built up
+        if start > summarized and not self._summary_due(messages, summarized, start, conversation.summary):
+            start = summarized
+
+        # Only the messages that left the window since the last summary are summarized
+        if start > summarized:
+            summary = self.service.summarize_history(
+                conversation.summary,
+                messages[summarized:start],
+                conversation.user_id
+            )
+            if summary is not None:
+                conversation.summary = summary
+                conversation.summarized_message_count = start
+            else:
+                # Keep the unsummarized messages verbatim until the summary succeeds
+                start = summarized
+
+        return messages[start:], conversation.summary
+
+
+@event.listens_for(Conversation, 'after_delete')
+def _invalidate_cached_history(mapper, connection, conversation):
+    history_cache.invalidate(conversation.id)
+
+
+# Singleton instances
+history_manager = ConversationHistoryManager(copilot_service)
+history_cache = HistoryCache(Config.HISTORY_CACHE_MAX_ENTRIES)
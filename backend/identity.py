@@ -0,0 +1,115 @@
+"""
+Caller identity for EFEX Promotor Copilot
+Access tokens carry the promotor's stable profile as claims; the fields
+that change (active flag, active client count) come from a small TTL'd
+per-process cache, so authenticated routes need no User lookup
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from config import Config
+from models import db, User
+
+# Profile fields embedded in access tokens
+IDENTITY_CLAIMS = ('email', 'name', 'role', 'zona', 'created_at')
+
+
+def identity_claims(user) -> dict:
+    """Additional claims for a user's access token"""
+    claims = {claim: getattr(user, claim) for claim in IDENTITY_CLAIMS}
+    claims['created_at'] = user.created_at.isoformat()
+    return claims
+
+
+class Identity:
+    """The authenticated promotor, built from token claims and the user cache"""
+
+    def __init__(self, id: int, email: str, name: str, role: str, zona: str,
+                 created_at: str, clientes_activos: int):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.role = role
+        self.zona = zona
+        self.created_at = created_at
+        self.clientes_activos = clientes_activos
+
+    def to_dict(self):
+        """Same shape as User.to_dict"""
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'role': self.role,
+            'zona': self.zona,
+            'clientes_activos': self.clientes_activos,
+            'created_at': self.created_at
+        }
+
+
+class UserCache:
+    """Per-process LRU cache of the volatile user fields, with a TTL"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (fields, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        """Return {'is_active', 'clientes_activos'} for a user, or None if it does not exist"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] >= time.time():
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        row = db.session.query(User.is_active, User.clientes_activos).filter(User.id == user_id).first()
+        if row is None:
+            return None
+
+        fields = {'is_active': row.is_active, 'clientes_activos': row.clientes_activos or 0}
+        with self._lock:
+            self._entries[user_id] = (fields, time.time() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fields
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def load_identity(jwt_data: dict):
+    """
+    Resolve the caller of a request from its decoded access token
+
+    Returns:
+        The Identity, or None if the user no longer exists or is deactivated
+    """
+    user_id = int(jwt_data['sub'])
+    fields = user_cache.get(user_id)
+    if fields is None or not fields['is_active']:
+        return None
+
+    if all(claim in jwt_data for claim in IDENTITY_CLAIMS):
+        profile = {claim: jwt_data[claim] for claim in IDENTITY_CLAIMS}
+    else:
+        # Tokens issued before these claims were added lack some of them
+        profile = identity_claims(db.session.get(User, user_id))
+
+    return Identity(user_id, clientes_activos=fields['clientes_activos'], **profile)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, user):
+    user_cache.invalidate(user.id)
+
+
+# Singleton instance
+user_cache = UserCache(Config.USER_CACHE_TTL, Config.USER_CACHE_MAX_ENTRIES)
@@ -0,0 +1,145 @@
+"""
+Bulk client import for EFEX Promotor Copilot
+Parses CSV or NDJSON uploads row by row and inserts valid clients in
+batches, so memory use does not depend on the size of the file
+"""
+import csv
+import io
+import json
+from collections import Counter
+
+from config import Config
+from models import db, Client, CLIENT_STATUSES
+from stats import record_inserted_clients
+
+# Client columns that can be set from an import row
+IMPORT_FIELDS = ('name', 'email', 'phone', 'business_name', 'business_type', 'status', 'notes')
+IMPORT_FORMATS = ('csv', 'ndjson')
+# Status of rows that leave it empty, the same as clients created in the app
+DEFAULT_STATUS = Client.__table__.c.status.default.arg
+
+
+def _iter_csv(text_stream):
+    """Yield (row_number, row) from a CSV stream with a header row"""
+    for row_number, row in enumerate(csv.DictReader(text_stream), start=2):
+        yield row_number, row
+
+
+def _iter_ndjson(text_stream):
+    """Yield (row_number, row) from an NDJSON stream, one object per line"""
+    for row_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f'Invalid JSON: {e.msg}')
+            continue
+        yield row_number, row if isinstance(row, dict) else ValueError('Row must be a JSON object')
+
+
+def _validate_row(row) -> tuple:
+    """
+    Return (client values, errors) for one parsed row
+
+    The values always have every IMPORT_FIELDS key, None where the row
+    leaves the field empty: a batch is inserted as one executemany, whose
+    columns are taken from the first row.
+    """
+    if isinstance(row, ValueError):
+        return None, [str(row)]
+
+    values = dict.fromkeys(IMPORT_FIELDS)
+    errors = []
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            continue
+        if not isinstance(value, str):
+            value = str(value)
+
+        max_length = Client.__table__.c[field].type.length
+        if max_length and len(value) > max_length:
+            errors.append(f'{field} exceeds {max_length} characters')
+        values[field] = value
+
+    if values['name'] is None:
+        errors.append('name is required')
+    if values['status'] is None:
+        values['status'] = DEFAULT_STATUS
+    elif values['status'] not in CLIENT_STATUSES:
+        errors.append(f"status must be one of: {', '.join(CLIENT_STATUSES)}")
+    if values['email'] and '@' not in values['email']:
+        errors.append('email is invalid')
+
+    return values, errors
+
+
+def import_clients(user_id: int, stream, fmt: str, batch_size: int = None) -> dict:
+    """
+    Import clients for a promotor from a CSV or NDJSON byte stream
+
+    Valid rows are inserted in batches, each committed in its own
+    transaction; the promotor's counters are updated once at the end.
+
+    Args:
+        user_id: The promotor that will own the clients
+        stream: Binary file-like object with the upload
+        fmt: 'csv' or 'ndjson'
+        batch_size: Rows per INSERT batch (defaults to IMPORT_BATCH_SIZE)
+
+    Returns:
+        dict with 'imported', 'failed' and a per-row 'errors' report
+    """
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    rows = _iter_csv(text_stream) if fmt == 'csv' else _iter_ndjson(text_stream)
+
+    imported = 0
+    failed = 0
+    errors = []
+    status_counts = Counter()
+    batch = []
+
+    def flush_batch():
+        db.session.execute(Client.__table__.insert(), batch)
+        db.session.commit()
+        batch.clear()
+
+    try:
+        for row_number, row in rows:
+            values, row_errors = _validate_row(row)
+            if row_errors:
+                failed += 1
+                # Keep the report bounded too; the count stays exact
+                if len(errors) < Config.IMPORT_MAX_ERRORS:
+                    errors.append({'row': row_number, 'errors': row_errors})
+                continue
+
+            values['promotor_id'] = user_id
+            batch.append(values)
+            status_counts[values['status']] += 1
+            imported += 1
+
+            if len(batch) >= batch_size:
+                flush_batch()
+    except (UnicodeDecodeError, csv.Error) as e:
+        failed += 1
+        errors.append({'row': None, 'errors': [f'Could not read file: {e}']})
+
+    if batch:
+        flush_batch()
+
+    # Bulk inserts bypass the ORM hooks, so update the counters once here
+    if imported:
+        record_inserted_clients(user_id, status_counts)
+        db.session.commit()
+
+    return {
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    }
@@ -0,0 +1,131 @@
+"""
+Bulk AI jobs for EFEX Promotor Copilot
+Runs an AI tool over many clients on a bounded thread pool and persists
+per-client results and progress as each call finishes
+"""
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import Config
+from models import db, AIJob, AIJobResult
+from ai_tools import run_client_operation
+
+# Result text of the items a job lost when its process stopped
+ORPHANED_RESPONSE = 'El trabajo se interrumpio porque el servidor se reinicio. Vuelve a lanzarlo.'
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BulkJobRunner:
+    """Runs bulk AI jobs concurrently, at most max_workers Bedrock calls at a time"""
+
+    def __init__(self, max_workers: int, stale_after: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-job')
+        self.stale_after = stale_after
+        self.app = None
+
+    def init_app(self, app):
+        """Bind the runner to the app whose database stores the results"""
+        self.app = app
+
+    @property
+    def runner_id(self) -> str:
+        # Read per call: gunicorn forks workers after the module is imported
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def is_orphaned(self, job: AIJob) -> bool:
+        """
+        Whether a running job lost the process whose executor was running it
+
+        Jobs started on this host are orphaned once their process is gone;
+        jobs from other hosts once they made no progress for stale_after seconds.
+        """
+        if job.status != 'running':
+            return False
+        host, _, pid = (job.runner or '').rpartition(':')
+        if host == socket.gethostname() and pid.isdigit():
+            return int(pid) != os.getpid() and not process_alive(int(pid))
+        last_progress = job.updated_at or job.created_at
+        return datetime.utcnow() - last_progress > timedelta(seconds=self.stale_after)
+
+    def fail_if_orphaned(self, job: AIJob) -> bool:
+        """Mark an orphaned job and its pending results as failed; returns whether it was"""
+        if not self.is_orphaned(job):
+            return False
+        now = datetime.utcnow()
+        lost = AIJobResult.query.filter_by(job_id=job.id, status='pending').update({
+            'status': 'failed',
+            'response': ORPHANED_RESPONSE,
+            'finished_at': now
+        })
+        AIJob.query.filter_by(id=job.id).update({
+            AIJob.failed: AIJob.failed + lost,
+            AIJob.status: 'failed',
+            AIJob.finished_at: now
+        })
+        db.session.commit()
+        db.session.refresh(job)
+        print(f"Bulk job {job.id} lost its runner {job.runner}; {lost} pending item(s) marked failed")
+        return True
+
+    def fail_orphaned_jobs(self) -> int:
+        """Fail the running jobs left behind by stopped processes, e.g. at startup after a restart"""
+        return sum(self.fail_if_orphaned(job) for job in AIJob.query.filter_by(status='running').all())
+
+    def submit(self, job: AIJob, clients: dict):
+        """
+        Start a job that has already been committed with its pending results
+        and runner_id as its runner
+
+        Args:
+            job: The AIJob to run
+            clients: Client dicts keyed by client id
+        """
+        for result in job.results:
+            self.executor.submit(
+                self._run_item, job.id, result.id, job.operation,
+                job.message_type, clients[result.client_id], job.user_id
+            )
+
+    def _run_item(self, job_id: int, result_id: int, operation: str,
+                  message_type: str, client_info: dict, user_id: int):
+        """Run the operation for one client and record the outcome"""
+        try:
+            outcome = run_client_operation(operation, client_info, message_type, user_id)
+        except Exception as e:
+            print(f"Error in bulk job {job_id} for client {client_info['id']}: {e}")
+            outcome = {'success': False, 'response': str(e)}
+
+        succeeded = outcome.get('success', True)
+        counter = AIJob.completed if succeeded else AIJob.failed
+
+        with self.app.app_context():
+            AIJobResult.query.filter_by(id=result_id).update({
+                'status': 'completed' if succeeded else 'failed',
+                'response': outcome['response'],
+                'finished_at': datetime.utcnow()
+            })
+            # Increment in SQL so concurrent items do not lose updates
+            AIJob.query.filter_by(id=job_id).update({counter: counter + 1, 'updated_at': datetime.utcnow()})
+            db.session.commit()
+
+            job = AIJob.query.get(job_id)
+            if job.status == 'running' and job.completed + job.failed >= job.total:
+                job.status = 'completed'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+
+
+# Singleton instance
+job_runner = BulkJobRunner(Config.AI_JOB_MAX_WORKERS, Config.AI_JOB_STALE_AFTER)
@@ -0,0 +1,333 @@
+"""
+Product knowledge base for EFEX Promotor Copilot
+Chunks the markdown and JSON product documents in KNOWLEDGE_DIR into a
+local SQLite FTS5 index ranked by BM25, memory-mapped by every worker, and
+retrieves the few chunks relevant to each copilot request so the prompt
+stays the same size however large the knowledge base grows
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from config import Config
+from routing import normalize_text
+from semantic_cache import STOPWORDS
+
+KNOWLEDGE_EXTENSIONS = ('.md', '.markdown', '.json')
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+# Words shorter than this are mostly articles and prepositions; BM25 gains nothing from them
+MIN_QUERY_TOKEN_LENGTH = 3
+QUERY_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Heading matches count more than body matches
+BM25_WEIGHTS = (0.0, 4.0, 1.0)  # source (unindexed), heading, content
+
+
+def _split_text(text: str, max_chars: int) -> list:
+    """Split text into pieces of at most max_chars, on paragraphs, then sentences, then words"""
+    pieces, current = [], ''
+    for paragraph in re.split(r'\n\s*\n', text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > max_chars:
+            units = SENTENCE_PATTERN.split(paragraph)
+        else:
+            units = [paragraph]
+
+        for i, unit in enumerate(units):
+            while len(unit) > max_chars:
+                cut = unit.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    pieces.append(current)
+                    current = ''
+                pieces.append(unit[:cut].strip())
+                unit = unit[cut:].strip()
+            separator = '\n\n' if i == 0 else ' '
+            if current and len(current) + len(separator) + len(unit) > max_chars:
+                pieces.append(current)
+                current = ''
+            current = f'{current}{separator}{unit}' if current else unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(text: str, title: str, max_chars: int) -> list:
+    """Split a markdown document into (heading path, text) chunks, one or more per section"""
+    chunks = []
+    headings = []
+    lines = []
+
+    def flush():
+        body = '\n'.join(lines).strip()
+        if body:
+            heading = ' > '.join([title] + [h for _, h in headings if h != title])
+            chunks.extend((heading, piece) for piece in _split_text(body, max_chars))
+        lines.clear()
+
+    for line in text.splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            headings = [(l, h) for l, h in headings if l < level] + [(level, match.group(2))]
+        else:
+            lines.append(line)
+    flush()
+    return chunks
+
+
+def _render_json(value, indent: str = '') -> str:
+    """Readable 'key: value' text for a JSON value"""
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                lines.append(f'{indent}{key}:')
+                lines.append(_render_json(item, indent + '  '))
+            else:
+                lines.append(f'{indent}{key}: {item}')
+        return '\n'.join(lines)
+    if isinstance(value, list):
+        return '\n'.join(
+            _render_json(item, indent + '  ') if isinstance(item, (dict, list)) else f'{indent}- {item}'
+            for item in value
+        )
+    return f'{indent}{value}'
+
+
+def chunk_json(data, title: str, max_chars: int) -> list:
+    """
+    Split a JSON document into (heading, text) chunks
+
+    A list yields one chunk per item and an object one chunk per key; items
+    shaped like {"title": ..., "content": ...} keep their own title.
+    """
+    items = data.items() if isinstance(data, dict) else enumerate(data if isinstance(data, list) else [data])
+    chunks = []
+    for key, item in items:
+        if isinstance(item, dict) and 'content' in item:
+            heading = f"{title} > {item.get('title', key)}"
+            body = item['content'] if isinstance(item['content'], str) else _render_json(item['content'])
+        elif isinstance(item, dict):
+            heading = f"{title} > {item.get('title') or item.get('name') or key}"
+            body = _render_json(item)
+        else:
+            heading = title if isinstance(key, int) else f'{title} > {key}'
+            body = item if isinstance(item, str) else _render_json(item)
+        chunks.extend((heading, piece) for piece in _split_text(body, max_chars))
+    return chunks
+
+
+class KnowledgeBase:
+    """BM25 retrieval over the product documents, from an index file built at startup"""
+
+    def __init__(self, source_dir: str, index_path: str, enabled: bool, chunk_chars: int,
+                 top_k: int, max_chars: int, mmap_size: int, min_score: float = 0.0,
+                 max_term_fraction: float = 1.0):
+        self.source_dir = source_dir
+        self.index_path = index_path
+        self.enabled = enabled
+        self.chunk_chars = chunk_chars
+        self.top_k = top_k
+        self.max_chars = max_chars
+        self.mmap_size = mmap_size
+        self.min_score = min_score
+        self.max_term_fraction = max_term_fraction
+        self.common_terms = frozenset()
+        self.available = False
+
+    @contextmanager
+    def _connect(self, path: str = None, readonly: bool = True):
+        path = path or self.index_path
+        if readonly:
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=10)
+        else:
+            conn = sqlite3.connect(path, timeout=10)
+        try:
+            conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _source_files(self) -> list:
+        if not os.path.isdir(self.source_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.source_dir):
+            for name in names:
+                if name.lower().endswith(KNOWLEDGE_EXTENSIONS):
+                    files.append(os.path.join(root, name))
+        return sorted(files)
+
+    def _fingerprint(self, files: list) -> str:
+        """Hash of the document paths and contents plus the chunking settings"""
+        digest = hashlib.sha256(str(self.chunk_chars).encode('utf-8'))
+        for path in files:
+            digest.update(os.path.relpath(path, self.source_dir).encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def _indexed_fingerprint(self) -> str:
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM knowledge_meta WHERE key = 'fingerprint'").fetchone()
+                return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def load_chunks(self, files: list) -> list:
+        """(source, heading, text) for every chunk of every document"""
+        chunks = []
+        for path in files:
+            source = os.path.relpath(path, self.source_dir)
+            title = os.path.splitext(os.path.basename(path))[0].replace('_', ' ').replace('-', ' ')
+            try:
+                with open(path, encoding='utf-8') as f:
+                    if path.lower().endswith('.json'):
+                        document = chunk_json(json.load(f), title, self.chunk_chars)
+                    else:
+                        document = chunk_markdown(f.read(), title, self.chunk_chars)
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                print(f"Knowledge: skipping {source}: {e}")
+                continue
+            chunks.extend((source, heading, text) for heading, text in document)
+        return chunks
+
+    def setup(self, force: bool = False) -> dict:
+        """
+        Rebuild the index if the documents changed since it was built
+
+        Returns:
+            {'documents', 'chunks', 'rebuilt'}
+        """
+        self.available = False
+        if not self.enabled:
+            return {'documents': 0, 'chunks': 0, 'rebuilt': False}
+
+        files = self._source_files()
+        fingerprint = self._fingerprint(files)
+        rebuilt = force or fingerprint != self._indexed_fingerprint()
+        if rebuilt:
+            self._build(files, fingerprint)
+
+        with self._connect() as conn:
+            chunk_count = conn.execute('SELECT count(*) FROM knowledge_chunks').fetchone()[0]
+            self.common_terms = self._load_common_terms(conn, chunk_count)
+        self.available = chunk_count > 0
+        if rebuilt:
+            print(f"Knowledge: indexed {chunk_count} chunks from {len(files)} documents")
+        return {'documents': len(files), 'chunks': chunk_count, 'rebuilt': rebuilt}
+
+    def _build(self, files: list, fingerprint: str):
+        """Write the index to a scratch file and swap it in, so readers never see a partial index"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        scratch_path = f'{self.index_path}.{os.getpid()}.tmp'
+        if os.path.exists(scratch_path):
+            os.remove(scratch_path)
+
+        chunks = self.load_chunks(files)
+        with self._connect(scratch_path, readonly=False) as conn:
+            conn.execute(
+                "CREATE VIRTUAL TABLE knowledge_chunks USING fts5("
+                "source UNINDEXED, heading, content, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            conn.execute('CREATE TABLE knowledge_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.executemany('INSERT INTO knowledge_chunks (source, heading, content) VALUES (?, ?, ?)', chunks)
+            conn.execute("INSERT INTO knowledge_chunks (knowledge_chunks) VALUES ('optimize')")
+            conn.executemany('INSERT INTO knowledge_meta (key, value) VALUES (?, ?)', [
+                ('fingerprint', fingerprint),
+                ('built_at', str(time.time())),
+            ])
+        os.replace(scratch_path, self.index_path)
+
+    def _load_common_terms(self, conn, chunk_count: int) -> frozenset:
+        """Indexed terms found in more than max_term_fraction of the chunks"""
+        conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS temp.knowledge_vocab '
+                     'USING fts5vocab(main, knowledge_chunks, row)')
+        rows = conn.execute('SELECT term FROM temp.knowledge_vocab WHERE doc > ?',
+                            (self.max_term_fraction * chunk_count,)).fetchall()
+        return frozenset(term for term, in rows)
+
+    def _match_query(self, question: str) -> str:
+        """
+        Any distinctive word of the question may match; BM25 ranks chunks matching more
+
+        Stopwords and terms found in most chunks (the product name, the
+        document title in every heading) are left out: they would make
+        every chunk a match for any question.
+        """
+        tokens = set()
+        for token in QUERY_TOKEN_PATTERN.findall(normalize_text(question)):
+            if len(token) >= MIN_QUERY_TOKEN_LENGTH and token not in STOPWORDS \
+                    and token not in self.common_terms:
+                tokens.add(token)
+        return ' OR '.join(f'"{token}"' for token in sorted(tokens))
+
+    def retrieve(self, question: str, top_k: int = None) -> list:
+        """
+        Find the chunks most relevant to a question, within the character budget
+
+        Chunks scoring below min_score share only incidental words with the
+        question and are not returned.
+
+        Returns:
+            [{'source', 'heading', 'content', 'score'}], best first
+        """
+        if not self.available:
+            return []
+        match = self._match_query(question)
+        if not match:
+            return []
+
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f'SELECT source, heading, content, bm25(knowledge_chunks, {weights}) AS rank '
+                    f'FROM knowledge_chunks WHERE knowledge_chunks MATCH ? ORDER BY rank LIMIT ?',
+                    (match, top_k or self.top_k)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Knowledge retrieval failed: {e}")
+            return []
+
+        results, used = [], 0
+        for source, heading, content, rank in rows:
+            if -rank < self.min_score:
+                break
+            if results and used + len(content) > self.max_chars:
+                break
+            used += len(content)
+            results.append({'source': source, 'heading': heading, 'content': content,
+                            'score': round(-rank, 4)})
+        return results
+
+    @staticmethod
+    def format_chunks(chunks: list) -> str:
+        """Render retrieved chunks for the system prompt"""
+        return '\n\n'.join(f"### {chunk['heading']}\n{chunk['content']}" for chunk in chunks)
+
+
+# Singleton instance
+knowledge_base = KnowledgeBase(
+    Config.KNOWLEDGE_DIR,
+    Config.KNOWLEDGE_INDEX_PATH,
+    Config.KNOWLEDGE_ENABLED,
+    Config.KNOWLEDGE_CHUNK_CHARS,
+    Config.KNOWLEDGE_TOP_K,
+    Config.KNOWLEDGE_MAX_CHARS,
+    Config.KNOWLEDGE_MMAP_SIZE,
+    Config.KNOWLEDGE_MIN_SCORE,
+    Config.KNOWLEDGE_MAX_TERM_FRACTION
+)
@@ -0,0 +1,144 @@
+"""
+In-process metrics for EFEX Promotor Copilot
+Thread-safe counters and latency histograms that the services record into
+and /api/metrics exposes in the Prometheus text format, so pool sizes,
+timeouts and Bedrock quotas can be planned from real numbers
+"""
+import threading
+
+# Upper bounds in seconds, Prometheus-style cumulative buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative histogram of observed values"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+
+    def snapshot(self) -> dict:
+        """Count, sum and cumulative count per upper bound"""
+        with self._lock:
+            return {
+                'count': self._count,
+                'sum': round(self._sum, 6),
+                'buckets': dict(zip(self.buckets, self._counts))
+            }
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metric:
+    """A named metric with one series per combination of label values"""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def series(self) -> dict:
+        """Current value of every series, keyed by label values"""
+        with self._lock:
+            return dict(self._series)
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for key, value in sorted(self.series().items()):
+            lines.extend(self._render_series(dict(zip(self.labels, key)), value))
+        return lines
+
+
+class CounterMetric(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, labels: dict, value) -> list:
+        return [f'{self.name}{_format_labels(labels)} {value}']
+
+
+class HistogramMetric(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def _render_series(self, labels: dict, histogram) -> list:
+        snapshot = histogram.snapshot()
+        lines = [
+            f'{self.name}_bucket{_format_labels({**labels, "le": bound})} {count}'
+            for bound, count in snapshot['buckets'].items()
+        ]
+        lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": "+Inf"})} {snapshot["count"]}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {snapshot["sum"]}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {snapshot["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered together for scraping"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> CounterMetric:
+        metric = CounterMetric(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> HistogramMetric:
+        metric = HistogramMetric(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton instance
+registry = MetricsRegistry()
@@ -0,0 +1,57 @@
+"""
+Schema upgrades for existing EFEX Promotor Copilot databases
+db.create_all() only creates missing tables, so columns and indexes added
+to the models after a database was created are added here
+"""
+from sqlalchemy import inspect, text
+
+from models import db, MESSAGE_PREVIEW_LENGTH
+
+# Statements that fill a newly added column from existing data
+BACKFILLS = {
+    ('conversations', 'message_count'): (
+        'UPDATE conversations SET message_count = '
+        '(SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id)'
+    ),
+    ('conversations', 'last_message_at'): (
+        'UPDATE conversations SET last_message_at = '
+        '(SELECT MAX(created_at) FROM messages WHERE messages.conversation_id = conversations.id)'
+    ),
+    ('conversations', 'last_message_preview'): (
+        f'UPDATE conversations SET last_message_preview = '
+        f'(SELECT SUBSTR(content, 1, {MESSAGE_PREVIEW_LENGTH}) FROM messages '
+        f'WHERE messages.conversation_id = conversations.id '
+        f'ORDER BY created_at DESC, id DESC LIMIT 1)'
+    ),
+}
+
+
+def upgrade_schema():
+    """Add model columns and indexes that are missing from existing tables"""
+    inspector = inspect(db.engine)
+
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                ))
+                print(f"Schema upgrade: added column {table.name}.{column.name}")
+
+                backfill = BACKFILLS.get((table.name, column.name))
+                if backfill:
+                    conn.execute(text(backfill))
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    print(f"Schema upgrade: created index {index.name}")
@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func
 from datetime import datetime
-import bcrypt
+import json
 
-db = SQLAlchemy()
+from passwords import password_hasher
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for promoters"""
@@ -25,16 +29,14 @@ class User(db.Model):
     clients = db.relationship('Client', backref='promotor', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(
-            password.encode('utf-8'),
-            bcrypt.gensalt()
-        ).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            self.password_hash.encode('utf-8')
-        )
+        return password_hasher.verify(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True if the stored hash uses a different bcrypt cost than BCRYPT_ROUNDS"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {
@@ -47,9 +49,26 @@ class User(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+# Client statuses tracked in the dashboard breakdown
+CLIENT_STATUSES = ('prospecto', 'activo', 'inactivo')
+
+# Serialized client fields, in response order
+CLIENT_FIELDS = (
+    'id', 'name', 'email', 'phone', 'business_name', 'business_type',
+    'status', 'notes', 'created_at', 'last_contact'
+)
+
 class Client(db.Model):
     """Client model managed by promoters"""
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Client list per sort order, with and without the status filter
+        db.Index('ix_clients_promotor_created', 'promotor_id', 'created_at', 'id'),
+        db.Index('ix_clients_promotor_status_created', 'promotor_id', 'status', 'created_at', 'id'),
+        db.Index('ix_clients_promotor_name', 'promotor_id', 'name', 'id'),
+        db.Index('ix_clients_promotor_last_contact', 'promotor_id', 'last_contact', 'id'),
+        db.Index('ix_clients_promotor_status', 'promotor_id', 'status', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     promotor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -63,23 +82,45 @@ class Client(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_contact = db.Column(db.DateTime)
 
+    def to_dict(self, fields=None):
+        """Serialize the client, optionally projected to a subset of CLIENT_FIELDS"""
+        data = {}
+        for field in fields or CLIENT_FIELDS:
+            value = getattr(self, field)
+            data[field] = value.isoformat() if isinstance(value, datetime) else value
+        return data
+
+class PromotorStats(db.Model):
+    """Per-promotor dashboard aggregates, maintained on client and conversation writes"""
+    __tablename__ = 'promotor_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_clients = db.Column(db.Integer, default=0, nullable=False)
+    prospecto = db.Column(db.Integer, default=0, nullable=False)
+    activo = db.Column(db.Integer, default=0, nullable=False)
+    inactivo = db.Column(db.Integer, default=0, nullable=False)
+    conversations = db.Column(db.Integer, default=0, nullable=False)
+    reconciled_at = db.Column(db.DateTime)
+
     def to_dict(self):
         return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'phone': self.phone,
-            'business_name': self.business_name,
-            'business_type': self.business_type,
-            'status': self.status,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat(),
-            'last_contact': self.last_contact.isoformat() if self.last_contact else None
+            'total_clients': self.total_clients,
+            'active_clients': self.activo,
+            'prospects': self.prospecto,
+            'inactive_clients': self.inactivo,
+            'conversations': self.conversations,
+            'by_status': {status: getattr(self, status) for status in CLIENT_STATUSES}
         }
 
+# Characters of the last message kept on the conversation for previews
+MESSAGE_PREVIEW_LENGTH = 120
+
 class Conversation(db.Model):
     """Conversation history with the AI copilot"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        db.Index('ix_conversations_user_updated', 'user_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -87,6 +128,15 @@ class Conversation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Rolling summary of the turns that no longer fit in the history budget
+    summary = db.Column(db.Text)
+    summarized_message_count = db.Column(db.Integer, default=0)
+
+    # Denormalized from messages so the conversation list never reads them
+    message_count = db.Column(db.Integer, default=0)
+    last_message_at = db.Column(db.DateTime)
+    last_message_preview = db.Column(db.String(MESSAGE_PREVIEW_LENGTH))
+
     # Relationships
     messages = db.relationship('Message', backref='conversation', lazy=True, order_by='Message.created_at')
 
@@ -99,9 +149,23 @@ class Conversation(db.Model):
             'messages': [msg.to_dict() for msg in self.messages]
         }
 
+    def to_summary_dict(self):
+        """Conversation metadata for lists, without loading messages"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'updated_at': self.updated_at.isoformat(),
+            'message_count': self.message_count or 0,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'last_message_preview': self.last_message_preview
+        }
+
 class Message(db.Model):
     """Individual messages in a conversation"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_conversation_created', 'conversation_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
@@ -109,10 +173,138 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Copilot call that produced an assistant message
+    operation = db.Column(db.String(30))
+    model_id = db.Column(db.String(100))
+    outcome = db.Column(db.String(20))  # success, error, unavailable, mock, cache_hit
+    latency_ms = db.Column(db.Integer)
+    input_tokens = db.Column(db.Integer)
+    output_tokens = db.Column(db.Integer)
+    cache_read_input_tokens = db.Column(db.Integer)
+    cache_creation_input_tokens = db.Column(db.Integer)
+
+    @classmethod
+    def from_copilot_result(cls, conversation_id: int, result: dict):
+        """Build the assistant message for a copilot result, with its usage and outcome"""
+        usage = result.get('usage') or {}
+        return cls(
+            conversation_id=conversation_id,
+            role='assistant',
+            content=result['response'],
+            operation=result.get('operation'),
+            model_id=result.get('model_id'),
+            outcome=result.get('outcome'),
+            latency_ms=result.get('latency_ms'),
+            input_tokens=usage.get('input_tokens'),
+            output_tokens=usage.get('output_tokens'),
+            cache_read_input_tokens=usage.get('cache_read_input_tokens'),
+            cache_creation_input_tokens=usage.get('cache_creation_input_tokens')
+        )
+
     def to_dict(self):
         return {
             'id': self.id,
             'role': self.role,
             'content': self.content,
+            'outcome': self.outcome,
             'created_at': self.created_at.isoformat()
         }
+
+@event.listens_for(Message, 'after_insert')
+def _update_conversation_metadata(mapper, connection, message):
+    """Keep the denormalized conversation metadata in step with inserted messages"""
+    conversations = Conversation.__table__
+    sent_at = message.created_at or datetime.utcnow()
+    connection.execute(
+        conversations.update()
+        .where(conversations.c.id == message.conversation_id)
+        .values(
+            message_count=func.coalesce(conversations.c.message_count, 0) + 1,
+            last_message_at=sent_at,
+            last_message_preview=message.content[:MESSAGE_PREVIEW_LENGTH],
+            updated_at=sent_at
+        )
+    )
+
+class AIJob(db.Model):
+    """Bulk AI operation over many clients"""
+    __tablename__ = 'ai_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    operation = db.Column(db.String(30), nullable=False)  # analyze, generate_message
+    message_type = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    total = db.Column(db.Integer, default=0)
+    completed = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    runner = db.Column(db.String(100))  # host:pid of the process running the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime)  # last finished item
+    finished_at = db.Column(db.DateTime)
+
+    # Relationships
+    results = db.relationship('AIJobResult', backref='job', lazy=True, order_by='AIJobResult.id')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'operation': self.operation,
+            'message_type': self.message_type,
+            'status': self.status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AIJobResult(db.Model):
+    """Result of a bulk AI job for a single client"""
+    __tablename__ = 'ai_job_results'
+    __table_args__ = (
+        db.Index('ix_ai_job_results_job_status', 'job_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('ai_jobs.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, completed, failed
+    response = db.Column(db.Text)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'client_id': self.client_id,
+            'status': self.status,
+            'response': self.response,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AITask(db.Model):
+    """Copilot request running in the background, polled by task id"""
+    __tablename__ = 'ai_tasks'
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    operation = db.Column(db.String(30), nullable=False)  # chat, generate_message, analyze_opportunity
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    result = db.Column(db.Text)  # JSON response body
+    error = db.Column(db.Text)
+    runner = db.Column(db.String(100))  # host:pid of the process whose pool runs the task
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'operation': self.operation,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,55 @@
+"""
+Keyset pagination helpers for EFEX Promotor Copilot list endpoints
+A cursor encodes the sort value and id of the last row of a page, so the
+next page is an index range scan instead of an OFFSET
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(value, row_id: int) -> str:
+    """Encode the position after a row as an opaque cursor"""
+    if isinstance(value, datetime):
+        payload = {'v': value.isoformat(), 't': 'datetime', 'id': row_id}
+    else:
+        payload = {'v': value, 'id': row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor into (value, id); raises ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value = payload['v']
+        if payload.get('t') == 'datetime':
+            value = datetime.fromisoformat(value)
+        return value, int(payload['id'])
+    except (KeyError, TypeError, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def keyset_filters(sort_column, id_column, value, row_id: int, descending: bool,
+                    nullable: bool = False) -> list:
+    """
+    Filters for the rows strictly after (value, row_id), one per index range in sort order
+
+    NULL sort values come first in ascending order and last in descending
+    order, as SQLite sorts them. For a nullable column the NULL rows are a
+    separate IS NULL range, so every filter compares the raw column and is
+    an index range seek; the caller reads the ranges in order until the
+    page is full.
+    """
+    if value is None:
+        after_null = and_(sort_column.is_(None), id_column < row_id if descending else id_column > row_id)
+        return [after_null] if descending else [after_null, sort_column.isnot(None)]
+
+    if descending:
+        after = or_(sort_column < value, and_(sort_column == value, id_column < row_id))
+    else:
+        after = or_(sort_column > value, and_(sort_column == value, id_column > row_id))
+    if nullable and descending:
+        return [after, sort_column.is_(None)]
+    return [after]
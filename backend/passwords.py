@@ -0,0 +1,141 @@
+"""
+Password hashing for EFEX Promotor Copilot
+Runs bcrypt on a small dedicated pool so a login burst cannot tie up every
+request worker: work beyond the pool is queued up to a cap, callers wait at
+most BCRYPT_QUEUE_TIMEOUT plus BCRYPT_COMPUTE_TIMEOUT, and are rejected with
+503 past either limit
+"""
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import Config
+from metrics import registry
+
+PASSWORD_OPERATIONS = registry.counter(
+    'efex_password_operations_total', 'Password hash and verify operations by outcome',
+    ('operation', 'outcome')
+)
+PASSWORD_QUEUE_WAIT = registry.histogram(
+    'efex_password_queue_wait_seconds', 'Time password operations waited for a bcrypt thread',
+    ('operation',)
+)
+PASSWORD_COMPUTE = registry.histogram(
+    'efex_password_compute_seconds', 'Time spent in bcrypt per password operation',
+    ('operation',)
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool cannot take the request in time"""
+
+
+class PasswordHasher:
+    """Bounded bcrypt executor with admission control and latency metrics"""
+
+    def __init__(self, rounds: int, max_workers: int, max_pending: int, queue_timeout: float,
+                 compute_timeout: float):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.compute_timeout = compute_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return self._run('hash', lambda: bcrypt.hashpw(
+            password.encode('utf-8'),
+            bcrypt.gensalt(self.rounds)
+        ).decode('utf-8'))
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a stored hash"""
+        return self._run('verify', lambda: bcrypt.checkpw(
+            password.encode('utf-8'),
+            password_hash.encode('utf-8')
+        ))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if a stored hash was made with a different cost than the configured one"""
+        try:
+            # Hashes look like $2b$12$<salt+digest>
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, operation: str, work):
+        """Run bcrypt work on the pool, enforcing the pending cap and the caller's deadline"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                PASSWORD_OPERATIONS.inc(operation=operation, outcome='rejected')
+                raise PasswordHasherBusy('Too many pending password operations')
+            self._pending += 1
+
+        enqueued_at = time.monotonic()
+        future = self.executor.submit(self._timed, operation, work, enqueued_at)
+        # Pending counts work holding the pool, which may outlive a caller that gave up
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.queue_timeout + self.compute_timeout)
+        except futures.TimeoutError:
+            # Drops the work if it is still queued; running bcrypt cannot be interrupted
+            future.cancel()
+            PASSWORD_OPERATIONS.inc(operation=operation, outcome='timed_out')
+            raise PasswordHasherBusy('Password operation timed out') from None
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _timed(self, operation: str, work, enqueued_at: float):
+        started_at = time.monotonic()
+        waited = started_at - enqueued_at
+        PASSWORD_QUEUE_WAIT.observe(waited, operation=operation)
+
+        # The caller may already have given up on work that waited this long; skip it
+        if waited > self.queue_timeout:
+            PASSWORD_OPERATIONS.inc(operation=operation, outcome='timed_out')
+            raise PasswordHasherBusy('Password operation waited too long in queue')
+
+        result = work()
+        PASSWORD_COMPUTE.observe(time.monotonic() - started_at, operation=operation)
+        PASSWORD_OPERATIONS.inc(operation=operation, outcome='completed')
+        return result
+
+    def metrics(self) -> dict:
+        """Counters and latency histograms for sizing the pool"""
+        with self._lock:
+            pending = self._pending
+        return {
+            'rounds': self.rounds,
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'counters': {
+                f'{operation}_{outcome}': count
+                for (operation, outcome), count in PASSWORD_OPERATIONS.series().items()
+            },
+            'wait_seconds': {
+                operation: histogram.snapshot()
+                for (operation,), histogram in PASSWORD_QUEUE_WAIT.series().items()
+            },
+            'compute_seconds': {
+                operation: histogram.snapshot()
+                for (operation,), histogram in PASSWORD_COMPUTE.series().items()
+            }
+        }
+
+
+# Singleton instance
+password_hasher = PasswordHasher(
+    Config.BCRYPT_ROUNDS,
+    Config.BCRYPT_MAX_WORKERS,
+    Config.BCRYPT_MAX_PENDING,
+    Config.BCRYPT_QUEUE_TIMEOUT,
+    Config.BCRYPT_COMPUTE_TIMEOUT
+)
@@ -0,0 +1,189 @@
+"""
+Request profiling for EFEX Promotor Copilot
+Opt-in per-request timing and SQL accounting: every request gets a
+Server-Timing header and per-endpoint metrics, and slow requests are logged
+with their queries and, for sampled requests, a cProfile dump
+"""
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics import registry
+
+# Queries per request, for spotting N+1 patterns
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUEST_DURATION = registry.histogram(
+    'efex_http_request_duration_seconds', 'Request handling time by endpoint',
+    ('endpoint', 'method')
+)
+REQUEST_SQL_DURATION = registry.histogram(
+    'efex_http_sql_duration_seconds', 'Time spent in SQL per request, by endpoint',
+    ('endpoint', 'method')
+)
+REQUEST_SQL_QUERIES = registry.histogram(
+    'efex_http_sql_queries', 'SQL statements executed per request, by endpoint',
+    ('endpoint', 'method'), QUERY_COUNT_BUCKETS
+)
+SLOW_REQUESTS = registry.counter(
+    'efex_http_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS, by endpoint',
+    ('endpoint', 'method')
+)
+
+# Only one cProfile can be active per process (Python 3.12+ raises ValueError otherwise),
+# so concurrent requests that lose the race are simply not sampled
+_PROFILER_LOCK = threading.Lock()
+
+
+class RequestProfile:
+    """Timings and SQL statements collected for one request"""
+
+    def __init__(self, max_queries: int):
+        self.started_at = time.perf_counter()
+        self.max_queries = max_queries
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.queries = []  # (milliseconds, statement), first max_queries only
+        self.profiler = None
+        self.profiling = False  # profiler enabled and _PROFILER_LOCK held
+
+    def record_query(self, statement: str, duration: float):
+        self.query_count += 1
+        self.sql_time += duration
+        if len(self.queries) < self.max_queries:
+            self.queries.append((duration * 1000, ' '.join(statement.split())))
+
+
+class RequestProfiler:
+    """Flask hooks that time requests and count the SQL they run"""
+
+    def __init__(self):
+        self.app = None
+        self._sql_hooks_installed = False
+
+    def init_app(self, app):
+        """Install the hooks when PROFILING_ENABLED is set"""
+        if not app.config['PROFILING_ENABLED']:
+            return
+        self.app = app
+        self._install_sql_hooks()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _install_sql_hooks(self):
+        if self._sql_hooks_installed:
+            return
+        # Listen on every engine, so the replica and background engines are covered too
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._sql_hooks_installed = True
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiling_query_start', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profiling_query_start')
+        if not started:
+            return
+        duration = time.perf_counter() - started.pop()
+        # Queries from background workers run outside any request
+        if has_request_context():
+            profile = g.get('request_profile')
+            if profile is not None:
+                profile.record_query(statement, duration)
+
+    def _start(self):
+        profile = RequestProfile(self.app.config['PROFILING_MAX_QUERIES'])
+        if random.random() < self.app.config['PROFILE_SAMPLE_RATE']:
+            self._start_profiler(profile)
+        g.request_profile = profile
+
+    @staticmethod
+    def _start_profiler(profile: RequestProfile):
+        if not _PROFILER_LOCK.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (a debugger, an outer cProfile run) is already active
+            _PROFILER_LOCK.release()
+            return
+        profile.profiler = profiler
+        profile.profiling = True
+
+    @staticmethod
+    def _stop_profiler(profile: RequestProfile):
+        if not profile.profiling:
+            return
+        profile.profiling = False
+        try:
+            profile.profiler.disable()
+        finally:
+            _PROFILER_LOCK.release()
+
+    def _finish(self, response):
+        profile = g.get('request_profile')
+        if profile is None:
+            return response
+        self._stop_profiler(profile)
+
+        # Streamed bodies are produced after this point; their time is not included
+        duration = time.perf_counter() - profile.started_at
+        labels = {'endpoint': request.endpoint or 'unmatched', 'method': request.method}
+        REQUEST_DURATION.observe(duration, **labels)
+        REQUEST_SQL_DURATION.observe(profile.sql_time, **labels)
+        REQUEST_SQL_QUERIES.observe(profile.query_count, **labels)
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={profile.sql_time * 1000:.1f};desc="{profile.query_count} queries"'
+        )
+
+        if duration * 1000 >= self.app.config['SLOW_REQUEST_MS']:
+            SLOW_REQUESTS.inc(**labels)
+            self._log_slow_request(profile, duration, labels['endpoint'])
+        return response
+
+    def _teardown(self, exc):
+        # after_request does not run when the view raised; never leave a profiler enabled
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            self._stop_profiler(profile)
+
+    def _log_slow_request(self, profile: RequestProfile, duration: float, endpoint: str):
+        print(f"Slow request: {request.method} {request.path} ({endpoint}) took {duration * 1000:.0f}ms, "
+              f"{profile.query_count} queries in {profile.sql_time * 1000:.0f}ms")
+        for milliseconds, statement in profile.queries:
+            print(f"  {milliseconds:8.1f}ms  {statement[:300]}")
+        if profile.query_count > len(profile.queries):
+            print(f"  ... {profile.query_count - len(profile.queries)} more queries")
+
+        if profile.profiler is not None:
+            path = self._dump_profile(profile.profiler, endpoint)
+            print(f"  cProfile dump: {path}")
+
+    def _dump_profile(self, profiler: cProfile.Profile, endpoint: str) -> str:
+        """Save the profile for snakeviz / pstats and print its top functions"""
+        directory = self.app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(directory, f'{timestamp}-{endpoint}.prof')
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+        return path
+
+
+# Singleton instance
+request_profiler = RequestProfiler()
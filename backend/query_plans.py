@@ -0,0 +1,182 @@
+"""
+Query plan regression check for EFEX Promotor Copilot
+Seeds a large SQLite database, drives every route through the Flask test
+client, and runs EXPLAIN QUERY PLAN on each SQL statement they issue.
+Fails if any statement falls back to a full table scan, or if a hot list
+query sorts in a temp B-tree instead of reading an index in order. Runs
+in the test suite (tests/test_query_plans.py) and standalone on a larger
+database.
+
+Usage:
+    python query_plans.py [--promotors 20] [--clients 2000] [--conversations 100] [--messages 20]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+# Statement prefixes whose plans are checked
+CHECKED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+SCAN_PATTERN = re.compile(r'^SCAN (\w+)')
+TEMP_SORT_DETAIL = 'USE TEMP B-TREE FOR ORDER BY'
+# List routes loaded on every page view: each page must come from an index range in
+# sort order, or its cost grows with the promotor's portfolio. Searches (q) rank by relevance.
+HOT_LIST_ROUTES = ('/api/clients', '/api/copilot/conversations')
+
+
+def exercise_routes(client, email: str, password: str):
+    """Call every API route once the way the frontend does"""
+    token = client.post('/api/auth/login', json={'email': email, 'password': password}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.get('/api/auth/me', headers=headers)
+    client.get('/api/dashboard/stats', headers=headers)
+
+    # Client list: every sort, a status filter, and a second page
+    for sort in ('created_at', 'last_contact', 'name', 'status'):
+        page = client.get('/api/clients', query_string={'sort': sort, 'limit': 20}, headers=headers).get_json()
+        client.get('/api/clients', query_string={'sort': sort, 'limit': 20, 'cursor': page['next_cursor']},
+                   headers=headers)
+    page = client.get('/api/clients', query_string={'status': 'activo', 'limit': 20}, headers=headers).get_json()
+    client.get('/api/clients', query_string={'status': 'activo', 'cursor': page['next_cursor']}, headers=headers)
+    client.get('/api/clients', query_string={'fields': 'id,name,status', 'limit': 5}, headers=headers)
+    client.get('/api/clients', query_string={'q': 'autopartes'}, headers=headers)
+
+    client.get('/api/clients/export', headers=headers).get_data()
+    client.get('/api/copilot/conversations/export', query_string={'format': 'ndjson'}, headers=headers).get_data()
+
+    client.get('/api/search', query_string={'q': 'autopartes'}, headers=headers)
+    client.get('/api/search', query_string={'q': 'requisitos acta', 'type': 'messages'}, headers=headers)
+
+    client_id = page['clients'][0]['id']
+    client.get(f'/api/clients/{client_id}', headers=headers)
+    client.put(f'/api/clients/{client_id}', json={'status': 'inactivo'}, headers=headers)
+    client.post('/api/copilot/generate-message', json={'client_id': client_id, 'message_type': 'seguimiento'},
+                headers=headers)
+    client.post('/api/copilot/analyze-opportunity', json={'client_id': client_id}, headers=headers)
+
+    new_client = client.post('/api/clients', json={'name': 'Nuevo Cliente', 'status': 'activo'},
+                             headers=headers).get_json()['client']
+    client.delete(f"/api/clients/{new_client['id']}", headers=headers)
+
+    job = client.post('/api/copilot/jobs', json={'client_ids': [client_id], 'operation': 'analyze'},
+                      headers=headers).get_json()['job']
+    for _ in range(50):
+        if client.get(f"/api/copilot/jobs/{job['id']}", headers=headers).get_json()['job']['status'] == 'completed':
+            break
+        time.sleep(0.1)
+
+    conversations = client.get('/api/copilot/conversations', headers=headers).get_json()['conversations']
+    conversation_id = conversations[0]['id']
+    client.get('/api/copilot/conversations', query_string={'page': 2}, headers=headers)
+    client.get(f'/api/copilot/conversations/{conversation_id}', headers=headers)
+    client.post('/api/copilot/chat', json={'message': 'Que comisiones tiene EFEX?',
+                                           'conversation_id': conversation_id}, headers=headers)
+    client.post('/api/copilot/chat', json={'message': 'Nueva conversacion'}, headers=headers)
+    client.delete(f'/api/copilot/conversations/{conversation_id}', headers=headers)
+
+
+def _is_hot_list_request() -> bool:
+    return (has_request_context() and request.method == 'GET'
+            and request.path in HOT_LIST_ROUTES and not request.args.get('q'))
+
+
+def collect_statements(app, db, email: str, password: str) -> list:
+    """
+    Drive every route and record the SQL it runs
+
+    Returns:
+        [(statement, parameters, hot)] where hot marks statements of hot list routes
+    """
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters, _is_hot_list_request()))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        exercise_routes(app.test_client(), email, password)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+    return statements
+
+
+def find_plan_regressions(db, statements: list) -> list:
+    """
+    Return (statement, plan detail) for every statement that scans a model
+    table, and every hot list statement that sorts in a temp B-tree
+    """
+    tables = set(db.metadata.tables)
+    regressions = []
+    seen = set()
+
+    with db.engine.connect() as conn:
+        for statement, parameters, hot in statements:
+            if (statement, hot) in seen or not statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+                continue
+            seen.add((statement, hot))
+
+            plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            for row in plan:
+                match = SCAN_PATTERN.match(row[3])
+                if match and match.group(1) in tables:
+                    regressions.append((statement, row[3]))
+                elif hot and row[3] == TEMP_SORT_DETAIL:
+                    regressions.append((statement, row[3]))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if a route query scans a table or a list query sorts in a temp B-tree')
+    parser.add_argument('--promotors', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=2000, help='clients per promotor')
+    parser.add_argument('--conversations', type=int, default=100, help='conversations per promotor')
+    parser.add_argument('--messages', type=int, default=20, help='messages per conversation')
+    args = parser.parse_args()
+
+    # The app reads DATABASE_URL at import time, so point it at a scratch database first
+    workdir = tempfile.mkdtemp(prefix='efex-query-plans-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'query_plans.db')}"
+
+    from app import create_app
+    from ai_service import copilot_service
+    from models import db
+    from seed import seed_database
+
+    # Mock responses keep the check offline
+    copilot_service.client = None
+    app = create_app()
+
+    with app.app_context():
+        print(f'Seeding {args.promotors} promotors x {args.clients} clients, '
+              f'{args.conversations} conversations x {args.messages} messages...')
+        emails = seed_database(args.promotors, args.clients, args.conversations, args.messages)
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    statements = collect_statements(app, db, emails[0], 'password123')
+
+    with app.app_context():
+        regressions = find_plan_regressions(db, statements)
+
+    print(f'Checked {len({s for s, _, _ in statements})} distinct statements')
+    for statement, detail in regressions:
+        print(f'\n{detail}:\n  {" ".join(statement.split())}')
+
+    if regressions:
+        print(f'\n{len(regressions)} query plan regression(s)')
+        sys.exit(1)
+    print('No full table scans or temp B-tree sorts in list queries')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Model routing for EFEX Promotor Copilot
+Picks the model, output-token budget and stop sequences for each copilot
+operation, and optionally sends short, simple chat turns to the fast model
+"""
+import re
+import unicodedata
+
+from config import Config
+
+# Words that signal a chat turn needs the main model's reasoning
+COMPLEX_CHAT_PATTERN = re.compile(
+    r'\b(analiza\w*|compara\w*|estrategi\w*|propuesta\w*|redacta\w*|plan\w*|'
+    r'objecion\w*|detall\w*|explica\w*|por que|ventajas|desventajas|resume\w*|calcula\w*)\b'
+)
+
+# Shortest system prompt prefix Bedrock caches, in tokens, by model family;
+# a cache_control marker on a shorter prefix is ignored
+PROMPT_CACHE_MIN_TOKENS = {'haiku': 2048, 'sonnet': 1024, 'opus': 1024}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for Claude (about 4 characters per token)"""
+    return len(text or '') // 4 + 1
+
+
+def prompt_cache_min_tokens(model_id: str) -> int:
+    """Minimum cacheable prefix of a model, assuming the stricter Haiku limit for unknown models"""
+    for family, min_tokens in PROMPT_CACHE_MIN_TOKENS.items():
+        if family in model_id:
+            return min_tokens
+    return PROMPT_CACHE_MIN_TOKENS['haiku']
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text without accents, for keyword matching"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class ModelRouter:
+    """Routing table from copilot operation to model settings"""
+
+    def __init__(self, routes: dict, fast_chat_enabled: bool, fast_chat_max_chars: int,
+                 fast_chat_max_history: int):
+        self.routes = routes
+        self.fast_chat_enabled = fast_chat_enabled
+        self.fast_chat_max_chars = fast_chat_max_chars
+        self.fast_chat_max_history = fast_chat_max_history
+
+    def route(self, operation: str) -> dict:
+        """Return {'model_id', 'max_tokens', 'stop_sequences', 'prompt_cache'} for an operation"""
+        return self.routes.get(operation) or self.routes['chat']
+
+    def cache_system_prompt(self, route: dict, prompt: str) -> bool:
+        """
+        Whether to mark a route's static system prompt with cache_control
+
+        Only for routes with prompt_cache enabled, and only when the prompt
+        reaches the model's minimum cacheable prefix, since Bedrock ignores
+        the marker below it.
+        """
+        if not route.get('prompt_cache'):
+            return False
+        return estimate_tokens(prompt) >= prompt_cache_min_tokens(route['model_id'])
+
+    def classify_chat(self, message: str, history: list = None) -> str:
+        """
+        Pick the route for a chat turn
+
+        Returns 'chat_fast' for short turns early in a conversation that do
+        not ask for analysis or drafting, and 'chat' for everything else.
+        """
+        if not self.fast_chat_enabled:
+            return 'chat'
+        if len(message) > self.fast_chat_max_chars:
+            return 'chat'
+        if len(history or []) > self.fast_chat_max_history:
+            return 'chat'
+        if COMPLEX_CHAT_PATTERN.search(normalize_text(message)):
+            return 'chat'
+        return 'chat_fast'
+
+
+# Singleton instance
+model_router = ModelRouter(
+    Config.MODEL_ROUTES,
+    Config.FAST_CHAT_ROUTING_ENABLED,
+    Config.FAST_CHAT_MAX_CHARS,
+    Config.FAST_CHAT_MAX_HISTORY
+)
@@ -0,0 +1,234 @@
+"""
+Full-text search for EFEX Promotor Copilot
+Indexes client profiles and message content with SQLite FTS5 (or
+PostgreSQL full-text indexes) and returns ranked, snippeted results
+scoped to one promotor
+"""
+import re
+
+from sqlalchemy import text
+
+from config import Config
+from models import db
+
+# Client columns in the index, with their bm25 weights
+CLIENT_SEARCH_FIELDS = (('name', 10.0), ('business_name', 5.0), ('business_type', 3.0), ('notes', 1.0))
+SEARCH_TYPES = ('all', 'clients', 'messages')
+
+# Marks matched terms in snippets; the chat UI renders it as bold
+HIGHLIGHT_START = '**'
+HIGHLIGHT_END = '**'
+SNIPPET_TOKENS = 16
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# External-content FTS5 tables kept in sync by triggers, so ORM writes,
+# the Core-insert importer and bulk deletes all update the index
+SQLITE_SETUP = {
+    'clients_fts': [
+        "CREATE VIRTUAL TABLE clients_fts USING fts5("
+        "name, business_name, business_type, notes, "
+        "content='clients', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER clients_fts_insert AFTER INSERT ON clients BEGIN "
+        "INSERT INTO clients_fts (rowid, name, business_name, business_type, notes) "
+        "VALUES (new.id, new.name, new.business_name, new.business_type, new.notes); END",
+        "CREATE TRIGGER clients_fts_delete AFTER DELETE ON clients BEGIN "
+        "INSERT INTO clients_fts (clients_fts, rowid, name, business_name, business_type, notes) "
+        "VALUES ('delete', old.id, old.name, old.business_name, old.business_type, old.notes); END",
+        "CREATE TRIGGER clients_fts_update AFTER UPDATE OF name, business_name, business_type, notes "
+        "ON clients BEGIN "
+        "INSERT INTO clients_fts (clients_fts, rowid, name, business_name, business_type, notes) "
+        "VALUES ('delete', old.id, old.name, old.business_name, old.business_type, old.notes); "
+        "INSERT INTO clients_fts (rowid, name, business_name, business_type, notes) "
+        "VALUES (new.id, new.name, new.business_name, new.business_type, new.notes); END",
+    ],
+    'messages_fts': [
+        "CREATE VIRTUAL TABLE messages_fts USING fts5("
+        "content, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content); END",
+        "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+        "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+        "INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content); END",
+    ],
+}
+
+# PostgreSQL indexes the same documents with expression GIN indexes,
+# which the database keeps in sync on every write
+PG_CLIENT_DOCUMENT = (
+    "setweight(to_tsvector('spanish', coalesce(clients.name, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(clients.business_name, '')), 'B') || "
+    "setweight(to_tsvector('spanish', coalesce(clients.business_type, '')), 'C') || "
+    "setweight(to_tsvector('spanish', coalesce(clients.notes, '')), 'D')"
+)
+PG_MESSAGE_DOCUMENT = "to_tsvector('spanish', messages.content)"
+PG_SETUP = [
+    f"CREATE INDEX IF NOT EXISTS ix_clients_search ON clients USING GIN (({PG_CLIENT_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_messages_search ON messages USING GIN (({PG_MESSAGE_DOCUMENT}))",
+]
+
+
+def _sqlite_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    tokens = TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """Full-text index over clients and conversation messages"""
+
+    def __init__(self):
+        self.dialect = None
+
+    def setup(self):
+        """Create the search index and its sync triggers if they are missing; needs an app context"""
+        self.dialect = db.engine.dialect.name
+
+        with db.engine.begin() as conn:
+            if self.dialect == 'sqlite':
+                for table, statements in SQLITE_SETUP.items():
+                    exists = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {'name': table}
+                    ).first()
+                    if exists:
+                        continue
+                    for statement in statements:
+                        conn.execute(text(statement))
+                    # Index the rows that existed before the table was created
+                    conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('rebuild')"))
+                    print(f"Search: created and populated {table}")
+            elif self.dialect == 'postgresql':
+                for statement in PG_SETUP:
+                    conn.execute(text(statement))
+            else:
+                print(f"Search: full-text search is not supported on {self.dialect}")
+
+    @property
+    def available(self) -> bool:
+        return self.dialect in ('sqlite', 'postgresql')
+
+    def search(self, user_id: int, query: str, types: str = 'all', limit: int = None) -> dict:
+        """
+        Search a promotor's clients and conversation messages
+
+        Args:
+            user_id: The promotor whose data is searched
+            query: Free text; every word must match
+            types: 'all', 'clients' or 'messages'
+            limit: Maximum results per type
+
+        Returns:
+            dict with ranked 'clients' and 'messages' lists, best match first
+        """
+        limit = limit or Config.SEARCH_RESULTS_LIMIT
+        results = {'clients': [], 'messages': []}
+
+        if self.dialect == 'sqlite':
+            match = _sqlite_match_query(query)
+            if not match:
+                return results
+            search_clients, search_messages = self._sqlite_clients, self._sqlite_messages
+        else:
+            match = query
+            search_clients, search_messages = self._pg_clients, self._pg_messages
+
+        if types in ('all', 'clients'):
+            results['clients'] = search_clients(user_id, match, limit)
+        if types in ('all', 'messages'):
+            results['messages'] = search_messages(user_id, match, limit)
+        return results
+
+    def _sqlite_clients(self, user_id: int, match: str, limit: int) -> list:
+        weights = ', '.join(str(weight) for _, weight in CLIENT_SEARCH_FIELDS)
+        rows = db.session.execute(text(
+            f"SELECT clients.id, clients.name, clients.business_name, clients.status, "
+            f"snippet(clients_fts, -1, :start, :end, '...', {SNIPPET_TOKENS}) AS snippet, "
+            f"bm25(clients_fts, {weights}) AS score "
+            f"FROM clients_fts JOIN clients ON clients.id = clients_fts.rowid "
+            f"WHERE clients_fts MATCH :match AND clients.promotor_id = :user_id "
+            f"ORDER BY score LIMIT :limit"
+        ), self._params(user_id, match, limit))
+        return [self._client_result(row) for row in rows]
+
+    def _sqlite_messages(self, user_id: int, match: str, limit: int) -> list:
+        rows = db.session.execute(text(
+            f"SELECT messages.id, messages.conversation_id, conversations.title, messages.role, "
+            f"messages.created_at, "
+            f"snippet(messages_fts, 0, :start, :end, '...', {SNIPPET_TOKENS}) AS snippet, "
+            f"bm25(messages_fts) AS score "
+            f"FROM messages_fts JOIN messages ON messages.id = messages_fts.rowid "
+            f"JOIN conversations ON conversations.id = messages.conversation_id "
+            f"WHERE messages_fts MATCH :match AND conversations.user_id = :user_id "
+            f"ORDER BY score LIMIT :limit"
+        ).columns(created_at=db.DateTime), self._params(user_id, match, limit))
+        return [self._message_result(row) for row in rows]
+
+    def _pg_clients(self, user_id: int, match: str, limit: int) -> list:
+        rows = db.session.execute(text(
+            f"SELECT clients.id, clients.name, clients.business_name, clients.status, "
+            f"ts_headline('spanish', concat_ws(' ', clients.name, clients.business_name, "
+            f"clients.business_type, clients.notes), query, :headline) AS snippet, "
+            f"-ts_rank({PG_CLIENT_DOCUMENT}, query) AS score "
+            f"FROM clients, websearch_to_tsquery('spanish', :match) AS query "
+            f"WHERE ({PG_CLIENT_DOCUMENT}) @@ query AND clients.promotor_id = :user_id "
+            f"ORDER BY score LIMIT :limit"
+        ), self._params(user_id, match, limit))
+        return [self._client_result(row) for row in rows]
+
+    def _pg_messages(self, user_id: int, match: str, limit: int) -> list:
+        rows = db.session.execute(text(
+            f"SELECT messages.id, messages.conversation_id, conversations.title, messages.role, "
+            f"messages.created_at, "
+            f"ts_headline('spanish', messages.content, query, :headline) AS snippet, "
+            f"-ts_rank({PG_MESSAGE_DOCUMENT}, query) AS score "
+            f"FROM messages JOIN conversations ON conversations.id = messages.conversation_id, "
+            f"websearch_to_tsquery('spanish', :match) AS query "
+            f"WHERE ({PG_MESSAGE_DOCUMENT}) @@ query AND conversations.user_id = :user_id "
+            f"ORDER BY score LIMIT :limit"
+        ).columns(created_at=db.DateTime), self._params(user_id, match, limit))
+        return [self._message_result(row) for row in rows]
+
+    @staticmethod
+    def _params(user_id: int, match: str, limit: int) -> dict:
+        return {
+            'user_id': user_id,
+            'match': match,
+            'limit': limit,
+            'start': HIGHLIGHT_START,
+            'end': HIGHLIGHT_END,
+            'headline': f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords={SNIPPET_TOKENS}'
+        }
+
+    @staticmethod
+    def _client_result(row) -> dict:
+        return {
+            'id': row.id,
+            'name': row.name,
+            'business_name': row.business_name,
+            'status': row.status,
+            'snippet': row.snippet,
+            'score': round(-row.score, 4)
+        }
+
+    @staticmethod
+    def _message_result(row) -> dict:
+        return {
+            'id': row.id,
+            'conversation_id': row.conversation_id,
+            'conversation_title': row.title,
+            'role': row.role,
+            'snippet': row.snippet,
+            'created_at': row.created_at.isoformat(),
+            'score': round(-row.score, 4)
+        }
+
+
+# Singleton instance
+search_index = SearchIndex()
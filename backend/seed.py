@@ -0,0 +1,120 @@
+"""
+Synthetic data for EFEX Promotor Copilot query-plan and load checks
+Bulk-inserts promotors, clients, conversations and messages with Core
+inserts, filling in the denormalized columns the ORM hooks maintain
+"""
+import random
+from datetime import datetime, timedelta
+
+from models import db, User, Client, Conversation, Message, MESSAGE_PREVIEW_LENGTH
+from passwords import password_hasher
+
+BUSINESS_TYPES = [
+    'Importacion de autopartes', 'Exportacion de aguacate', 'Textiles',
+    'Electronica', 'Logistica', 'Manufactura', 'Software', 'Muebleria'
+]
+STATUSES = ['prospecto', 'prospecto', 'activo', 'inactivo']
+
+
+def _insert_batches(table, rows: list, batch_size: int):
+    """Insert rows in executemany batches"""
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+
+
+def seed_database(promotors: int = 10, clients_per_promotor: int = 500,
+                  conversations_per_promotor: int = 50,
+                  messages_per_conversation: int = 10,
+                  password: str = 'password123', batch_size: int = 5000,
+                  seed: int = 42) -> list:
+    """
+    Fill the current app's database with synthetic promotor portfolios
+
+    Must run inside an app context. All promotors share one password.
+
+    Returns:
+        The emails of the seeded promotors
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = password_hasher.hash(password)
+
+    first_user_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    user_ids = list(range(first_user_id, first_user_id + promotors))
+    emails = [f'promotor{user_id}@efex.test' for user_id in user_ids]
+
+    users, clients, conversations, messages = [], [], [], []
+    client_id = (db.session.query(db.func.max(Client.id)).scalar() or 0) + 1
+    conversation_id = (db.session.query(db.func.max(Conversation.id)).scalar() or 0) + 1
+
+    for user_id, email in zip(user_ids, emails):
+        active = 0
+        for n in range(clients_per_promotor):
+            status = rng.choice(STATUSES)
+            active += status == 'activo'
+            created_at = now - timedelta(minutes=rng.randint(0, 525600))
+            clients.append({
+                'id': client_id,
+                'promotor_id': user_id,
+                'name': f'Cliente {client_id}',
+                'email': f'cliente{client_id}@example.com',
+                'phone': f'55{client_id:08d}',
+                'business_name': f'Empresa {client_id} SA de CV',
+                'business_type': rng.choice(BUSINESS_TYPES),
+                'status': status,
+                'notes': f'Interesado en pagos a proveedores en EE.UU. (lote {n % 10})',
+                'created_at': created_at,
+                'last_contact': created_at + timedelta(days=rng.randint(0, 30)) if rng.random() < 0.7 else None
+            })
+            client_id += 1
+
+        users.append({
+            'id': user_id,
+            'email': email,
+            'password_hash': password_hash,
+            'name': f'Promotor {user_id}',
+            'role': 'promotor',
+            'zona': rng.choice(['CDMX', 'Monterrey', 'Guadalajara', 'Tijuana']),
+            'clientes_activos': active,
+            'is_active': True,
+            'created_at': now
+        })
+
+        for _ in range(conversations_per_promotor):
+            started = now - timedelta(minutes=rng.randint(0, 525600))
+            sent_at = started
+            content = ''
+            for m in range(messages_per_conversation):
+                sent_at = started + timedelta(seconds=30 * m)
+                role = 'user' if m % 2 == 0 else 'assistant'
+                content = (
+                    f'Pregunta {m} sobre comisiones y requisitos de apertura'
+                    if role == 'user' else
+                    f'Respuesta {m}: los requisitos incluyen acta constitutiva, RFC y comprobante de domicilio.'
+                )
+                messages.append({
+                    'conversation_id': conversation_id,
+                    'role': role,
+                    'content': content,
+                    'created_at': sent_at
+                })
+
+            conversations.append({
+                'id': conversation_id,
+                'user_id': user_id,
+                'title': f'Conversacion {conversation_id}',
+                'created_at': started,
+                'updated_at': sent_at,
+                'message_count': messages_per_conversation,
+                'last_message_at': sent_at if messages_per_conversation else None,
+                'last_message_preview': content[:MESSAGE_PREVIEW_LENGTH] or None
+            })
+            conversation_id += 1
+
+    _insert_batches(User.__table__, users, batch_size)
+    _insert_batches(Client.__table__, clients, batch_size)
+    _insert_batches(Conversation.__table__, conversations, batch_size)
+    _insert_batches(Message.__table__, messages, batch_size)
+    db.session.commit()
+
+    return emails
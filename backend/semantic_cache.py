@@ -0,0 +1,242 @@
+"""
+Semantic answer cache for EFEX Promotor Copilot
+Answers first-turn chat questions that are near-duplicates of earlier ones
+(commissions, account requirements, KYC documents) from memory. Questions
+are embedded locally as hashed TF-IDF vectors and matched by cosine
+similarity, vectorized with NumPy. Answers are only reused for questions
+that retrieved the same product knowledge, see `scope`.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from config import Config
+from metrics import registry
+from routing import normalize_text
+
+# Spanish function words that say nothing about what is being asked
+STOPWORDS = frozenset(
+    'a al algo como con cual cuales cuando de del el en es esta este eso hay la las le lo los me mi '
+    'mis para pero por que se si sin son su sus te tengo tiene tu un una uno unos y ya yo hola favor'.split()
+)
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Character n-grams let plurals and verb forms match (comision / comisiones)
+CHAR_NGRAM = 4
+
+# Only general chat turns; client tools embed client data in the prompt
+CACHEABLE_OPERATIONS = ('chat', 'chat_fast')
+
+SIMILARITY_BUCKETS = (0.3, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+LOOKUPS = registry.counter(
+    'efex_semantic_cache_lookups_total', 'Semantic answer cache lookups by result',
+    ('result',)
+)
+BEST_SIMILARITY = registry.histogram(
+    'efex_semantic_cache_best_similarity', 'Similarity of the closest cached question, for tuning the threshold',
+    (), SIMILARITY_BUCKETS
+)
+
+
+def embed(text: str, dimensions: int) -> dict:
+    """Hashed term frequencies of a question, as {bucket: sublinear tf}"""
+    words = [word for word in TOKEN_PATTERN.findall(normalize_text(text)) if word not in STOPWORDS]
+    features = Counter()
+    for word in words:
+        features[f'w:{word}'] += 1
+        padded = f'_{word}_'
+        for i in range(len(padded) - CHAR_NGRAM + 1):
+            features[f'c:{padded[i:i + CHAR_NGRAM]}'] += 1
+
+    buckets = Counter()
+    for feature, count in features.items():
+        buckets[zlib.crc32(feature.encode('utf-8')) % dimensions] += count
+    return {bucket: 1 + math.log(count) for bucket, count in buckets.items()}
+
+
+def context_scope(context_text: str) -> str:
+    """Fingerprint of the prompt context an answer was generated with"""
+    if not context_text:
+        return ''
+    return hashlib.sha256(context_text.encode('utf-8')).hexdigest()[:16]
+
+
+class _Entry:
+    __slots__ = ('question', 'vector', 'response', 'expires_at')
+
+    def __init__(self, question: str, vector: dict, response: str, expires_at: float):
+        self.question = question
+        self.vector = vector
+        self.response = response
+        self.expires_at = expires_at
+
+
+class _Index:
+    """Cached questions for one operation, model and scope, as an IDF-weighted matrix"""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.entries = OrderedDict()  # normalized question -> _Entry, least recently used first
+        self._dense = None  # (keys, IDF-weighted row-normalized matrix, idf), rebuilt after changes
+
+    def add(self, key: str, entry: _Entry):
+        self.remove(key)
+        self.entries[key] = entry
+        self._dense = None
+
+    def remove(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self._dense = None
+
+    def purge_expired(self, now: float):
+        for key in [key for key, entry in self.entries.items() if entry.expires_at < now]:
+            self.remove(key)
+
+    def best_match(self, vector: dict) -> tuple:
+        """Return (key, cosine similarity) of the closest cached question"""
+        if not self.entries or not vector:
+            return None, 0.0
+        if self._dense is None:
+            keys = list(self.entries)
+            matrix = np.zeros((len(keys), self.dimensions), dtype=np.float32)
+            for row, key in enumerate(keys):
+                entry_vector = self.entries[key].vector
+                matrix[row, list(entry_vector.keys())] = list(entry_vector.values())
+            idf = np.log((1 + len(keys)) / (1 + (matrix > 0).sum(axis=0))) + 1
+            matrix *= idf
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            self._dense = (keys, matrix, idf)
+
+        keys, matrix, idf = self._dense
+        query = np.zeros(self.dimensions, dtype=np.float32)
+        query[list(vector.keys())] = list(vector.values())
+        query *= idf
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix @ query
+        best = int(scores.argmax())
+        return keys[best], float(scores[best])
+
+
+class SemanticCache:
+    """
+    First-turn question -> answer cache matched by similarity instead of exact text
+
+    Questions are only compared within one (operation, model_id, scope) index.
+    The scope fingerprints the product knowledge the answer was generated
+    from (see context_scope), so entries are shared by every promotor and
+    never outlive a change to the documents. max_entries bounds all indexes
+    together; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, enabled: bool, threshold: float, ttl: int, max_entries: int, dimensions: int):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self._indexes = OrderedDict()  # (operation, model_id, scope) -> _Index, least recently used first
+        self._entry_count = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, question: str, operation: str, model_id: str, scope: str = '') -> dict:
+        """
+        Find the cached answer to a question similar enough to this one
+
+        Returns:
+            {'response', 'matched_question', 'similarity'} or None on a miss
+        """
+        if not self.enabled:
+            return None
+        vector = embed(question, self.dimensions)
+        with self._lock:
+            index = self._indexes.get((operation, model_id, scope))
+            if index is None:
+                key, score = None, 0.0
+            else:
+                self._purge_expired(index)
+                key, score = index.best_match(vector)
+
+            if index is not None and index.entries:
+                BEST_SIMILARITY.observe(score)
+            if key is None or score < self.threshold:
+                LOOKUPS.inc(result='miss')
+                return None
+
+            index.entries.move_to_end(key)
+            self._indexes.move_to_end((operation, model_id, scope))
+            entry = index.entries[key]
+            LOOKUPS.inc(result='hit')
+            return {'response': entry.response, 'matched_question': entry.question,
+                    'similarity': round(score, 4)}
+
+    def store(self, question: str, operation: str, model_id: str, response: str, scope: str = ''):
+        """Remember the answer to a first-turn question asked under a request context"""
+        if not self.enabled:
+            return
+        vector = embed(question, self.dimensions)
+        if not vector:
+            return
+        key = ' '.join(TOKEN_PATTERN.findall(normalize_text(question)))
+        with self._lock:
+            index_key = (operation, model_id, scope)
+            index = self._indexes.get(index_key)
+            if index is None:
+                index = self._indexes[index_key] = _Index(self.dimensions)
+            self._indexes.move_to_end(index_key)
+            self._entry_count -= len(index.entries)
+            index.add(key, _Entry(question, vector, response, time.time() + self.ttl))
+            self._entry_count += len(index.entries)
+            self._evict()
+
+    def _purge_expired(self, index: _Index):
+        before = len(index.entries)
+        index.purge_expired(time.time())
+        self._entry_count -= before - len(index.entries)
+
+    def _evict(self):
+        """Drop least recently used entries, oldest index first, until under max_entries"""
+        while self._entry_count > self.max_entries:
+            index_key, index = next(iter(self._indexes.items()))
+            if index.entries:
+                index.remove(next(iter(index.entries)))
+                self._entry_count -= 1
+            if not index.entries:
+                del self._indexes[index_key]
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._entry_count = 0
+
+    def stats(self) -> dict:
+        """Entry counts and the hit rate since the process started"""
+        lookups = LOOKUPS.series()
+        hits = lookups.get(('hit',), 0)
+        misses = lookups.get(('miss',), 0)
+        with self._lock:
+            entries = self._entry_count
+            scopes = len(self._indexes)
+        return {
+            'enabled': self.enabled,
+            'entries': entries,
+            'scopes': scopes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None
+        }
+
+
+# Singleton instance
+semantic_cache = SemanticCache(
+    Config.SEMANTIC_CACHE_ENABLED,
+    Config.SEMANTIC_CACHE_THRESHOLD,
+    Config.SEMANTIC_CACHE_TTL,
+    Config.SEMANTIC_CACHE_MAX_ENTRIES,
+    Config.SEMANTIC_CACHE_DIMENSIONS
+)
@@ -0,0 +1,143 @@
+"""
+Promotor statistics for EFEX Promotor Copilot
+Keeps per-promotor aggregates in promotor_stats and users.clientes_activos:
+client and conversation writes apply deltas at flush time, and the
+counters are periodically reconciled against a single grouped count
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, User, Client, Conversation, PromotorStats, CLIENT_STATUSES
+from identity import user_cache
+
+
+def _client_status(client, committed: bool = False) -> str:
+    """Status of a client before (committed=True) or after the pending change"""
+    history = inspect(client).attrs.status.history
+    if committed and history.deleted:
+        return history.deleted[0]
+    if not committed and history.added:
+        return history.added[0]
+    # Unset on a new client means the column default
+    return client.status or 'prospecto'
+
+
+def _adjust(deltas: dict, status: str, amount: int):
+    """Record a status count change if the status has a column"""
+    if status in CLIENT_STATUSES:
+        deltas[status] += amount
+
+
+@event.listens_for(Session, 'before_flush')
+def _apply_stats_deltas(session, flush_context, instances):
+    """Turn pending client and conversation writes into promotor counter deltas"""
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    for obj in session.new:
+        if isinstance(obj, Client):
+            deltas[obj.promotor_id]['total_clients'] += 1
+            _adjust(deltas[obj.promotor_id], _client_status(obj), 1)
+        elif isinstance(obj, Conversation):
+            deltas[obj.user_id]['conversations'] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Client):
+            deltas[obj.promotor_id]['total_clients'] -= 1
+            _adjust(deltas[obj.promotor_id], _client_status(obj, committed=True), -1)
+        elif isinstance(obj, Conversation):
+            deltas[obj.user_id]['conversations'] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Client) and inspect(obj).attrs.status.history.has_changes():
+            _adjust(deltas[obj.promotor_id], _client_status(obj, committed=True), -1)
+            _adjust(deltas[obj.promotor_id], _client_status(obj), 1)
+
+    for user_id, columns in deltas.items():
+        _apply_deltas(session.connection(), user_id, columns)
+
+
+def _apply_deltas(connection, user_id: int, columns: dict):
+    """Add counter deltas to a promotor's promotor_stats row and clientes_activos"""
+    table = PromotorStats.__table__
+    users = User.__table__
+
+    values = {name: table.c[name] + delta for name, delta in columns.items() if delta}
+    if values:
+        # Rows that do not exist yet are created by the next reconcile
+        connection.execute(
+            table.update().where(table.c.user_id == user_id).values(**values)
+        )
+
+    if columns.get('activo'):
+        connection.execute(
+            users.update().where(users.c.id == user_id).values(
+                clientes_activos=func.coalesce(users.c.clientes_activos, 0) + columns['activo']
+            )
+        )
+        user_cache.invalidate(user_id)
+
+
+def record_inserted_clients(user_id: int, status_counts: dict):
+    """
+    Apply counter deltas for clients inserted without the ORM (bulk import)
+
+    Args:
+        user_id: The promotor that owns the clients
+        status_counts: Number of inserted clients per status
+    """
+    columns = defaultdict(int)
+    for status, count in status_counts.items():
+        columns['total_clients'] += count
+        _adjust(columns, status, count)
+    _apply_deltas(db.session.connection(), user_id, columns)
+
+
+def reconcile_promotor_stats(user_id: int) -> PromotorStats:
+    """Recompute a promotor's aggregates from the source tables; the caller commits"""
+    # The counts are written back as absolute values, so they must not come from a lagging replica
+    db.session().use_primary()
+    breakdown = dict(
+        db.session.query(Client.status, func.count(Client.id))
+        .filter(Client.promotor_id == user_id)
+        .group_by(Client.status)
+        .all()
+    )
+
+    stats = PromotorStats.query.get(user_id)
+    if stats is None:
+        stats = PromotorStats(user_id=user_id)
+        db.session.add(stats)
+
+    stats.total_clients = sum(breakdown.values())
+    for status in CLIENT_STATUSES:
+        setattr(stats, status, breakdown.get(status, 0))
+    stats.conversations = Conversation.query.filter_by(user_id=user_id).count()
+    stats.reconciled_at = datetime.utcnow()
+
+    user = User.query.get(user_id)
+    if user is not None:
+        user.clientes_activos = stats.activo
+    return stats
+
+
+def get_promotor_stats(user_id: int) -> PromotorStats:
+    """Get a promotor's aggregates, reconciling them when missing or stale"""
+    stats = PromotorStats.query.get(user_id)
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config['STATS_RECONCILE_INTERVAL'])
+
+    if stats is None or stats.reconciled_at is None or stats.reconciled_at < stale_before:
+        try:
+            stats = reconcile_promotor_stats(user_id)
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created the row first; reconcile onto it
+            db.session.rollback()
+            stats = reconcile_promotor_stats(user_id)
+            db.session.commit()
+
+    return stats
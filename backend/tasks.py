@@ -0,0 +1,134 @@
+"""
+Background copilot tasks for EFEX Promotor Copilot
+Runs copilot requests on a dedicated worker pool so slow Bedrock calls do
+not hold the request workers; clients poll the task by id for the result
+"""
+import json
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import Config
+from models import db, AITask
+from jobs import process_alive
+
+# Error of the tasks a process lost when it stopped
+ORPHANED_ERROR = 'La tarea se interrumpio porque el servidor se reinicio. Vuelve a intentarlo.'
+UNFINISHED_STATUSES = ('queued', 'running')
+# Seconds between purges of old tasks by one process
+PURGE_INTERVAL = 3600
+
+
+class TaskQueue:
+    """Runs copilot work in the background and records its status in ai_tasks"""
+
+    def __init__(self, max_workers: int, stale_after: int, retention_days: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-task')
+        self.stale_after = stale_after
+        self.retention_days = retention_days
+        self.app = None
+        self._next_purge_at = 0.0
+
+    def init_app(self, app):
+        """Bind the queue to the app whose database stores the tasks"""
+        self.app = app
+
+    @property
+    def runner_id(self) -> str:
+        # Read per call: gunicorn forks workers after the module is imported
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def is_orphaned(self, task: AITask) -> bool:
+        """
+        Whether an unfinished task lost the process whose pool was running it
+
+        Tasks queued on this host are orphaned once their process is gone;
+        tasks from other hosts once they were not finished within stale_after seconds.
+        """
+        if task.status not in UNFINISHED_STATUSES:
+            return False
+        host, _, pid = (task.runner or '').rpartition(':')
+        if host == socket.gethostname() and pid.isdigit():
+            return int(pid) != os.getpid() and not process_alive(int(pid))
+        return datetime.utcnow() - (task.started_at or task.created_at) > timedelta(seconds=self.stale_after)
+
+    def fail_if_orphaned(self, task: AITask) -> bool:
+        """Mark an orphaned task as failed; returns whether it was"""
+        if not self.is_orphaned(task):
+            return False
+        # Only while unfinished, in case its runner finished it meanwhile
+        AITask.query.filter(AITask.id == task.id, AITask.status.in_(UNFINISHED_STATUSES)).update({
+            'status': 'failed',
+            'error': ORPHANED_ERROR,
+            'finished_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(task)
+        print(f"Copilot task {task.id} lost its runner {task.runner}; marked failed")
+        return True
+
+    def fail_orphaned_tasks(self) -> int:
+        """Fail the unfinished tasks left behind by stopped processes, e.g. at startup after a restart"""
+        tasks = AITask.query.filter(AITask.status.in_(UNFINISHED_STATUSES)).all()
+        return sum(self.fail_if_orphaned(task) for task in tasks)
+
+    def purge_old_tasks(self) -> int:
+        """Delete tasks created more than retention_days ago; clients only poll recent ones"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        deleted = AITask.query.filter(AITask.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        self._next_purge_at = time.monotonic() + PURGE_INTERVAL
+        if deleted:
+            print(f"Purged {deleted} copilot task(s) older than {self.retention_days} days")
+        return deleted
+
+    def submit(self, user_id: int, operation: str, run) -> AITask:
+        """
+        Enqueue copilot work
+
+        Args:
+            user_id: Owner of the task
+            operation: Copilot operation name, e.g. 'chat'
+            run: Callable returning the JSON-serializable response body;
+                 it runs inside an app context on a background thread
+
+        Returns:
+            The committed AITask, still queued
+        """
+        if time.monotonic() >= self._next_purge_at:
+            self.purge_old_tasks()
+
+        task = AITask(id=str(uuid.uuid4()), user_id=user_id, operation=operation, runner=self.runner_id)
+        db.session.add(task)
+        db.session.commit()
+
+        self.executor.submit(self._run_task, task.id, run)
+        return task
+
+    def _run_task(self, task_id: str, run):
+        """Run a task and store its result or error"""
+        with self.app.app_context():
+            AITask.query.filter_by(id=task_id).update({
+                'status': 'running',
+                'started_at': datetime.utcnow()
+            })
+            db.session.commit()
+
+            try:
+                result = run()
+                update = {'status': 'completed', 'result': json.dumps(result)}
+            except Exception as e:
+                print(f"Error in copilot task {task_id}: {e}")
+                db.session.rollback()
+                update = {'status': 'failed', 'error': str(e)}
+
+            update['finished_at'] = datetime.utcnow()
+            AITask.query.filter_by(id=task_id).update(update)
+            db.session.commit()
+
+
+# Singleton instance
+task_queue = TaskQueue(Config.AI_TASK_MAX_WORKERS, Config.AI_TASK_STALE_AFTER, Config.AI_TASK_RETENTION_DAYS)
@@ -0,0 +1,69 @@
+"""
+Shared fixtures for the EFEX Promotor Copilot backend tests
+Config reads the environment when it is imported, so the scratch database
+and offline settings are set here before any backend module is imported
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='efex-tests-')
+# Password of every seeded promotor
+PASSWORD = 'password123'
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ['KNOWLEDGE_INDEX_PATH'] = os.path.join(WORKDIR, 'knowledge.db')
+os.environ['BCRYPT_ROUNDS'] = '4'
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from ai_service import copilot_service
+
+    # Mock responses keep the tests offline
+    copilot_service.client = None
+    return create_app()
+
+
+@pytest.fixture(scope='session')
+def seeded_emails(app):
+    """Emails of a few seeded promotors with realistic portfolios"""
+    from models import db
+    from seed import seed_database
+
+    with app.app_context():
+        emails = seed_database(3, 200, 20, 6, password=PASSWORD)
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    return emails
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client, seeded_emails):
+    token = client.post('/api/auth/login', json={
+        'email': seeded_emails[0], 'password': PASSWORD
+    }).get_json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def promotor(client):
+    """A new promotor with no clients: {'id', 'headers'}"""
+    response = client.post('/api/auth/register', json={
+        'email': f'{uuid.uuid4().hex}@example.com', 'password': PASSWORD, 'name': 'Promotor de prueba'
+    }).get_json()
+    return {
+        'id': response['user']['id'],
+        'headers': {'Authorization': f"Bearer {response['access_token']}"}
+    }
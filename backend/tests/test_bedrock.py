@@ -0,0 +1,172 @@
+"""Bedrock gateway: retries, retry budget, deadline, circuit breaker and failover, against the stub"""
+import time
+
+import pytest
+
+from bedrock import BedrockGateway, BedrockUnavailable
+from bedrock_stub import StubBedrockClient
+from config import Config
+
+PRIMARY = 'anthropic.primary'
+SECONDARY = 'anthropic.secondary'
+BODY = {'messages': [{'role': 'user', 'content': 'Hola'}]}
+
+
+@pytest.fixture(autouse=True)
+def fast_gateway_config(monkeypatch):
+    """Short delays and cooldown so the tests run in milliseconds; breaker tests lower its minimum"""
+    for name, value in {
+        'BEDROCK_CALL_DEADLINE': 5.0,
+        'BEDROCK_MAX_ATTEMPTS': 3,
+        'BEDROCK_RETRY_BASE_DELAY': 0.001,
+        'BEDROCK_RETRY_MAX_DELAY': 0.002,
+        'BEDROCK_RETRY_BUDGET': 100,
+        'BEDROCK_BREAKER_WINDOW': 10,
+        'BEDROCK_BREAKER_MIN_CALLS': 10,
+        'BEDROCK_BREAKER_FAILURE_RATIO': 0.5,
+        'BEDROCK_BREAKER_SLOW_CALL': 5.0,
+        'BEDROCK_BREAKER_COOLDOWN': 0.05,
+    }.items():
+        monkeypatch.setattr(Config, name, value)
+
+
+def outcomes(stub, model=PRIMARY):
+    return {outcome: count for (called, outcome), count in stub.calls.items() if called == model}
+
+
+def test_throttles_are_retried_within_the_budget():
+    stub = StubBedrockClient(throttle_first=2)
+    gateway = BedrockGateway(stub)
+
+    body, model = gateway.invoke(PRIMARY, BODY)
+
+    assert model == PRIMARY and body['content'][0]['text']
+    assert outcomes(stub) == {'throttled': 2, 'ok': 1}
+    # Two retries spent 5 tokens each; the success refunded one
+    assert gateway.status()['retry_tokens'] == 100 - 10 + 1
+
+
+def test_attempts_are_capped():
+    stub = StubBedrockClient(throttle_rate=1.0)
+
+    with pytest.raises(BedrockUnavailable, match='Retries exhausted'):
+        BedrockGateway(stub).invoke(PRIMARY, BODY)
+    assert outcomes(stub) == {'throttled': 3}
+
+
+def test_spent_retry_budget_stops_retrying(monkeypatch):
+    monkeypatch.setattr(Config, 'BEDROCK_RETRY_BUDGET', 5)
+    stub = StubBedrockClient(throttle_rate=1.0)
+    gateway = BedrockGateway(stub)
+
+    with pytest.raises(BedrockUnavailable, match='Retry budget exhausted'):
+        gateway.invoke(PRIMARY, BODY)
+    # One retry fit in the budget
+    assert outcomes(stub) == {'throttled': 2}
+
+
+def test_retries_stop_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(Config, 'BEDROCK_CALL_DEADLINE', 0.0)
+    stub = StubBedrockClient(throttle_rate=1.0)
+
+    with pytest.raises(BedrockUnavailable, match='Deadline exceeded'):
+        BedrockGateway(stub).invoke(PRIMARY, BODY)
+    assert outcomes(stub) == {'throttled': 1}
+
+
+def test_non_retryable_errors_are_raised_without_retry():
+    stub = StubBedrockClient()
+    gateway = BedrockGateway(stub)
+
+    with pytest.raises(TypeError):
+        gateway.invoke(PRIMARY, {'messages': object()})
+    assert gateway.breaker(PRIMARY).state == 'closed'
+
+
+def test_breaker_opens_allows_one_trial_and_closes(monkeypatch):
+    monkeypatch.setattr(Config, 'BEDROCK_MAX_ATTEMPTS', 1)
+    monkeypatch.setattr(Config, 'BEDROCK_BREAKER_MIN_CALLS', 2)
+    stub = StubBedrockClient(failing_models=(PRIMARY,))
+    gateway = BedrockGateway(stub)
+    breaker = gateway.breaker(PRIMARY)
+
+    for _ in range(2):
+        with pytest.raises(BedrockUnavailable):
+            gateway.invoke(PRIMARY, BODY)
+    assert breaker.state == 'open'
+
+    # Open: calls are refused without reaching the model
+    with pytest.raises(BedrockUnavailable, match='Circuit open'):
+        gateway.invoke(PRIMARY, BODY)
+    assert outcomes(stub) == {'error': 2}
+
+    # After the cooldown a single trial call goes through
+    time.sleep(Config.BEDROCK_BREAKER_COOLDOWN)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+    breaker.record(True, 0.01)
+    assert breaker.state == 'closed'
+
+
+def test_successful_trial_call_closes_the_breaker(monkeypatch):
+    monkeypatch.setattr(Config, 'BEDROCK_MAX_ATTEMPTS', 1)
+    monkeypatch.setattr(Config, 'BEDROCK_BREAKER_MIN_CALLS', 2)
+    stub = StubBedrockClient(failing_models=(PRIMARY,))
+    gateway = BedrockGateway(stub)
+
+    for _ in range(2):
+        with pytest.raises(BedrockUnavailable):
+            gateway.invoke(PRIMARY, BODY)
+    time.sleep(Config.BEDROCK_BREAKER_COOLDOWN)
+    stub.failing_models.clear()
+
+    assert gateway.invoke(PRIMARY, BODY)[1] == PRIMARY
+    assert gateway.breaker(PRIMARY).state == 'closed'
+    assert outcomes(stub) == {'error': 2, 'ok': 1}
+
+
+def test_failed_trial_reopens_the_breaker(monkeypatch):
+    monkeypatch.setattr(Config, 'BEDROCK_MAX_ATTEMPTS', 1)
+    monkeypatch.setattr(Config, 'BEDROCK_BREAKER_MIN_CALLS', 2)
+    stub = StubBedrockClient(failing_models=(PRIMARY,))
+    gateway = BedrockGateway(stub)
+
+    for _ in range(2):
+        with pytest.raises(BedrockUnavailable):
+            gateway.invoke(PRIMARY, BODY)
+    time.sleep(Config.BEDROCK_BREAKER_COOLDOWN)
+
+    with pytest.raises(BedrockUnavailable):
+        gateway.invoke(PRIMARY, BODY)
+    assert gateway.breaker(PRIMARY).state == 'open'
+    assert outcomes(stub) == {'error': 3}
+
+
+def test_failover_to_the_secondary_model():
+    stub = StubBedrockClient(failing_models=(PRIMARY,))
+
+    body, model = BedrockGateway(stub, SECONDARY).invoke(PRIMARY, BODY)
+
+    assert model == SECONDARY
+    assert outcomes(stub, PRIMARY) == {'error': 3}
+    assert outcomes(stub, SECONDARY) == {'ok': 1}
+
+
+def test_stream_fails_over_to_the_secondary_model():
+    stub = StubBedrockClient(failing_models=(PRIMARY,))
+
+    payloads, model = BedrockGateway(stub, SECONDARY).invoke_stream(PRIMARY, BODY)
+
+    assert model == SECONDARY
+    assert [payload['type'] for payload in payloads][-1] == 'message_stop'
+
+
+def test_unavailable_when_every_model_is_exhausted():
+    stub = StubBedrockClient(failing_models=(PRIMARY, SECONDARY))
+
+    with pytest.raises(BedrockUnavailable):
+        BedrockGateway(stub, SECONDARY).invoke(PRIMARY, BODY)
+    assert outcomes(stub, PRIMARY) == {'error': 3}
+    assert outcomes(stub, SECONDARY) == {'error': 3}
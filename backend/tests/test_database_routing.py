@@ -0,0 +1,63 @@
+"""Replica routing: GET reads go to the replica, writes and reconciles to the primary"""
+import pytest
+from flask import Flask
+from sqlalchemy import select, update
+
+from models import db, User, Client
+from stats import get_promotor_stats
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """App with an empty replica, as if it had not caught up with the primary yet"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS={'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+        STATS_RECONCILE_INTERVAL=3600,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines['replica'])
+        user = User(email='ana@example.com', password_hash='x', name='Ana')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Client(promotor_id=user.id, name='Autopartes SA', status='activo'))
+        db.session.commit()
+        app.config['TEST_USER_ID'] = user.id
+    yield app
+    # init_app registered a metadata for the bind; other apps in this process have no such engine
+    db.metadatas.pop('replica', None)
+
+
+def test_get_reads_use_replica(replica_app):
+    with replica_app.test_request_context('/api/clients', method='GET'):
+        assert db.session().get_bind(clause=select(User)) is db.engines['replica']
+        assert db.session.scalars(select(User)).all() == []
+
+
+def test_write_moves_request_to_primary(replica_app):
+    with replica_app.test_request_context('/api/clients', method='GET'):
+        db.session.execute(update(User).where(User.id == 0).values(name='nadie'))
+        assert db.session().get_bind(clause=select(User)) is db.engines[None]
+        db.session.rollback()
+
+
+def test_flush_moves_request_to_primary(replica_app):
+    with replica_app.test_request_context('/api/clients', method='GET'):
+        db.session.add(User(email='luis@example.com', password_hash='x', name='Luis'))
+        db.session.flush()
+        assert db.session().get_bind(clause=select(User)) is db.engines[None]
+        db.session.rollback()
+
+
+def test_other_methods_use_primary(replica_app):
+    with replica_app.test_request_context('/api/clients', method='POST'):
+        assert db.session().get_bind(clause=select(User)) is db.engines[None]
+
+
+def test_reconcile_reads_primary(replica_app):
+    with replica_app.test_request_context('/api/dashboard/stats', method='GET'):
+        stats = get_promotor_stats(replica_app.config['TEST_USER_ID'])
+        assert (stats.total_clients, stats.activo) == (1, 1)
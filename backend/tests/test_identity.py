@@ -0,0 +1,24 @@
+"""Caller identity: /api/auth/me is served from the token claims and the identity cache"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import User
+
+
+def test_me_matches_the_user_without_querying_it(app, client, promotor):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client.get('/api/auth/me', headers=promotor['headers'])  # warms the identity cache
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/auth/me', headers=promotor['headers'])
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert statements == []
+    with app.app_context():
+        assert response.get_json()['user'] == User.query.get(promotor['id']).to_dict()
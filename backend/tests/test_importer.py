@@ -0,0 +1,59 @@
+"""Bulk client import: rows of one batch may fill different columns"""
+import io
+import json
+
+from models import Client
+
+
+def import_ndjson(client, promotor, rows, batch_size=100):
+    body = '\n'.join(json.dumps(row) for row in rows).encode('utf-8')
+    return client.post(f'/api/clients/import?format=ndjson&batch_size={batch_size}',
+                       data=body, headers=promotor['headers'])
+
+
+def stored_clients(app, promotor):
+    with app.app_context():
+        clients = Client.query.filter_by(promotor_id=promotor['id']).order_by(Client.id).all()
+        return [(c.name, c.email, c.notes, c.status) for c in clients]
+
+
+def test_later_rows_keep_columns_the_first_row_leaves_empty(app, client, promotor):
+    response = import_ndjson(client, promotor, [
+        {'name': 'One'},
+        {'name': 'Two', 'notes': 'autopartes', 'status': 'activo', 'email': 't@x.com'},
+    ])
+
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 2
+    assert stored_clients(app, promotor) == [
+        ('One', None, None, 'prospecto'),
+        ('Two', 't@x.com', 'autopartes', 'activo'),
+    ]
+
+
+def test_later_rows_may_leave_columns_empty(app, client, promotor):
+    response = import_ndjson(client, promotor, [
+        {'name': 'One', 'notes': 'n1', 'email': ''},
+        {'name': 'Two', 'notes': '   '},
+        {'name': 'Three', 'email': 'three@x.com', 'status': 'inactivo'},
+    ], batch_size=2)
+
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 3
+    assert stored_clients(app, promotor) == [
+        ('One', None, 'n1', 'prospecto'),
+        ('Two', None, None, 'prospecto'),
+        ('Three', 'three@x.com', None, 'inactivo'),
+    ]
+
+
+def test_csv_empty_cells(app, client, promotor):
+    body = b'name,email,notes\nOne,,n1\nTwo,two@x.com,\n'
+    response = client.post('/api/clients/import?format=csv', headers=promotor['headers'],
+                           data={'file': (io.BytesIO(body), 'clients.csv')})
+
+    assert response.get_json()['imported'] == 2
+    assert stored_clients(app, promotor) == [
+        ('One', None, 'n1', 'prospecto'),
+        ('Two', 'two@x.com', None, 'prospecto'),
+    ]
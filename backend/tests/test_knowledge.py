@@ -0,0 +1,57 @@
+"""Knowledge retrieval: only chunks that share distinctive words with the question"""
+import pytest
+
+from ai_service import copilot_service
+from knowledge import KnowledgeBase, knowledge_base
+
+DOCUMENT = """# Productos EFEX
+
+EFEX es una plataforma bancaria para empresas que realizan comercio con EE.UU. Esta regulada por la CNBV.
+
+## Cuentas
+
+- Apertura de cuentas bancarias multi-pais
+- Mantenimiento de fondos en USD
+
+## Pagos y transferencias
+
+- Conversion a monedas locales (MXN, COP, etc.)
+- Transferencias internacionales simplificadas
+"""
+
+
+@pytest.fixture
+def kb(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'efex_productos.md').write_text(DOCUMENT, encoding='utf-8')
+    base = KnowledgeBase(str(tmp_path / 'docs'), str(tmp_path / 'knowledge.db'), enabled=True,
+                         chunk_chars=800, top_k=3, max_chars=2400, mmap_size=0,
+                         min_score=0.5, max_term_fraction=0.5)
+    base.setup()
+    return base
+
+
+def test_relevant_chunk_is_retrieved(kb):
+    chunks = kb.retrieve('Como funcionan las transferencias internacionales?')
+    assert [chunk['heading'] for chunk in chunks] == ['efex productos > Productos EFEX > Pagos y transferencias']
+
+
+@pytest.mark.parametrize('question', [
+    'gracias por la ayuda',
+    'Que productos tiene EFEX?',  # in every chunk's heading
+    'Genera un mensaje de seguimiento para el cliente de la empresa',
+])
+def test_unrelated_questions_retrieve_nothing(kb, question):
+    assert kb.retrieve(question) == []
+
+
+def test_templated_operations_skip_retrieval(app, monkeypatch):
+    questions = []
+    monkeypatch.setattr(knowledge_base, 'retrieve', lambda question, top_k=None: questions.append(question) or [])
+
+    copilot_service.chat('Genera un mensaje para Autopartes SA', operation='generate_message')
+    copilot_service.chat('Analiza la oportunidad de Autopartes SA', operation='analyze_opportunity')
+    assert questions == []
+
+    copilot_service.chat('Que documentos pide la apertura de cuenta?', operation='chat')
+    assert questions == ['Que documentos pide la apertura de cuenta?']
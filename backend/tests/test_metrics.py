@@ -0,0 +1,29 @@
+"""Metrics endpoints: both require METRICS_TOKEN, which only development may leave unset"""
+import pytest
+
+METRICS_ROUTES = ('/api/metrics', '/api/auth/metrics')
+
+
+@pytest.fixture
+def metrics_token(app):
+    app.config['METRICS_TOKEN'] = 'secret-token'
+    yield 'secret-token'
+    app.config['METRICS_TOKEN'] = ''
+
+
+@pytest.mark.parametrize('path', METRICS_ROUTES)
+def test_metrics_require_token(client, metrics_token, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get(path, headers={'Authorization': f'Bearer {metrics_token}'}).status_code == 200
+
+
+@pytest.mark.parametrize('path', METRICS_ROUTES)
+def test_metrics_open_without_token_in_development(client, path):
+    assert client.get(path).status_code == 200
+
+
+@pytest.mark.parametrize('path', METRICS_ROUTES)
+def test_metrics_closed_without_token_in_production(app, client, monkeypatch, path):
+    monkeypatch.setitem(app.config, 'DEBUG', False)
+    assert client.get(path).status_code == 401
@@ -0,0 +1,61 @@
+"""Password hashing pool: callers are rejected as soon as their deadline passes"""
+import threading
+import time
+
+import pytest
+
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=2, queue_timeout=0.1, compute_timeout=0.1)
+    yield hasher
+    hasher.executor.shutdown(wait=True)
+
+
+def occupy_pool(hasher):
+    """Hold the only bcrypt thread until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+
+    threading.Thread(target=hasher._run, args=('hash', work), daemon=True).start()
+    assert started.wait(5)
+    return release
+
+
+def test_hash_and_verify(hasher):
+    password_hash = hasher.hash('secreto')
+    assert hasher.verify('secreto', password_hash)
+    assert not hasher.verify('otro', password_hash)
+
+
+def test_queued_caller_is_rejected_at_its_deadline(hasher):
+    release = occupy_pool(hasher)
+    ran = threading.Event()
+    started_at = time.monotonic()
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run('verify', ran.set)
+
+    assert time.monotonic() - started_at < 1
+    release.set()
+    hasher.executor.shutdown(wait=True)
+    # The timed-out work was cancelled while still queued, and its slot freed
+    assert not ran.is_set()
+    assert hasher.metrics()['pending'] == 0
+
+
+def test_pending_cap_rejects_immediately(hasher):
+    release = occupy_pool(hasher)
+    threading.Thread(target=lambda: pytest.raises(PasswordHasherBusy, hasher._run, 'hash', lambda: None),
+                     daemon=True).start()
+    time.sleep(0.02)
+
+    with pytest.raises(PasswordHasherBusy, match='Too many pending'):
+        hasher._run('hash', lambda: None)
+    release.set()
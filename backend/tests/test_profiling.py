@@ -0,0 +1,45 @@
+"""Request profiling: concurrent sampled requests share the single cProfile slot"""
+import threading
+
+from flask import Flask, g, jsonify
+
+from profiling import RequestProfiler, _PROFILER_LOCK
+
+
+def make_profiled_app():
+    app = Flask(__name__)
+    app.config.update(
+        PROFILING_ENABLED=True,
+        PROFILE_SAMPLE_RATE=1,
+        PROFILING_MAX_QUERIES=10,
+        SLOW_REQUEST_MS=60000,
+    )
+    barrier = threading.Barrier(2, timeout=5)
+
+    @app.route('/work')
+    def work():
+        # Hold both requests inside the view so their profiling windows overlap
+        barrier.wait()
+        return jsonify({'sampled': g.request_profile.profiling})
+
+    RequestProfiler().init_app(app)
+    return app
+
+
+def test_concurrent_sampled_requests():
+    app = make_profiled_app()
+    responses = []
+
+    def send():
+        with app.test_client() as client:
+            responses.append(client.get('/work'))
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sorted(response.get_json()['sampled'] for response in responses) == [False, True]
+    assert not _PROFILER_LOCK.locked()
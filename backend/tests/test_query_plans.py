@@ -0,0 +1,15 @@
+"""Query plans of every route: no full table scans, no temp B-tree sorts in list pages"""
+from query_plans import collect_statements, find_plan_regressions
+
+
+def test_routes_use_indexes(app, seeded_emails):
+    from models import db
+
+    statements = collect_statements(app, db, seeded_emails[0], 'password123')
+    with app.app_context():
+        regressions = find_plan_regressions(db, statements)
+
+    assert any(hot for _, _, hot in statements), 'no list queries were recorded'
+    assert regressions == [], '\n'.join(
+        f'{detail}: {" ".join(statement.split())}' for statement, detail in regressions
+    )
@@ -0,0 +1,76 @@
+"""Semantic answer cache: product answers are shared by promotors asking with the same knowledge"""
+import pytest
+
+from ai_service import copilot_service
+from knowledge import knowledge_base
+from semantic_cache import SemanticCache, context_scope, semantic_cache
+
+MODEL = 'anthropic.claude-test'
+ACCOUNTS = '### Cuentas\n- Apertura de cuentas bancarias multi-pais'
+PAYMENTS = '### Pagos\n- Transferencias internacionales simplificadas'
+
+
+def make_cache(max_entries=100):
+    return SemanticCache(enabled=True, threshold=0.8, ttl=3600, max_entries=max_entries, dimensions=4096)
+
+
+def test_answers_are_scoped_by_knowledge():
+    cache = make_cache()
+    cache.store('Que necesito para la apertura de cuentas?', 'chat', MODEL, 'Respuesta', context_scope(ACCOUNTS))
+
+    hit = cache.lookup('que necesito para la apertura de una cuenta', 'chat', MODEL, context_scope(ACCOUNTS))
+    assert hit is not None and hit['response'] == 'Respuesta'
+    assert cache.lookup('que necesito para la apertura de una cuenta', 'chat', MODEL, context_scope(PAYMENTS)) is None
+
+
+def test_max_entries_bounds_all_scopes():
+    cache = make_cache(max_entries=3)
+    for document in range(5):
+        cache.store('Que documentos pide el KYC?', 'chat', MODEL, f'respuesta {document}',
+                    context_scope(f'### Documento {document}'))
+
+    assert cache.stats()['entries'] == 3
+    assert cache.stats()['scopes'] == 3
+    # The oldest scopes were evicted first
+    assert cache.lookup('Que documentos pide el KYC?', 'chat', MODEL, context_scope('### Documento 0')) is None
+    assert cache.lookup('Que documentos pide el KYC?', 'chat', MODEL, context_scope('### Documento 4')) is not None
+
+
+@pytest.fixture
+def cached_product_answers(monkeypatch):
+    """Enable the cache with a fake copilot call and a fixed knowledge chunk"""
+    monkeypatch.setattr(semantic_cache, 'enabled', True)
+    semantic_cache.clear()
+    monkeypatch.setattr(knowledge_base, 'retrieve', lambda question, top_k=None: [
+        {'source': 'efex.md', 'heading': 'Cuentas', 'content': 'Apertura de cuentas bancarias', 'score': 1.0}
+    ])
+    prompts = []
+
+    def invoke(model_id, body):
+        prompts.append(body['system'])
+        return {'content': [{'text': 'Necesitas acta constitutiva.'}], 'usage': {}}, model_id
+
+    monkeypatch.setattr(copilot_service, 'client', object())
+    monkeypatch.setattr(copilot_service.gateway, 'invoke', invoke)
+    yield prompts
+    semantic_cache.clear()
+
+
+def test_product_answers_are_shared_across_promotors(app, cached_product_answers):
+    question = 'Que necesito para la apertura de cuentas?'
+    first = copilot_service.chat(question, [], {'promotor_name': 'Ana', 'clientes_activos': 4}, operation='chat')
+    second = copilot_service.chat(question, [], {'promotor_name': 'Luis', 'clientes_activos': 9}, operation='chat')
+
+    assert not first.get('cached')
+    assert second['cached'] and second['response'] == first['response']
+    # The shared answer was generated without the promotor's details
+    assert 'Ana' not in str(cached_product_answers[0])
+
+
+def test_promotor_context_is_not_cached(app, cached_product_answers):
+    context = {'promotor_name': 'Ana', 'client_info': 'Autopartes SA'}
+    copilot_service.chat('Que necesito para la apertura de cuentas?', [], context, operation='chat')
+    second = copilot_service.chat('Que necesito para la apertura de cuentas?', [], context, operation='chat')
+
+    assert not second.get('cached')
+    assert 'Ana' in str(cached_product_answers[0])
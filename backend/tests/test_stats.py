@@ -0,0 +1,94 @@
+"""Promotor statistics: flush-time deltas, reconciliation and the reconcile interval"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, PromotorStats, User
+from stats import get_promotor_stats, reconcile_promotor_stats
+
+
+def counters(app, promotor):
+    """(total, prospecto, activo, inactivo, conversations, users.clientes_activos) as stored"""
+    with app.app_context():
+        stats = PromotorStats.query.get(promotor['id'])
+        user = User.query.get(promotor['id'])
+        return (stats.total_clients, stats.prospecto, stats.activo, stats.inactivo,
+                stats.conversations, user.clientes_activos)
+
+
+@pytest.fixture
+def tracked(app, client, promotor):
+    """A promotor whose promotor_stats row exists, so deltas have a row to apply to"""
+    client.get('/api/dashboard/stats', headers=promotor['headers'])
+    return promotor
+
+
+def create_client(client, promotor, **fields):
+    response = client.post('/api/clients', json={'name': 'Autopartes SA', **fields},
+                           headers=promotor['headers'])
+    return response.get_json()['client']['id']
+
+
+def test_client_create_status_change_and_delete(app, client, tracked):
+    client_id = create_client(client, tracked, status='activo')
+    create_client(client, tracked)
+    assert counters(app, tracked) == (2, 1, 1, 0, 0, 1)
+
+    client.put(f'/api/clients/{client_id}', json={'status': 'inactivo'}, headers=tracked['headers'])
+    assert counters(app, tracked) == (2, 1, 0, 1, 0, 0)
+
+    client.delete(f'/api/clients/{client_id}', headers=tracked['headers'])
+    assert counters(app, tracked) == (1, 1, 0, 0, 0, 0)
+
+
+def test_bulk_import(app, client, tracked):
+    body = b'name,status\nUno,activo\nDos,\nTres,activo\n'
+    client.post('/api/clients/import?format=csv', data=body, headers=tracked['headers'])
+    assert counters(app, tracked) == (3, 1, 2, 0, 0, 2)
+
+
+def test_conversations_are_counted(app, client, tracked):
+    client.post('/api/copilot/chat', json={'message': 'Hola'}, headers=tracked['headers'])
+    assert counters(app, tracked)[4] == 1
+
+
+def test_reconcile_fixes_drift(app, client, tracked):
+    create_client(client, tracked, status='activo')
+    with app.app_context():
+        PromotorStats.query.filter_by(user_id=tracked['id']).update({'total_clients': 7, 'activo': 0})
+        User.query.filter_by(id=tracked['id']).update({'clientes_activos': 5})
+        db.session.commit()
+
+        reconcile_promotor_stats(tracked['id'])
+        db.session.commit()
+    assert counters(app, tracked) == (1, 0, 1, 0, 0, 1)
+
+
+def test_reconcile_command(app, client, tracked):
+    create_client(client, tracked, status='activo')
+    with app.app_context():
+        PromotorStats.query.filter_by(user_id=tracked['id']).update({'total_clients': 7})
+        db.session.commit()
+
+    output = app.test_cli_runner().invoke(args=['reconcile-stats', '--dry-run']).output
+    assert f"Promotor {tracked['id']}:" in output
+    assert counters(app, tracked)[0] == 7
+
+    output = app.test_cli_runner().invoke(args=['reconcile-stats']).output
+    assert 'reconciled' in output
+    assert counters(app, tracked)[0] == 1
+
+
+def test_reconcile_interval_comes_from_the_app_config(app, promotor, monkeypatch):
+    with app.test_request_context():
+        stats = get_promotor_stats(promotor['id'])
+        reconciled_at = datetime.utcnow() - timedelta(seconds=60)
+        stats.reconciled_at = reconciled_at
+        db.session.commit()
+
+        monkeypatch.setitem(app.config, 'STATS_RECONCILE_INTERVAL', 3600)
+        assert get_promotor_stats(promotor['id']).reconciled_at == reconciled_at
+
+        monkeypatch.setitem(app.config, 'STATS_RECONCILE_INTERVAL', 30)
+        assert get_promotor_stats(promotor['id']).reconciled_at > reconciled_at
+        assert PromotorStats.query.get(promotor['id']).reconciled_at > reconciled_at
@@ -0,0 +1,93 @@
+"""Async copilot tasks: queueing, polling, failures and tasks lost with their process"""
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, AITask
+from tasks import task_queue, ORPHANED_ERROR
+
+
+def wait_for_task(client, promotor, task_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        task = client.get(f'/api/copilot/tasks/{task_id}', headers=promotor['headers']).get_json()['task']
+        if task['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            return task
+        time.sleep(0.05)
+
+
+def add_task(app, promotor, runner, status='running', age=timedelta(0)):
+    with app.app_context():
+        task = AITask(id=str(uuid.uuid4()), user_id=promotor['id'], operation='chat', status=status,
+                      runner=runner, created_at=datetime.utcnow() - age)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_async_chat_is_polled_to_completion(client, promotor):
+    response = client.post('/api/copilot/chat', json={'message': 'Hola', 'async': True},
+                           headers=promotor['headers'])
+    assert response.status_code == 202
+
+    task = wait_for_task(client, promotor, response.get_json()['task_id'])
+    assert task['status'] == 'completed'
+    assert task['result']['response']
+
+
+def test_failing_work_marks_the_task_failed(app, client, promotor):
+    def run():
+        raise RuntimeError('Bedrock exploded')
+
+    with app.test_request_context():
+        task_id = task_queue.submit(promotor['id'], 'chat', run).id
+
+    task = wait_for_task(client, promotor, task_id)
+    assert (task['status'], task['error']) == ('failed', 'Bedrock exploded')
+
+
+def test_task_of_a_dead_process_fails_when_polled(app, client, promotor, dead_pid):
+    task_id = add_task(app, promotor, f'{task_queue.runner_id.rpartition(":")[0]}:{dead_pid}')
+
+    task = client.get(f'/api/copilot/tasks/{task_id}', headers=promotor['headers']).get_json()['task']
+    assert (task['status'], task['error']) == ('failed', ORPHANED_ERROR)
+
+
+def test_tasks_of_live_processes_are_kept(app, promotor):
+    own = add_task(app, promotor, task_queue.runner_id, status='queued')
+    remote = add_task(app, promotor, 'other-host:1234')
+
+    with app.app_context():
+        task_queue.fail_orphaned_tasks()
+        assert {AITask.query.get(own).status, AITask.query.get(remote).status} == {'queued', 'running'}
+
+
+def test_startup_fails_stale_tasks_of_other_hosts(app, promotor):
+    stale = add_task(app, promotor, 'other-host:1234', status='queued',
+                     age=timedelta(seconds=task_queue.stale_after + 60))
+
+    with app.app_context():
+        assert task_queue.fail_orphaned_tasks() >= 1
+        assert AITask.query.get(stale).status == 'failed'
+
+
+def test_old_tasks_are_purged(app, promotor):
+    old = add_task(app, promotor, task_queue.runner_id, status='completed',
+                   age=timedelta(days=task_queue.retention_days + 1))
+    recent = add_task(app, promotor, task_queue.runner_id, status='completed')
+
+    with app.app_context():
+        task_queue.purge_old_tasks()
+        assert AITask.query.get(old) is None
+        assert AITask.query.get(recent) is not None
@@ -21,8 +21,11 @@ import './Clients.css';
 function Clients() {
   const [searchParams] = useSearchParams();
   const [clients, setClients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
   const [showModal, setShowModal] = useState(searchParams.get('new') === 'true');
   const [editingClient, setEditingClient] = useState(null);
@@ -39,14 +42,21 @@ function Clients() {
     notes: ''
   });
 
+  // Search on the server once the user stops typing, so clients not loaded yet are found too
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchQuery(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   useEffect(() => {
     fetchClients();
-  }, [statusFilter]);
+  }, [statusFilter, searchQuery]);
 
   const fetchClients = async () => {
     try {
-      const response = await clientsAPI.getAll(statusFilter || null);
+      const response = await clientsAPI.getAll(statusFilter || null, searchQuery ? { q: searchQuery } : {});
       setClients(response.data.clients);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching clients:', error);
     } finally {
@@ -54,6 +64,19 @@ function Clients() {
     }
   };
 
+  const loadMoreClients = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await clientsAPI.getAll(statusFilter || null, { cursor: nextCursor });
+      setClients(prev => [...prev, ...response.data.clients]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching clients:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -87,6 +110,12 @@ function Clients() {
       alert(response.data.analysis);
     } catch (error) {
       console.error('Error analyzing client:', error);
+      // A failed analysis still carries the copilot's apology message
+      alert(
+        error.response?.data?.analysis ||
+        error.response?.data?.error ||
+        'No se pudo analizar el cliente. Intenta de nuevo.'
+      );
     } finally {
       setAnalyzing(null);
     }
@@ -121,13 +150,6 @@ function Clients() {
     });
   };
 
-  const filteredClients = clients.filter(client => {
-    const matchesSearch = client.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      client.business_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      client.email?.toLowerCase().includes(searchTerm.toLowerCase());
-    return matchesSearch;
-  });
-
   const getStatusBadgeClass = (status) => {
     switch (status) {
       case 'activo': return 'badge-active';
@@ -156,7 +178,7 @@ function Clients() {
           <Search size={18} className="search-icon" />
           <input
             type="text"
-            placeholder="Buscar por nombre, negocio o email..."
+            placeholder="Buscar por nombre, negocio, notas o email..."
             value={searchTerm}
             onChange={(e) => setSearchTerm(e.target.value)}
           />
@@ -182,7 +204,7 @@ function Clients() {
           <div className="spinner"></div>
           <p>Cargando clientes...</p>
         </div>
-      ) : filteredClients.length === 0 ? (
+      ) : clients.length === 0 ? (
         <div className="empty-state card">
           <div className="empty-icon">📋</div>
           <h3>No hay clientes</h3>
@@ -200,7 +222,7 @@ function Clients() {
         </div>
       ) : (
         <div className="clients-grid">
-          {filteredClients.map((client) => (
+          {clients.map((client) => (
             <div key={client.id} className="client-card card">
               <div className="client-header">
                 <div className="client-avatar">
@@ -287,6 +309,14 @@ function Clients() {
         </div>
       )}
 
+      {!loading && nextCursor && (
+        <div className="load-more">
+          <button className="btn-secondary" onClick={loadMoreClients} disabled={loadingMore}>
+            {loadingMore ? 'Cargando...' : 'Cargar mas clientes'}
+          </button>
+        </div>
+      )}
+
       {/* Click outside to close menu */}
       {activeMenu && (
         <div className="menu-overlay" onClick={() => setActiveMenu(null)} />
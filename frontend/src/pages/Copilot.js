@@ -14,8 +14,14 @@ import {
 } from 'lucide-react';
 import './Copilot.css';
 
+// Outcomes of assistant messages whose copilot call failed
+const FAILED_OUTCOMES = ['error', 'unavailable'];
+
 function Copilot() {
   const [conversations, setConversations] = useState([]);
+  const [conversationsPage, setConversationsPage] = useState(1);
+  const [hasMoreConversations, setHasMoreConversations] = useState(false);
+  const [loadingMoreConversations, setLoadingMoreConversations] = useState(false);
   const [currentConversation, setCurrentConversation] = useState(null);
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
@@ -36,16 +42,39 @@ function Copilot() {
     try {
       const response = await copilotAPI.getConversations();
       setConversations(response.data.conversations);
+      setConversationsPage(response.data.page);
+      setHasMoreConversations(response.data.has_next);
     } catch (error) {
       console.error('Error fetching conversations:', error);
     }
   };
 
+  const loadMoreConversations = async () => {
+    setLoadingMoreConversations(true);
+    try {
+      const response = await copilotAPI.getConversations(conversationsPage + 1);
+      // Deletions shift the pages, so skip conversations that are already listed
+      setConversations(prev => [
+        ...prev,
+        ...response.data.conversations.filter(conv => !prev.some(c => c.id === conv.id))
+      ]);
+      setConversationsPage(response.data.page);
+      setHasMoreConversations(response.data.has_next);
+    } catch (error) {
+      console.error('Error fetching conversations:', error);
+    } finally {
+      setLoadingMoreConversations(false);
+    }
+  };
+
   const loadConversation = async (id) => {
     try {
       const response = await copilotAPI.getConversation(id);
       setCurrentConversation(response.data.conversation);
-      setMessages(response.data.conversation.messages);
+      setMessages(response.data.conversation.messages.map(msg => ({
+        ...msg,
+        error: FAILED_OUTCOMES.includes(msg.outcome)
+      })));
       setShowHistory(false);
     } catch (error) {
       console.error('Error loading conversation:', error);
@@ -93,36 +122,57 @@ function Copilot() {
     setMessages(prev => [...prev, newUserMessage]);
     setLoading(true);
 
+    // Placeholder for the assistant response, filled as tokens arrive
+    const assistantId = Date.now() + 1;
+    setMessages(prev => [...prev, {
+      id: assistantId,
+      role: 'assistant',
+      content: '',
+      created_at: new Date().toISOString()
+    }]);
+
+    const updateAssistant = (update) => {
+      setMessages(prev => prev.map(msg =>
+        msg.id === assistantId ? { ...msg, ...update(msg) } : msg
+      ));
+    };
+
     try {
-      const response = await copilotAPI.chat(
+      const result = await copilotAPI.chatStream(
         userMessage,
-        currentConversation?.id
+        currentConversation?.id,
+        (text) => updateAssistant(msg => ({ content: msg.content + text }))
       );
 
-      // Add assistant response
-      const assistantMessage = {
-        id: Date.now() + 1,
-        role: 'assistant',
-        content: response.data.response,
-        created_at: new Date().toISOString()
-      };
-      setMessages(prev => [...prev, assistantMessage]);
+      if (!result) {
+        throw new Error('Stream ended without a response');
+      }
+
+      if (result.success === false) {
+        // Keep any text that already arrived and mark the response as failed
+        updateAssistant(() => ({
+          content: result.partial
+            ? `${result.response}\n\n_La respuesta se interrumpio por un error. Por favor intenta de nuevo._`
+            : result.response,
+          error: true
+        }));
+      } else {
+        // Replace with the final saved response
+        updateAssistant(() => ({ content: result.response }));
+      }
 
       // Update current conversation ID if new
       if (!currentConversation) {
-        setCurrentConversation({ id: response.data.conversation_id });
+        setCurrentConversation({ id: result.conversation_id });
         fetchConversations();
       }
     } catch (error) {
       console.error('Error sending message:', error);
-      // Add error message
-      setMessages(prev => [...prev, {
-        id: Date.now() + 1,
-        role: 'assistant',
+      // Show error message in place of the assistant response
+      updateAssistant(() => ({
         content: 'Lo siento, hubo un error. Por favor intenta de nuevo.',
-        created_at: new Date().toISOString(),
         error: true
-      }]);
+      }));
     } finally {
       setLoading(false);
     }
@@ -175,6 +225,18 @@ function Copilot() {
           {conversations.length === 0 && (
             <p className="no-conversations">No hay conversaciones anteriores</p>
           )}
+
+          {hasMoreConversations && (
+            <div className="load-more-conversations">
+              <button
+                className="btn-secondary"
+                onClick={loadMoreConversations}
+                disabled={loadingMoreConversations}
+              >
+                {loadingMoreConversations ? 'Cargando...' : 'Cargar mas conversaciones'}
+              </button>
+            </div>
+          )}
         </div>
       </aside>
 
@@ -230,7 +292,7 @@ function Copilot() {
             </div>
           ) : (
             <div className="messages-list">
-              {messages.map((message) => (
+              {messages.filter((message) => message.content).map((message) => (
                 <div
                   key={message.id}
                   className={`message ${message.role} ${message.error ? 'error' : ''}`}
@@ -252,7 +314,7 @@ function Copilot() {
                 </div>
               ))}
 
-              {loading && (
+              {loading && !messages[messages.length - 1]?.content && (
                 <div className="message assistant loading">
                   <div className="message-avatar">
                     <Bot size={18} />
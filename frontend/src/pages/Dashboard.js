@@ -24,11 +24,11 @@ function Dashboard() {
       try {
         const [statsRes, clientsRes] = await Promise.all([
           dashboardAPI.getStats(),
-          clientsAPI.getAll()
+          clientsAPI.getAll(null, { limit: 5, fields: 'id,name,business_name,status' })
         ]);
 
         setStats(statsRes.data.stats);
-        setRecentClients(clientsRes.data.clients.slice(0, 5));
+        setRecentClients(clientsRes.data.clients);
       } catch (error) {
         console.error('Error fetching dashboard data:', error);
       } finally {
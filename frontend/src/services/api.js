@@ -49,18 +49,62 @@ export const authAPI = {
 export const copilotAPI = {
   chat: (message, conversationId = null) =>
     api.post('/copilot/chat', { message, conversation_id: conversationId }),
-  getConversations: () => api.get('/copilot/conversations'),
+  chatStream: async (message, conversationId = null, onDelta = () => {}) => {
+    // Axios no expone el body como stream en el navegador, por eso usamos fetch
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_BASE_URL}/copilot/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ message, conversation_id: conversationId }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Stream request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+
+      for (const event of events) {
+        if (!event.startsWith('data: ')) continue;
+        const payload = JSON.parse(event.slice(6));
+        if (payload.type === 'delta') {
+          onDelta(payload.text);
+        } else if (payload.type === 'done') {
+          result = payload;
+        }
+      }
+    }
+
+    return result;
+  },
+  getConversations: (page = 1) => api.get('/copilot/conversations', { params: { page } }),
   getConversation: (id) => api.get(`/copilot/conversations/${id}`),
   deleteConversation: (id) => api.delete(`/copilot/conversations/${id}`),
   generateMessage: (clientId, messageType) =>
     api.post('/copilot/generate-message', { client_id: clientId, message_type: messageType }),
   analyzeOpportunity: (clientId) =>
     api.post('/copilot/analyze-opportunity', { client_id: clientId }),
+  getTask: (taskId) => api.get(`/copilot/tasks/${taskId}`),
 };
 
 // Clients API
 export const clientsAPI = {
-  getAll: (status = null) => api.get('/clients', { params: { status } }),
+  getAll: (status = null, params = {}) =>
+    api.get('/clients', { params: { status, ...params } }),
   get: (id) => api.get(`/clients/${id}`),
   create: (data) => api.post('/clients', data),
   update: (id, data) => api.put(`/clients/${id}`, data),